@@ -0,0 +1,239 @@
+# ==== Benchmark da Matriz GE com Portfólios Sintéticos ====
+# Gera DataFrames no formato da aba "Análise" (100 a 1M produtos), publica cada um no app e
+# dispara os callbacks pelo mesmo endpoint usado pelo navegador (/_dash-update-component).
+# Para cada cenário registra percentis de latência, pico de memória (tracemalloc) e o tamanho
+# da resposta serializada, num JSON estável que pode ser comparado com diff entre execuções.
+#
+# Uso:
+#   python benchmark_matriz.py --tamanhos 100 1000 10000 --saida bench_resultados.json
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+# O monitor da planilha trocaria o dataset sintético pelo Excel no meio da medição
+os.environ.setdefault("MATRIZ_GE_RECARGA_INTERVALO", "0")
+
+import numpy as np
+import pandas as pd
+
+import matriz_GE_dash as app_matriz
+import medicao_matriz
+
+TAMANHOS_PADRAO = (100, 1_000, 10_000, 100_000, 1_000_000)
+
+
+def gerar_portfolio_sintetico(n_produtos, semente=0):
+    """DataFrame com as colunas da aba "Análise" (já limpo) e cardinalidades realistas."""
+    rng = np.random.default_rng(semente)
+    n_areas = int(np.clip(np.sqrt(n_produtos) / 2, 3, 40))
+    areas = np.array([f"ÁREA {i:02d}" for i in range(n_areas)], dtype=object)
+    # Poucas áreas concentram a maior parte dos cursos, como no portfólio real
+    pesos_areas = 1.0 / np.arange(1, n_areas + 1)
+    pesos_areas /= pesos_areas.sum()
+
+    notas = {col: rng.integers(0, 6, n_produtos) for col in (
+        "Faturamento", "Satisfação", "Capacidade de Oferta", "Facilidade de Adesão",
+        "Tamanho Mercado", "Crescimento Mercado", "Vulnerabilidade", "Concorrentes")}
+    # Eixos e quadrante pelo mesmo motor de pontuação do app (fórmula da planilha)
+    posicao = app_matriz.calcular_eixo(notas, app_matriz.EIXO_POSICAO)
+    atratividade = app_matriz.calcular_eixo(notas, app_matriz.EIXO_ATRATIVIDADE)
+    quadrantes = app_matriz.classificar_quadrante(posicao, atratividade)
+
+    return pd.DataFrame({
+        "Modalidade": np.full(n_produtos, "HABILITAÇÃO TÉCNICA", dtype=object),
+        "Grande Área": rng.choice(areas, n_produtos, p=pesos_areas),
+        "Produto": np.array([f"TÉCNICO EM CURSO {i:07d}" for i in range(n_produtos)], dtype=object),
+        "Hora Aluno": np.round(rng.lognormal(8, 1.5, n_produtos), 2),
+        "Faturamento": notas["Faturamento"], "Satisfação": notas["Satisfação"],
+        "Capacidade de Oferta": notas["Capacidade de Oferta"], "Facilidade de Adesão": notas["Facilidade de Adesão"],
+        "Posição Competitiva": posicao,
+        "Tamanho Mercado": notas["Tamanho Mercado"], "Crescimento Mercado": notas["Crescimento Mercado"],
+        "Vulnerabilidade": notas["Vulnerabilidade"], "Concorrentes": notas["Concorrentes"],
+        "Atratividade Mercado": atratividade,
+        "Quadrante": quadrantes,
+    })
+
+
+class ClienteDash(medicao_matriz.ClienteCallbacks):
+    """Dispara callbacks do app pelo cliente de teste do Flask, como o navegador faria."""
+
+    def __init__(self, app):
+        self.cliente = app.server.test_client()
+        self.dependencias = self.cliente.get("/_dash-dependencies").get_json()
+
+    def _enviar(self, corpo):
+        resposta = self.cliente.post("/_dash-update-component", json=corpo)
+        return resposta.status_code, resposta.data
+
+
+def cenarios_filtros(df):
+    """Combinações de filtros típicas, derivadas do próprio portfólio."""
+    areas = df["Grande Área"].value_counts().index.tolist()
+    quadrantes = sorted(df["Quadrante"].dropna().unique())  # linhas sem nota ficam sem quadrante
+    produto = df["Produto"].iloc[len(df) // 2]
+    return [
+        ("todos", {}),
+        ("uma_area", {"filtro-area": areas[:1]}),
+        ("tres_areas_um_quadrante", {"filtro-area": areas[:3], "filtro-quadrante": quadrantes[-1:]}),
+        ("um_produto", {"filtro-produto": [produto]}),
+        ("sem_resultado", {"filtro-area": ["ÁREA INEXISTENTE"]}),
+    ]
+
+
+def medir(funcao, repeticoes, antes=None):
+    """Roda ``funcao`` ``repeticoes`` vezes; devolve latências (ms), pico de memória (MB) e bytes da resposta.
+
+    A memória é medida numa execução extra com tracemalloc, que distorceria as latências.
+    """
+    latencias = []
+    for _ in range(repeticoes):
+        if antes is not None:
+            antes()
+        inicio = time.perf_counter()
+        funcao()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+    if antes is not None:
+        antes()
+    tracemalloc.start()
+    _, bytes_resposta = funcao()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"latencia_ms": medicao_matriz.percentis(latencias), "memoria_pico_mb": round(pico / 2**20, 3),
+            "resposta_bytes": bytes_resposta, "repeticoes": repeticoes}
+
+
+def _carregar_pagina(cliente, valores):
+    """Navegação para "/": monta o layout da página e depois os filtros e o gráfico."""
+    _, bytes_layout = cliente.disparar("url", "pathname", valores, saida="page-content.children")
+    corpo, bytes_dados = cliente.disparar("url", "pathname", valores, saida="grafico-matriz.figure")
+    return corpo, bytes_layout + bytes_dados
+
+
+def _exportar(cliente, valores, aguardar):
+    corpo, tamanho = cliente.disparar("botao-download", "n_clicks", dict(valores, **{"botao-download": 1}))
+    pedido = corpo.get("response", {}).get("store-exportacao", {}).get("data")
+    while aguardar and pedido:
+        time.sleep(0.2)
+        corpo, tamanho = cliente.disparar("intervalo-exportacao", "n_intervals",
+                                          {"intervalo-exportacao": 1, "store-exportacao": pedido})
+        pedido = corpo.get("response", {}).get("store-exportacao", {}).get("data")
+    return corpo, tamanho
+
+
+def _esvaziar_caches():
+    """Estado frio: caches em memória do app e PNGs já exportados em disco."""
+    app_matriz.limpar_caches()
+    shutil.rmtree(app_matriz.EXPORTACAO_DIR, ignore_errors=True)
+
+
+def executar(tamanhos, repeticoes_base, incluir_exportacao, aguardar_exportacao, semente):
+    # As exportações do benchmark vão para uma pasta própria: o modo frio a apaga sem tocar no cache real
+    app_matriz.EXPORTACAO_DIR = tempfile.mkdtemp(prefix="matriz-ge-bench-")
+    cliente = ClienteDash(app_matriz.app)
+    resultados = []
+    for n in tamanhos:
+        # Menos repetições nos portfólios gigantes para o benchmark terminar em tempo razoável
+        repeticoes = max(3, repeticoes_base if n <= 10_000 else repeticoes_base // 4)
+        df = gerar_portfolio_sintetico(n, semente=semente)
+        inicio = time.perf_counter()
+        app_matriz.registro_datasets.obter().publicar(df, origem="sintetico")
+        tempo_indice_ms = (time.perf_counter() - inicio) * 1000
+        print(f"[{n} produtos] índice construído em {tempo_indice_ms:.1f} ms", file=sys.stderr)
+        # Memória do snapshot compacto contra o DataFrame completo (object + float64) que era mantido
+        memoria = {"original_mb": round(df.memory_usage(index=True, deep=True).sum() / 2**20, 3),
+                   "compacto_mb": round(app_matriz.registro_datasets.obter().memoria_bytes() / 2**20, 3)}
+        resultados.append({"produtos": n, "cenario": "_memoria", **memoria})
+        print(f"[{n} produtos] dataset: {memoria['original_mb']} MB -> {memoria['compacto_mb']} MB", file=sys.stderr)
+
+        for nome, filtros in cenarios_filtros(df):
+            valores = {"url": "/", "exibir-texto": True, "dark-mode-switch": False,
+                       "filtro-area": [], "filtro-quadrante": [], "filtro-produto": [], **filtros}
+            interacoes = [
+                ("carregar_pagina", lambda: _carregar_pagina(cliente, valores)),
+                ("clique_filtro", lambda: cliente.disparar("filtro-area", "value", valores, saida="grafico-matriz.figure")),
+                ("busca_produto", lambda: cliente.disparar("busca-filtro-produto", "value",
+                                                           dict(valores, **{"busca-filtro-produto": "curso 00"}))),
+            ]
+            if incluir_exportacao:
+                interacoes.append(("baixar_grafico", lambda: _exportar(cliente, valores, aguardar_exportacao)))
+            for interacao, funcao in interacoes:
+                # Frio: todos os caches do app vazios (visões, rótulos, sensibilidade, exportações em
+                # memória e em disco, API e índices de busca), como na primeira requisição após a carga
+                for modo, antes in (("frio", _esvaziar_caches), ("quente", None)):
+                    if modo == "quente":
+                        funcao()  # aquece o cache
+                    medicao = medir(funcao, repeticoes, antes=antes)
+                    resultados.append({"produtos": n, "cenario": nome, "interacao": interacao, "cache": modo, **medicao})
+                    print(f"  {nome:<26} {interacao:<16} {modo:<6} p50={medicao['latencia_ms']['p50']:>10.2f} ms "
+                          f"resposta={medicao['resposta_bytes']:>12} B", file=sys.stderr)
+        resultados.append({"produtos": n, "cenario": "_indice", "tempo_construcao_ms": round(tempo_indice_ms, 3)})
+    shutil.rmtree(app_matriz.EXPORTACAO_DIR, ignore_errors=True)
+    return resultados
+
+
+def medir_inicializacao(vezes):
+    """Importa o app em processos novos e devolve os percentis (ms) de cada etapa do boot e do total."""
+    script = "import json, matriz_GE_dash as m; print(json.dumps(m.TEMPOS_BOOT))"
+    etapas = {}
+    for _ in range(vezes):
+        saida = subprocess.run([sys.executable, "-c", script], cwd=app_matriz.BASE_DIR, capture_output=True,
+                               text=True, check=True, env=dict(os.environ, MATRIZ_GE_RECARGA_INTERVALO="0"))
+        tempos = json.loads(saida.stdout.strip().splitlines()[-1])
+        tempos["total"] = sum(tempos.values())
+        for etapa, segundos in tempos.items():
+            etapas.setdefault(etapa, []).append(segundos * 1000)
+    return {etapa: medicao_matriz.percentis(amostras) for etapa, amostras in etapas.items()}
+
+
+def medir_rss_workers(n_workers, preload, porta=8765, requisicoes=40):
+    """Sobe o app no gunicorn, faz requisições e mede RSS/PSS (MB) de cada worker (Linux)."""
+    with medicao_matriz.subir_gunicorn(["-w", str(n_workers), *(["--preload"] if preload else [])], porta) as processo:
+        for _ in range(requisicoes):
+            urllib.request.urlopen(f"http://127.0.0.1:{porta}/_dash-layout", timeout=30).read()
+        return {"workers": n_workers, "preload": preload, **medicao_matriz.memoria_workers_mb(processo)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dos callbacks da Matriz GE com portfólios sintéticos.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=list(TAMANHOS_PADRAO),
+                        help="quantidades de produtos a testar (padrão: 100 a 1.000.000)")
+    parser.add_argument("--repeticoes", type=int, default=20, help="repetições por cenário (padrão: 20)")
+    parser.add_argument("--exportacao", action="store_true", help="inclui o callback baixar_grafico")
+    parser.add_argument("--aguardar-exportacao", action="store_true",
+                        help="mede a exportação até o PNG ficar pronto (exige kaleido)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--inicializacoes", type=int, default=3, metavar="K",
+                        help="importa o app K vezes em processos novos e mede o boot (0 desativa)")
+    parser.add_argument("--rss-workers", type=int, default=0, metavar="N",
+                        help="mede RSS/PSS de N workers do gunicorn, com e sem --preload")
+    parser.add_argument("--saida", default="bench_resultados.json", help="arquivo JSON de resultados")
+    args = parser.parse_args(argv)
+
+    resultados = executar(args.tamanhos, args.repeticoes, args.exportacao, args.aguardar_exportacao, args.semente)
+    if args.inicializacoes:
+        boot = medir_inicializacao(args.inicializacoes)
+        resultados.append({"cenario": "_inicializacao", "etapas_ms": boot})
+        etapas = ", ".join(f"{etapa} {v['p50']:.0f}" for etapa, v in boot.items() if etapa != "total")
+        print(f"  inicialização p50={boot['total']['p50']:.0f} ms ({etapas})", file=sys.stderr)
+    if args.rss_workers:
+        for preload in (False, True):
+            medicao = medir_rss_workers(args.rss_workers, preload)
+            resultados.append({"cenario": "_rss_workers", **medicao})
+            print(f"  gunicorn -w {args.rss_workers}{' --preload' if preload else ''}: {medicao['por_worker_mb']}",
+                  file=sys.stderr)
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump({"ambiente": medicao_matriz.ambiente(), "resultados": resultados}, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Resultados gravados em {args.saida}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
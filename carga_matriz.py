@@ -0,0 +1,220 @@
+# ==== Teste de Carga do gunicorn (workers x threads x classe de worker) ====
+# Sobe o app localmente no gunicorn em cada configuração pedida e, com vários usuários virtuais
+# (threads), repete uma mistura realista de interações do navegador contra /_dash-update-component:
+# navegação para a página, cliques nos filtros, busca de produto, download do gráfico e polling da
+# API. A troca de tema da Matriz roda só no navegador (callback clientside) e não entra na mistura. Para cada configuração registra vazão, percentis de latência (geral e por
+# interação), erros e a memória de cada worker, num JSON estável como o do benchmark_matriz.py.
+# Tudo roda numa máquina só: o gerador de carga disputa CPU com o servidor, então compare
+# configurações entre si, não com a produção.
+#
+# Uso:
+#   python carga_matriz.py --configuracoes 1x1:sync 2x1:sync 2x4:gthread --usuarios 8 --duracao 30
+import argparse
+import http.client
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import medicao_matriz
+
+# Peso de cada interação na mistura (proporcional à frequência esperada no uso real)
+MISTURA_PADRAO = {"navegacao": 1, "filtro": 6, "busca": 2, "download": 1, "api": 2}
+CONFIGURACOES_PADRAO = ("1x1:sync", "2x1:sync", "4x1:sync", "2x4:gthread", "4x4:gthread")
+
+
+def ler_configuracao(texto):
+    """"4x2:gthread" -> {"workers": 4, "threads": 2, "classe": "gthread"} (classe padrão: sync, ou
+    gthread quando há mais de uma thread)."""
+    forma, _, classe = texto.partition(":")
+    workers, _, threads = forma.partition("x")
+    threads = int(threads or 1)
+    return {"workers": int(workers), "threads": threads, "classe": classe or ("gthread" if threads > 1 else "sync")}
+
+
+class ClienteHttp(medicao_matriz.ClienteCallbacks):
+    """Cliente de callbacks falando HTTP com um servidor de verdade (uma conexão por usuário)."""
+
+    def __init__(self, porta, dependencias=None):
+        self.porta = porta
+        self.conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=120)
+        self.dependencias = dependencias if dependencias is not None else json.loads(self.get("/_dash-dependencies")[1])
+
+    def _requisicao(self, metodo, caminho, corpo=None, cabecalhos=None):
+        for tentativa in (1, 2):
+            try:
+                self.conexao.request(metodo, caminho, body=corpo, headers=cabecalhos or {})
+                resposta = self.conexao.getresponse()
+                return resposta.status, resposta.read(), resposta.getheader("ETag")
+            except (http.client.HTTPException, ConnectionError):
+                # Workers sync fecham a conexão a cada resposta: reabre uma vez e repete
+                self.conexao.close()
+                if tentativa == 2:
+                    raise
+
+    def get(self, caminho, cabecalhos=None):
+        return self._requisicao("GET", caminho, cabecalhos=cabecalhos)
+
+    def _enviar(self, corpo):
+        status, dados, _ = self._requisicao("POST", "/_dash-update-component", json.dumps(corpo).encode(),
+                                            {"Content-Type": "application/json"})
+        return status, dados
+
+
+class Usuario:
+    """Sessão de um usuário virtual: guarda o estado da tela e executa interações sorteadas."""
+
+    def __init__(self, cliente, portfolio, semente):
+        self.cliente = cliente
+        self.portfolio = portfolio
+        self.rng = random.Random(semente)
+        self.etag_api = None
+        self.valores = {}
+        self.navegacao()
+
+    def _valores(self, **extras):
+        return dict(self.valores, **{"url": "/", "dark-mode-switch": False, "exibir-texto": True}, **extras)
+
+    def navegacao(self):
+        self.cliente.get("/")
+        self.cliente.get("/_dash-layout")
+        self.cliente.disparar("url", "pathname", self._valores(), saida="page-content.children")
+        self.valores = {"filtro-area": [], "filtro-quadrante": [], "filtro-produto": []}
+        self.cliente.disparar("url", "pathname", self._valores(), saida="grafico-matriz.figure")
+
+    def filtro(self):
+        self.valores["filtro-area"] = self.rng.sample(self.portfolio["areas"], self.rng.randint(0, min(3, len(self.portfolio["areas"]))))
+        self.valores["filtro-quadrante"] = self.rng.sample(self.portfolio["quadrantes"], self.rng.randint(0, 1))
+        self.cliente.disparar("filtro-area", "value", self._valores(), saida="grafico-matriz.figure")
+
+    def busca(self):
+        termo = self.rng.choice(self.portfolio["produtos"]).split()[-1][:4]
+        self.cliente.disparar("busca-filtro-produto", "value", self._valores(**{"busca-filtro-produto": termo}),
+                              saida="grafico-matriz.figure")
+
+    def download(self):
+        self.cliente.disparar("botao-download", "n_clicks", self._valores(**{"botao-download": 1}))
+
+    def api(self):
+        cabecalhos = {"Accept-Encoding": "gzip"}
+        if self.etag_api:
+            cabecalhos["If-None-Match"] = self.etag_api
+        status, _, etag = self.cliente.get("/api/portfolio", cabecalhos)
+        if status not in (200, 304):
+            raise RuntimeError(f"/api/portfolio respondeu {status}")
+        self.etag_api = etag or self.etag_api
+
+
+def _portfolio(cliente):
+    dados = json.loads(cliente.get("/api/portfolio")[1])["produtos"]
+    # Produtos sem nota válida vêm com quadrante null: não há o que selecionar por eles
+    return {campo: sorted({p[chave] for p in dados} - {None})
+            for campo, chave in (("areas", "grande_area"), ("quadrantes", "quadrante"), ("produtos", "produto"))}
+
+
+def executar_carga(porta, usuarios, duracao, mistura, semente):
+    """Roda ``usuarios`` threads por ``duracao`` segundos; devolve vazão, latências e erros."""
+    base = ClienteHttp(porta)
+    portfolio = _portfolio(base)
+    interacoes, pesos = zip(*mistura.items())
+    amostras = {nome: [] for nome in interacoes}
+    erros = {}
+    lock = threading.Lock()
+    # Todas as sessões abrem a página antes de o relógio começar (a ação roda antes de liberar as threads)
+    janela = {}
+    prontos = threading.Barrier(usuarios + 1, action=lambda: janela.update(
+        inicio=time.perf_counter(), fim=time.perf_counter() + duracao))
+
+    def usuario(i):
+        try:
+            sessao = Usuario(ClienteHttp(porta, base.dependencias), portfolio, semente + i)
+        except Exception as e:
+            with lock:
+                chave = f"sessao: {e}"[:120]
+                erros[chave] = erros.get(chave, 0) + 1
+            sessao = None
+        prontos.wait()
+        while sessao is not None and time.perf_counter() < janela["fim"]:
+            nome = sessao.rng.choices(interacoes, weights=pesos)[0]
+            inicio = time.perf_counter()
+            try:
+                getattr(sessao, nome)()
+            except Exception as e:
+                with lock:
+                    chave = f"{nome}: {e}"[:120]
+                    erros[chave] = erros.get(chave, 0) + 1
+                continue
+            with lock:
+                amostras[nome].append((time.perf_counter() - inicio) * 1000)
+
+    threads = [threading.Thread(target=usuario, args=(i,), daemon=True) for i in range(usuarios)]
+    for t in threads:
+        t.start()
+    prontos.wait()
+    for t in threads:
+        t.join()
+    decorrido = time.perf_counter() - janela["inicio"]
+
+    todas = [a for lista in amostras.values() for a in lista]
+    return {
+        "interacoes": len(todas),
+        "vazao_por_segundo": round(len(todas) / decorrido, 2),
+        "latencia_ms": medicao_matriz.percentis(todas) if todas else None,
+        "por_interacao": {nome: {"n": len(lista), "latencia_ms": medicao_matriz.percentis(lista)}
+                          for nome, lista in amostras.items() if lista},
+        "erros": erros,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da Matriz GE no gunicorn, por configuração de workers.")
+    parser.add_argument("--configuracoes", nargs="+", default=list(CONFIGURACOES_PADRAO), metavar="WxT[:CLASSE]",
+                        help="workers x threads e classe de worker (sync, gthread, gevent...)")
+    parser.add_argument("--usuarios", type=int, default=8, help="usuários virtuais simultâneos (padrão: 8)")
+    parser.add_argument("--duracao", type=float, default=30, help="segundos de medição por configuração (padrão: 30)")
+    parser.add_argument("--aquecimento", type=float, default=5, help="segundos de carga antes de medir (padrão: 5)")
+    parser.add_argument("--mistura", default=None,
+                        help='pesos das interações em JSON (padrão: %s)' % json.dumps(MISTURA_PADRAO))
+    parser.add_argument("--sem-preload", action="store_true", help="não usa o --preload do Procfile")
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", default="carga_resultados.json", help="arquivo JSON de resultados")
+    args = parser.parse_args(argv)
+    mistura = json.loads(args.mistura) if args.mistura else MISTURA_PADRAO
+    desconhecidas = set(mistura) - set(MISTURA_PADRAO)
+    if desconhecidas:
+        parser.error(f"interações desconhecidas na mistura: {', '.join(sorted(desconhecidas))}")
+
+    resultados = []
+    for texto in args.configuracoes:
+        config = ler_configuracao(texto)
+        argumentos = ["-w", str(config["workers"]), "--threads", str(config["threads"]), "-k", config["classe"],
+                      "--timeout", "120", *([] if args.sem_preload else ["--preload"])]
+        # Sem o monitor da planilha, e com uma pasta de cache nova por configuração: os PNGs exportados
+        # numa rodada (ou no uso normal do app) não viram acertos de cache em disco na seguinte
+        with tempfile.TemporaryDirectory(prefix="matriz-ge-carga-") as pasta_cache, \
+                medicao_matriz.subir_gunicorn(argumentos, args.porta, env={"MATRIZ_GE_RECARGA_INTERVALO": "0",
+                                                                          "MATRIZ_GE_CACHE_DIR": pasta_cache}) as processo:
+            if args.aquecimento > 0:
+                executar_carga(args.porta, args.usuarios, args.aquecimento, mistura, args.semente)
+            medicao = executar_carga(args.porta, args.usuarios, args.duracao, mistura, args.semente)
+            memoria = medicao_matriz.memoria_workers_mb(processo)
+        resultados.append({"configuracao": texto, **config, "preload": not args.sem_preload,
+                           "usuarios": args.usuarios, "duracao_s": args.duracao, **medicao, **memoria})
+        latencia = medicao["latencia_ms"] or {}
+        pss = [w.get("pss", w.get("rss", 0)) for w in memoria["por_worker_mb"]]
+        print(f"  {texto:<14} {medicao['vazao_por_segundo']:>8.1f} interações/s  p50={latencia.get('p50', 0):>8.1f} ms  "
+              f"p99={latencia.get('p99', 0):>8.1f} ms  erros={sum(medicao['erros'].values())}  "
+              f"PSS/worker={max(pss, default=0):.0f} MB", file=sys.stderr)
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump({"ambiente": medicao_matriz.ambiente(), "mistura": mistura, "resultados": resultados},
+                  f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Resultados gravados em {args.saida}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# ==== Renderização de Imagens em Processos Separados ====
+# Módulo leve (só plotly) usado como alvo do pool de processos de exportação. Ele não importa o app,
+# então os processos filhos sobem rápido e não carregam a planilha nem o servidor Dash.
+import plotly.io as pio
+
+
+def inicializar_renderizador():
+    """Aquece o renderizador do processo (carrega o kaleido e faz uma renderização descartável)."""
+    try:
+        pio.to_image({"data": [], "layout": {}}, format="png", width=10, height=10)
+    except Exception as e:
+        # Sem kaleido a exportação falha depois com a mensagem de erro completa
+        print(f"Alerta: renderizador de imagens indisponível neste processo: {e}")
+
+
+def renderizar_imagem(figura, formato, largura, altura):
+    """Renderiza a figura (dict já preparado para exportação) e devolve os bytes da imagem."""
+    return pio.to_image(figura, format=formato, width=largura, height=altura, scale=1)
+
+
+def main(argv=None):
+    """Exporta o lote (portfólio completo, cada Grande Área e cada quadrante) para um ZIP, sem subir o servidor."""
+    import argparse
+    import os
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("saida", help="caminho do ZIP a gerar")
+    parser.add_argument("--dataset", default=None, help="id do conjunto de dados (MATRIZ_GE_DATASETS); padrão: o principal")
+    parser.add_argument("--formatos", nargs="+", default=["png", "svg", "pdf"], choices=["png", "svg", "pdf"])
+    parser.add_argument("--sem-texto", action="store_true", help="não exibe os nomes dos produtos")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 2, help="renderizadores em paralelo")
+    args = parser.parse_args(argv)
+
+    # O tamanho do pool é lido no import do app
+    os.environ["MATRIZ_GE_EXPORTACAO_PROCESSOS"] = str(max(1, args.processos))
+    import matriz_GE_dash as app_matriz
+
+    inicio = time.perf_counter()
+    figuras = app_matriz.figuras_lote(app_matriz.registro_datasets.obter(args.dataset).atual(), not args.sem_texto)
+
+    def progresso(feitos, total):
+        print(f"\r{feitos}/{total} arquivos", end="", file=sys.stderr, flush=True)
+
+    nomes = app_matriz.exportar_lote(args.saida, figuras, args.formatos, progresso=progresso)
+    print(f"\n{len(nomes)} arquivos gravados em {args.saida} ({time.perf_counter() - inicio:.1f} s).", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
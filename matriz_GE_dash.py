@@ -1,671 +1,3256 @@
-import dash
-from dash import dcc, html, Input, Output, State, callback_context
-import dash_mantine_components as dmc
-from dash_iconify import DashIconify # Importação necessária
-import plotly.graph_objects as go
-import pandas as pd
-from PIL import Image
-import io
-import base64
-import os
-
-# ==== Define o diretório base do script para caminhos de arquivo robustos ====
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-# ==== Constantes Globais para Dimensões da Imagem ====
-IMAGE_ORIGINAL_WIDTH = 1705
-IMAGE_ORIGINAL_HEIGHT = 1650
-TARGET_ASPECT_RATIO = IMAGE_ORIGINAL_WIDTH / IMAGE_ORIGINAL_HEIGHT if IMAGE_ORIGINAL_HEIGHT != 0 else 16/9 # Largura / Altura
-
-# ==== Constantes para Dimensionamento Responsivo do Gráfico ====
-GRAPH_CONTAINER_MIN_WIDTH = 400  # px, Largura mínima para o contêiner do gráfico
-GRAPH_CONTAINER_MAX_WIDTH = 850  # px, Largura máxima para o contêiner do gráfico (ajuste se necessário)
-
-# ==== Carregar Dados ====
-arquivo_excel = os.path.join(BASE_DIR, 'Matriz GE - EP.xlsx')
-arquivo_imagem_fundo = os.path.join(BASE_DIR, 'Fundo GE.png')
-arquivo_imagem_explicacao = os.path.join(BASE_DIR, 'explicacao.png')
-
-try:
-    df = pd.read_excel(arquivo_excel, sheet_name='Análise', skiprows=2)
-except FileNotFoundError:
-    print(f"Erro: O arquivo Excel '{arquivo_excel}' não foi encontrado.")
-    df = pd.DataFrame(columns=[
-        "Ignorar", "Modalidade", "Grande Área", "Produto", "Hora Aluno",
-        "Faturamento", "Satisfação", "Capacidade de Oferta", "Facilidade de Adesão", "Posição Competitiva",
-        "Tamanho Mercado", "Crescimento Mercado", "Vulnerabilidade", "Concorrentes", "Atratividade Mercado",
-        "Quadrante"
-    ])
-
-df.columns = [
-    "Ignorar", "Modalidade", "Grande Área", "Produto", "Hora Aluno",
-    "Faturamento", "Satisfação", "Capacidade de Oferta", "Facilidade de Adesão", "Posição Competitiva",
-    "Tamanho Mercado", "Crescimento Mercado", "Vulnerabilidade", "Concorrentes", "Atratividade Mercado",
-    "Quadrante"
-]
-if "Ignorar" in df.columns:
-    df = df.drop(columns=["Ignorar"])
-
-essential_cols = {
-    "Produto": object, "Posição Competitiva": float, "Atratividade Mercado": float,
-    "Hora Aluno": float, "Grande Área": object, "Quadrante": object
-}
-for col, dtype in essential_cols.items():
-    if col not in df.columns:
-        if dtype == float:
-            df[col] = pd.Series(dtype='float64') if col != "Hora Aluno" else 1.0
-        else:
-            df[col] = pd.Series(dtype='object')
-if "Produto" in df.columns:
-    df = df[df["Produto"].notnull()]
-
-df["Posição Competitiva"] = pd.to_numeric(df["Posição Competitiva"], errors="coerce")
-df["Atratividade Mercado"] = pd.to_numeric(df["Atratividade Mercado"], errors="coerce")
-df["Hora Aluno"] = pd.to_numeric(df["Hora Aluno"], errors="coerce").fillna(1)
-
-encoded_image_fundo = None
-try:
-    image_fundo_pil = Image.open(arquivo_imagem_fundo)
-    buffer_fundo = io.BytesIO()
-    image_fundo_pil.save(buffer_fundo, format="PNG")
-    encoded_image_fundo = base64.b64encode(buffer_fundo.getvalue()).decode()
-except FileNotFoundError:
-    print(f"Erro: O arquivo de imagem de fundo '{arquivo_imagem_fundo}' não foi encontrado.")
-except Exception as e:
-    print(f"Erro ao carregar a imagem de fundo: {e}")
-
-encoded_image_explicacao = None
-try:
-    image_explicacao_pil = Image.open(arquivo_imagem_explicacao)
-    buffer_explicacao = io.BytesIO()
-    image_explicacao_pil.save(buffer_explicacao, format="PNG")
-    encoded_image_explicacao = base64.b64encode(buffer_explicacao.getvalue()).decode()
-except FileNotFoundError:
-    print(f"Alerta: O arquivo de imagem de explicação '{arquivo_imagem_explicacao}' não foi encontrado.")
-except Exception as e:
-    print(f"Erro ao carregar a imagem de explicação: {e}")
-
-
-app = dash.Dash(__name__, suppress_callback_exceptions=True, title="Matriz GE - Educação Profissional")
-server = app.server
-
-# ==== Função para criar Popover de Filtro ====
-def create_filter_popover(filter_id, label_text, button_id):
-    fixed_button_width = "300px"
-    return html.Div([
-        dcc.Store(id=f"store-label-{filter_id}", data=f"Selecionar {label_text.lower()}"),
-        dmc.Text(label_text, size="md", fw=500, mb=4),
-        dmc.Popover(
-            withArrow=True,
-            shadow="md",
-            position="bottom-start",
-            trapFocus=False,
-            closeOnClickOutside=True,
-            children=[
-                dmc.PopoverTarget(
-                    dmc.Button(
-                        id=button_id,
-                        variant="default",
-                        size="sm",
-                        style={
-                            "width": fixed_button_width,
-                            "height": "36px",
-                            "padding": "0 12px",
-                            "display": "flex",
-                            "alignItems": "center",
-                            "justifyContent": "space-between",
-                            "textAlign": "left",
-                            "overflow": "hidden"
-                        },
-                        children=html.Div([
-                            html.Div(
-                                id=f"label-{filter_id}",
-                                children=f"Selecionar {label_text.lower()}",
-                                style={
-                                    "flexGrow": 1,
-                                    "whiteSpace": "nowrap",
-                                    "overflow": "hidden",
-                                    "textOverflow": "ellipsis",
-                                    "textAlign": "left",
-                                    "paddingRight": "8px"
-                                }
-                            ),
-                            html.Div(
-                                "▼", # Seta para baixo
-                                style={
-                                    "flexShrink": 0,
-                                    "minWidth": "16px",
-                                    "textAlign": "right"
-                                }
-                            )
-                        ], style={
-                            "width": "100%",
-                            "display": "flex",
-                            "alignItems": "center"
-                        })
-                    )
-                ),
-                dmc.PopoverDropdown(
-                    style={
-                        "maxHeight": "250px",
-                        "overflowY": "auto",
-                        "minWidth": fixed_button_width,
-                        "padding": "8px"
-                    },
-                    children=[
-                        dmc.CheckboxGroup(id=filter_id, children=[], value=[])
-                    ]
-                )
-            ]
-        ),
-        dmc.Space(h="sm")
-    ])
-
-# ==== Layout da Página Principal (Matriz GE) ====
-def create_layout_matriz_ge():
-    return dmc.Container([
-        dmc.Title("📊 Ciclo de Vida de Produtos - Educação Profissional", order=2, ta="center", my="lg"),
-        html.Div([ # Contêiner Flex principal para 3 colunas
-            # Coluna 1: Sidebar
-            html.Div([
-                dmc.Stack([
-                    dmc.Title("🎯 Filtros", order=3, mb="sm"),
-                    create_filter_popover(filter_id="filtro-area", label_text="Área", button_id="botao-popover-area"),
-                    create_filter_popover(filter_id="filtro-quadrante", label_text="Quadrante", button_id="botao-popover-quadrante"),
-                    create_filter_popover(filter_id="filtro-produto", label_text="Produto", button_id="botao-popover-produto"),
-                    dmc.Group([dmc.Button("🔄 Resetar Filtros", id="botao-reset", color="red", variant="light", size="sm")], mt="md"),
-                    dmc.Divider(my="md"),
-                    dmc.Checkbox(label="Exibir nomes dos produtos", id="exibir-texto", checked=True, mb="sm", size="sm"),
-                    dmc.Button("⬇️ Baixar Gráfico (PNG)", id="botao-download", variant="outline", mt="md", size="sm"),
-                    dcc.Download(id="download-imagem")
-                ])
-            ], style={
-                'width': '20%',
-                'minWidth': '260px',
-                'padding': '20px',
-                'borderRight': '1px solid #eee' 
-            }),
-            
-            # Coluna 2: Área do Gráfico --- AJUSTES PARA RESPONSIVIDADE E PROPORÇÃO ---
-            html.Div(
-                id='graph-column-container', 
-                children=[
-                    dcc.Graph(
-                        id='grafico-matriz', 
-                        config={'displayModeBar': False},
-                        style={'width': '100%', 'height': '100%'} # Gráfico preenche o contêiner
-                    )
-                ], 
-                style={
-                    'width': '50%', 
-                    'minWidth': f'{GRAPH_CONTAINER_MIN_WIDTH}px',
-                    'maxWidth': f'{GRAPH_CONTAINER_MAX_WIDTH}px',
-                    'aspectRatio': str(TARGET_ASPECT_RATIO), 
-                    'margin': '0 auto', 
-                    'overflow': 'hidden', 
-                    'padding': '0 10px 0 5px', 
-                    'display': 'flex', 
-                    'flexDirection': 'column'
-                }
-            ),
-            # --- FIM DOS AJUSTES NA COLUNA DO GRÁFICO ---
-
-            # Coluna 3: Área da Imagem de Explicação
-            html.Div([
-                (html.Img(src=f"data:image/png;base64,{encoded_image_explicacao}",
-                          style={'maxWidth': '100%', 'height': 'auto', 'display': 'block', 'marginTop': '30px'})
-                 if encoded_image_explicacao
-                 else dmc.Text("Imagem 'explicacao.png' não encontrada.", c="red", ta="center", mt="xl"))
-            ], style={
-                'width': '30%', 
-                'minWidth': '200px', # Adicionado minWidth
-                'padding': '0 40px 0 20px',
-                'display': 'flex',
-                'alignItems': 'flex-start',
-                'justifyContent': 'center'
-            })
-        ], style={
-            'display': 'flex',
-            'flexDirection': 'row',
-            'alignItems': 'flex-start',
-            'flexWrap': 'nowrap' # Para garantir que as colunas não quebrem linha prematuramente
-        })
-    ], fluid=True, px="xl")
-
-# ==== Layout da Página de Nota Técnica ====
-def create_layout_nota_tecnica():
-    texto_da_nota = """
-    A **Matriz GE** é uma ferramenta de **análise estratégica** desenvolvida para ajudar empresas a **avaliar o portfólio de produtos**. Ela foi criada pela consultoria McKinsey em parceria com a General Electric como uma **evolução da Matriz BCG**. É composta por uma **grade 3x3** (nove quadrantes), que avalia cada produto com base em dois critérios principais:
-
-    &nbsp;
-
-    1. **Atratividade de Mercado** (eixo vertical):
-
-        • Avalia o quão atraente é o mercado para este produto.
-        
-        • Fatores considerados: tamanho de mercado, crescimento de mercado, vulnerabilidade de mercado e volume de concorrentes.
-
-    2. **Posição Competitiva** (eixo horizontal):
-
-        • Mede o quão bem-posicionado o produto está em relação ao mercado.
-
-        • Fatores considerados: faturamento, satisfação de clientes, capacidade de oferta e facilidade de adesão.
-
-        &nbsp;
-
-    Esses dois eixos são divididos em **baixo**, **médio** e **alto**, gerando nove zonas diferentes.
-
-    &nbsp;
-
-    • **Investir / Crescer (zona superior direita)**:
-        • Alta atratividade + alta força competitiva.
-        • Estratégia: expandir, alocar recursos, inovar.
-
-    • **Selecionar / Manter (zonas centrais)**:
-        • Atração e força competitiva medianas.
-        • Estratégia: manter o desempenho atual, avaliar oportunidades com cautela.
-
-    • **Desinvestir / Colher (zona inferior esquerda)**:
-        • Baixa atratividade + baixa força competitiva.
-        • Estratégia: reduzir investimentos, sair do mercado.
-
-    &nbsp;
-    
-    Para os itens de análise interna foram considerados os semestres 2024.1, 2024.2 e 2025.1. Os intervalos de classificação são:
-
-    **Faturamento**
-
-    Nota 1: até R$ 100.000,00
-
-    Nota 2: até R$ 250.000,00
-
-    Nota 3: até R$ 350.000,00
-
-    Nota 4: até R$ 700.000,00
-
-    Nota 5: acima de R$ 700.000,00
-
-    **Satisfação**
-
-    Nota 1: NPS até 20%
-
-    Nota 2: NPS entre 21% e 40%
-
-    Nota 3: NPS entre 41% e 60%
-
-    Nota 4: NPS entre 61% e 80%
-
-    Nota 5: NPS acima de 81%
-
-    **Capacidade de Oferta (execução do planejamento)**
-
-    Nota 1: Menor ou igual que 50%
-
-    Nota 2: Maior que 50% e menor ou igual que 70%
-
-    Nota 3: Maior que 70% e menor ou igual que 80%
-
-    Nota 4: Maior que 80% e menor ou igual que 90%
-
-    Nota 5: Maior que 90%
-
-    **Facilidade de Adesão (fechamento de turmas)**
-
-    Nota 1: Maior que 120 dias
-
-    Nota 2: Maior que 100 dias e menor ou igual que 120 dias
-
-    Nota 3: Maior que 80 dias e menor ou igual que 100 dias
-
-    Nota 4: Maior que 60 dias e menor ou igual que 80 dias
-
-    Nota 5: Menor ou igual que 60 dias
-
-    **Tamanho de Mercado (estoque de empregos)**
-
-    Nota 1: Saldo menor ou igual a 500
-
-    Nota 2: Saldo maior que 500 e menor ou igual a 1000
-
-    Nota 3: Saldo maior que 1000 e menor ou igual a 2000
-
-    Nota 4: Saldo maior que 2000 e menor ou igual a 3000
-
-    Nota 5: Saldo maior que 3000
-
-    **Crescimento de Mercado (produto entre o estoque de empregos e o mapa do trabalho)**
-
-    Nota 1: Resultado menor ou igual a 20000
-
-    Nota 2: Resultado maior que 20000 e menor ou igual a 40000
-
-    Nota 3: Resultado maior que 40000 e menor ou igual a 60000
-
-    Nota 4: Resultado maior que 60000 e menor ou igual a 80000
-
-    Nota 5: Saldo maior que 80000
-
-    **Vulnerabilidade (sensibilidade aos fatores externos – análise PESTEL)**
-
-    Nota 5: cenário muito favorável
-
-    Nota 4: cenário favorável
-
-    Nota 3: cenário neutro
-
-    Nota 2: cenário desfavorável
-
-    Nota 1: cenário muito desfavorável
-
-    **Volume de Concorrentes**
-
-    Nota 5: nenhum concorrente relevante
-
-    Nota 4: há concorrentes, mas nenhum relevante
-
-    Nota 3: há concorrentes, mas somente 1 é relevante
-
-    Nota 2: há concorrentes e 2 são relevantes
-
-    nota 1: há 3 ou mais concorrentes relevantes
-    """
-    return dmc.Container([
-        dmc.Title("📄 Nota Técnica", order=2, ta="center", my="lg"),
-        dmc.Paper(
-            shadow="xs",
-            p="xl",
-            children=[
-                dcc.Markdown(texto_da_nota, dangerously_allow_html=False)
-            ]
-        )
-    ], fluid=True, px="xl")
-
-# ==== Layout Principal da Aplicação (com Navegação e Switch no Header) ====
-app.layout = dmc.MantineProvider(
-    id="mantine-provider",
-    forceColorScheme="light", 
-    children=[
-        dcc.Location(id='url', refresh=False),
-        dmc.Paper(
-            shadow="xs", p="sm", withBorder=True, style={"marginBottom": "20px"},
-            children=[
-                dmc.Group(
-                    justify="space-between", align="center",
-                    children=[
-                        dmc.Group(
-                            gap="xl",
-                            children=[
-                                dmc.Anchor(dmc.Text("📊 Matriz GE", fw=500, size="lg"), href="/"),
-                                dmc.Anchor(dmc.Text("📄 Nota Técnica", fw=500, size="lg"), href="/nota-tecnica"),
-                            ]
-                        ),
-                        dmc.Switch(
-                            id="dark-mode-switch", size="md", checked=False,
-                            offLabel=DashIconify(icon="radix-icons:sun", width=18),
-                            onLabel=DashIconify(icon="radix-icons:moon", width=18)
-                        ),
-                    ]
-                )
-            ]
-        ),
-        html.Div(id='page-content', style={"padding": "0 20px 20px 20px"})
-    ]
-)
-
-# ==== Callback para Atualizar o Conteúdo da Página com Base na URL ====
-@app.callback(Output('page-content', 'children'),
-              [Input('url', 'pathname')])
-def display_page(pathname):
-    if pathname == '/nota-tecnica':
-        return create_layout_nota_tecnica()
-    elif pathname == '/': 
-        return create_layout_matriz_ge()
-    else:
-        return dmc.Center(dmc.Text("Página não encontrada (404)", size="xl", c="red"), style={"height": "50vh"})
-
-# ==== Callback para Alternar Modo Escuro ====
-@app.callback(
-    Output('mantine-provider', 'forceColorScheme'),
-    Input('dark-mode-switch', 'checked'),
-    prevent_initial_call=True
-)
-def toggle_dark_mode(checked):
-    return 'dark' if checked else 'light'
-
-
-# ==== Callback para Atualizar Filtros e Gráfico ====
-@app.callback(
-    [Output('filtro-area', 'children', allow_duplicate=True), Output('filtro-quadrante', 'children', allow_duplicate=True), Output('filtro-produto', 'children', allow_duplicate=True),
-     Output('grafico-matriz', 'figure', allow_duplicate=True),
-     Output('filtro-area', 'value', allow_duplicate=True), Output('filtro-quadrante', 'value', allow_duplicate=True), Output('filtro-produto', 'value', allow_duplicate=True),
-     Output('botao-popover-area', 'children', allow_duplicate=True), Output('botao-popover-quadrante', 'children', allow_duplicate=True), Output('botao-popover-produto', 'children', allow_duplicate=True)],
-    [Input('filtro-area', 'value'),
-     Input('filtro-quadrante', 'value'),
-     Input('filtro-produto', 'value'),
-     Input('exibir-texto', 'checked'),
-     Input('botao-reset', 'n_clicks'),
-     Input('url', 'pathname'),
-     Input('dark-mode-switch', 'checked')],
-    prevent_initial_call='initial_duplicate'
-)
-def atualizar_tudo(selected_areas, selected_quadrantes, selected_produtos,
-                   exibir_texto, reset_n_clicks, pathname,
-                   dark_mode_checked):
-
-    if pathname != '/':
-        empty_fig = go.Figure()
-        axis_font_color_empty_fig = 'white' if dark_mode_checked else '#333'
-        empty_fig.update_layout(
-            xaxis_visible=False, yaxis_visible=False,
-            annotations=[dict(text="Navegue para a página da Matriz GE para visualizar os dados.", 
-                              xref="paper", yref="paper", x=0.5, y=0.5, showarrow=False, 
-                              font=dict(size=16, color=axis_font_color_empty_fig))],
-            paper_bgcolor='rgba(0,0,0,0)', 
-            plot_bgcolor='rgba(0,0,0,0)'
-        )
-        
-        texto_botao_area = html.Div([html.Div("Selecionar área", style={"flexGrow": 1, "whiteSpace": "nowrap", "overflow": "hidden", "textOverflow": "ellipsis", "textAlign": "left", "paddingRight": "8px"}), html.Div("▼", style={"flexShrink": 0, "minWidth": "16px", "textAlign": "right"})], style={"width": "100%", "display": "flex", "alignItems": "center"})
-        texto_botao_quadrante = html.Div([html.Div("Selecionar quadrante", style={"flexGrow": 1, "whiteSpace": "nowrap", "overflow": "hidden", "textOverflow": "ellipsis", "textAlign": "left", "paddingRight": "8px"}), html.Div("▼", style={"flexShrink": 0, "minWidth": "16px", "textAlign": "right"})], style={"width": "100%", "display": "flex", "alignItems": "center"})
-        texto_botao_produto = html.Div([html.Div("Selecionar produto", style={"flexGrow": 1, "whiteSpace": "nowrap", "overflow": "hidden", "textOverflow": "ellipsis", "textAlign": "left", "paddingRight": "8px"}), html.Div("▼", style={"flexShrink": 0, "minWidth": "16px", "textAlign": "right"})], style={"width": "100%", "display": "flex", "alignItems": "center"})
-        return ([], [], [], empty_fig, [], [], [], texto_botao_area, texto_botao_quadrante, texto_botao_produto)
-
-
-    triggered_input_obj = callback_context.triggered[0] if callback_context.triggered else None
-    triggered_input = triggered_input_obj['prop_id'].split('.')[0] if triggered_input_obj else None
-
-    areas_val = selected_areas if selected_areas is not None else []
-    quadrantes_val = selected_quadrantes if selected_quadrantes is not None else []
-    produtos_val = selected_produtos if selected_produtos is not None else []
-
-    fixed_cor_bolha = "#FFFFFF" 
-    fixed_transparencia_percent = 55
-    min_bubble_size_pref = 1
-    target_max_bubble_size_pref = 150
-
-    df_plot = df.copy()
-    df_options_source = df.copy()
-
-    if triggered_input == "botao-reset":
-        areas_val, quadrantes_val, produtos_val = [], [], []
-    else:
-        if areas_val: df_plot = df_plot[df_plot['Grande Área'].isin(areas_val)]
-        if quadrantes_val: df_plot = df_plot[df_plot['Quadrante'].isin(quadrantes_val)]
-        if produtos_val: df_plot = df_plot[df_plot['Produto'].isin(produtos_val)]
-
-    df_temp_area_opts = df_options_source.copy();
-    if quadrantes_val: df_temp_area_opts = df_temp_area_opts[df_temp_area_opts['Quadrante'].isin(quadrantes_val)]
-    if produtos_val: df_temp_area_opts = df_temp_area_opts[df_temp_area_opts['Produto'].isin(produtos_val)]
-    unique_areas = sorted(df_temp_area_opts["Grande Área"].dropna().unique()) if "Grande Área" in df_temp_area_opts else []
-    children_areas = [dmc.Checkbox(label=str(i), value=i, styles={"labelWrapper": {"width": "100%"}}) for i in unique_areas]
-
-    df_temp_quad_opts = df_options_source.copy();
-    if areas_val: df_temp_quad_opts = df_temp_quad_opts[df_temp_quad_opts['Grande Área'].isin(areas_val)]
-    if produtos_val: df_temp_quad_opts = df_temp_quad_opts[df_temp_quad_opts['Produto'].isin(produtos_val)]
-    unique_quadrantes = sorted(df_temp_quad_opts["Quadrante"].dropna().unique()) if "Quadrante" in df_temp_quad_opts else []
-    children_quadrantes = [dmc.Checkbox(label=str(i), value=i, styles={"labelWrapper": {"width": "100%"}}) for i in unique_quadrantes]
-
-    df_temp_prod_opts = df_options_source.copy();
-    if areas_val: df_temp_prod_opts = df_temp_prod_opts[df_temp_prod_opts['Grande Área'].isin(areas_val)]
-    if quadrantes_val: df_temp_prod_opts = df_temp_prod_opts[df_temp_prod_opts['Quadrante'].isin(quadrantes_val)]
-    unique_produtos = sorted(df_temp_prod_opts["Produto"].dropna().unique()) if "Produto" in df_temp_prod_opts else []
-    children_produtos = [dmc.Checkbox(label=str(i), value=i, styles={"labelWrapper": {"width": "100%"}}) for i in unique_produtos]
-
-    def get_button_children(selected_vals, default_single_text):
-        base_style_text = {"flexGrow": 1, "whiteSpace": "nowrap", "overflow": "hidden", "textOverflow": "ellipsis", "textAlign": "left", "paddingRight": "8px"}
-        base_style_arrow = {"flexShrink": 0, "minWidth": "16px", "textAlign": "right"}
-        container_style = {"width": "100%", "display": "flex", "alignItems": "center"}
-
-        if not selected_vals:
-            text_content = f"Selecionar {default_single_text.lower()}"
-        elif len(selected_vals) == 1:
-            txt = str(selected_vals[0])
-            max_l = 25 
-            text_content = txt if len(txt) <= max_l else txt[:max_l-3] + "..."
-        else:
-            plural_suffix = "s"
-            if default_single_text.lower() == "área": plural_suffix = "s selecionadas"
-            elif default_single_text.lower() == "quadrante": plural_suffix = "s selecionados"
-            elif default_single_text.lower() == "produto": plural_suffix = "s selecionados"
-            else: plural_suffix = f"s selecionad{'as' if default_single_text.endswith('a') else 'os'}"
-            text_content = f"{len(selected_vals)} {default_single_text.lower().replace('ã','a')}{plural_suffix}"
-        return html.Div([ html.Div(text_content, style=base_style_text), html.Div("▼", style=base_style_arrow)], style=container_style)
-
-    texto_botao_area_children = get_button_children(areas_val, "Área")
-    texto_botao_quadrante_children = get_button_children(quadrantes_val, "Quadrante")
-    texto_botao_produto_children = get_button_children(produtos_val, "Produto")
-
-    fig = go.Figure()
-    cols_for_plot = ["Hora Aluno", "Quadrante", "Posição Competitiva", "Atratividade Mercado", "Produto"]
-    for col_plot in cols_for_plot:
-        if col_plot not in df_plot.columns:
-            if col_plot == "Hora Aluno": df_plot[col_plot] = 1.0
-            elif col_plot in ["Posição Competitiva", "Atratividade Mercado"]: df_plot[col_plot] = pd.NA
-            else: df_plot[col_plot] = pd.Series(dtype='object')
-
-    max_hora_aluno = df_plot["Hora Aluno"].max() if not (df_plot.empty or df_plot["Hora Aluno"].isnull().all() or "Hora Aluno" not in df_plot.columns) else 1.0
-    if pd.isna(max_hora_aluno): max_hora_aluno = 1.0
-
-    fator_escala = max_hora_aluno / target_max_bubble_size_pref if pd.notna(max_hora_aluno) and max_hora_aluno > 0 else 1.0
-    if fator_escala == 0: fator_escala = 1.0
-
-    if not df_plot.empty and "Quadrante" in df_plot.columns:
-        for quadrante_unico in df_plot["Quadrante"].dropna().unique():
-            df_q = df_plot[df_plot["Quadrante"] == quadrante_unico].copy()
-            if not df_q.empty and all(col in df_q.columns for col in cols_for_plot):
-                df_q["Produto_Formatado"] = df_q["Produto"].astype(str).str.replace("TÉCNICO EM ", "TÉCNICO EM<br>", regex=False)
-                posicoes_texto = []
-                for _, row in df_q.iterrows():
-                    x_pv, y_am = row["Posição Competitiva"], row["Atratividade Mercado"]
-                    pos = "middle center" # Padrão
-                    if pd.notna(x_pv) and pd.notna(y_am):
-                        # Lógica de posicionamento do texto para evitar sobreposição com a bolha
-                        # Vertical: top, middle, bottom. Horizontal: left, center, right.
-                        # O texto é posicionado em relação ao *centro* do marcador.
-                        pos_y, pos_x = "middle", "center"
-
-                        if y_am < 2.5: pos_y = "top"       # Bolha em baixo, texto em cima
-                        elif y_am > 7.5: pos_y = "bottom"    # Bolha em cima, texto em baixo
-                        
-                        if x_pv < 2.5: pos_x = "right"     # Bolha à esquerda, texto à direita
-                        elif x_pv > 7.5: pos_x = "left"      # Bolha à direita, texto à esquerda
-                        
-                        # Se estiver centralizado em um eixo, ajustar o outro para não ficar sobre a bolha
-                        if pos_y == "middle" and pos_x == "center":
-                            if x_pv > 5: pos_x = "left" # Default para direita do centro da bolha
-                            else: pos_x = "right"      # Default para esquerda do centro da bolha
-                        
-                        pos = f"{pos_y} {pos_x}".strip() # Remove espaços extras se um for 'middle' ou 'center' por padrão
-
-                    posicoes_texto.append(pos)
-                df_q["posicao_texto_calculada"] = posicoes_texto
-                df_q["marker_size_calculada"] = (df_q["Hora Aluno"] / fator_escala).apply(lambda s: max(s if pd.notna(s) else 0, min_bubble_size_pref))
-
-                fig.add_trace(go.Scatter(
-                    x=df_q["Posição Competitiva"], y=df_q["Atratividade Mercado"],
-                    mode="markers+text" if exibir_texto else "markers", name=str(quadrante_unico if pd.notna(quadrante_unico) else "N/A"),
-                    marker=dict(size=df_q["marker_size_calculada"], color=fixed_cor_bolha, opacity=max(0, min(1, (100 - fixed_transparencia_percent) / 100.0))),
-                    text=df_q["Produto_Formatado"] if exibir_texto else None, textposition=df_q["posicao_texto_calculada"] if exibir_texto else None,
-                    textfont=dict(
-                        color='white' if dark_mode_checked else 'black',
-                        size=14, family="Bahnschrift, Arial, sans-serif"
-                    ),
-                    customdata=df_q['Produto'],
-                    hovertemplate="<b>%{customdata}</b><br><b>Posição Competitiva:</b> %{x:.1f}<br><b>Atratividade:</b> %{y:.1f}<extra></extra>"
-                ))
-
-    if encoded_image_fundo:
-        fig.add_layout_image(dict(source="data:image/png;base64," + encoded_image_fundo, xref="x domain", yref="y domain", x=0, y=1, sizex=1, sizey=1, sizing="stretch", opacity=1, layer="below"))
-
-    axis_font_color = 'white' if dark_mode_checked else '#333'
-    axis_tick_color = '#777' if dark_mode_checked else 'grey'
-    axis_line_color = '#555' if dark_mode_checked else 'lightgrey'
-
-    fig.update_layout(
-        autosize=True, 
-        xaxis=dict(
-            range=[0, 10], autorange=False, fixedrange=True,
-            title=dict(text="<b>Posição Competitiva</b>", font=dict(size=17, color=axis_font_color)),
-            tickfont=dict(size=14, color=axis_font_color),
-            showgrid=False, zeroline=False, tickmode="linear", tick0=0, dtick=1, ticks="outside", ticklen=6, tickwidth=1,
-            tickcolor=axis_tick_color, linecolor=axis_line_color
-        ),
-        yaxis=dict(
-            range=[0, 10], autorange=False, fixedrange=True,
-            title=dict(text="<b>Atratividade de Mercado</b>", font=dict(size=17, color=axis_font_color)),
-            tickfont=dict(size=14, color=axis_font_color),
-            scaleanchor="x", scaleratio=(IMAGE_ORIGINAL_HEIGHT / IMAGE_ORIGINAL_WIDTH) if IMAGE_ORIGINAL_WIDTH !=0 else 1,
-            showgrid=False, zeroline=False, tickmode="linear", tick0=0, dtick=1, ticks="outside", ticklen=6, tickwidth=1,
-            tickcolor=axis_tick_color, linecolor=axis_line_color
-        ),
-        plot_bgcolor='rgba(0,0,0,0)', 
-        paper_bgcolor='rgba(0,0,0,0)', 
-        showlegend=False,
-        margin=dict(l=60, r=30, t=30, b=60),
-        hovermode="closest"
-    )
-    if df_plot.empty and (bool(areas_val) or bool(quadrantes_val) or bool(produtos_val)):
-        fig.update_layout(
-            xaxis_visible=False, yaxis_visible=False,
-            annotations=[dict(
-                text="Nenhum curso para os filtros.", xref="paper", yref="paper", x=0.5, y=0.5,
-                showarrow=False, font=dict(size=16, color=axis_font_color) 
-            )]
-        )
-    return (children_areas, children_quadrantes, children_produtos, fig, areas_val, quadrantes_val, produtos_val, texto_botao_area_children, texto_botao_quadrante_children, texto_botao_produto_children)
-
-# ==== Callback para Baixar Gráfico ====
-@app.callback(
-    Output("download-imagem", "data"),
-    Input("botao-download", "n_clicks"),
-    State("grafico-matriz", "figure"),
-    prevent_initial_call=True
-)
-def baixar_grafico(n_clicks, current_figure_dict):
-    if n_clicks and current_figure_dict and current_figure_dict.get('data'):
-        fig_to_download = go.Figure(current_figure_dict)
-        
-        fig_layout = current_figure_dict.get('layout', {})
-        export_width = IMAGE_ORIGINAL_WIDTH
-        export_height = IMAGE_ORIGINAL_HEIGHT
-
-        if not fig_to_download.data or not encoded_image_fundo:
-            on_screen_width = fig_layout.get('width')
-            on_screen_height = fig_layout.get('height')
-            if not isinstance(on_screen_width, (int, float)) or on_screen_width <= 0: on_screen_width = 800
-            if not isinstance(on_screen_height, (int, float)) or on_screen_height <= 0:
-                on_screen_height = int(on_screen_width / TARGET_ASPECT_RATIO) if TARGET_ASPECT_RATIO != 0 else int(on_screen_width * (IMAGE_ORIGINAL_HEIGHT / (IMAGE_ORIGINAL_WIDTH if IMAGE_ORIGINAL_WIDTH != 0 else 1)))
-            
-            export_width = int(on_screen_width) if on_screen_width and on_screen_width > 0 else 800
-            export_height = int(on_screen_height) if on_screen_height and on_screen_height > 0 else 600
-            
-        fig_to_download.update_layout(paper_bgcolor='white', plot_bgcolor='white')
-
-        img_bytes = fig_to_download.to_image(
-            format="png", width=export_width, height=export_height, scale=1
-        )
-        return dcc.send_bytes(img_bytes, "matriz_ge_app.png")
-    return dash.no_update
-
-
-if __name__ == '__main__':
-    app.run(debug=True)
+import time
+_INICIO_BOOT = time.perf_counter()  # antes dos outros imports, para o relatório de inicialização incluí-los
+import dash
+import flask
+from dash import dcc, html, Input, Output, State, callback_context
+import dash_mantine_components as dmc
+from dash_iconify import DashIconify # Importação necessária
+import plotly
+import plotly.graph_objects as go
+import pandas as pd
+import numpy as np
+import io
+import atexit
+import base64
+import bisect
+import collections
+import contextlib
+import contextvars
+import cProfile
+import concurrent.futures
+import copy
+import functools
+import gzip
+import hashlib
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import struct
+import tempfile
+import threading
+import unicodedata
+import urllib.parse
+import weakref
+import zipfile
+
+# ==== Relatório de Inicialização ====
+# Tempo de cada etapa do import do módulo (imports, dados, imagens, app/layout, callbacks). É impresso
+# no fim do boot e exposto em /metrics, para acompanhar regressões. Com o "--preload" do Procfile,
+# tudo isto roda uma vez no mestre do gunicorn e os workers já nascem prontos.
+TEMPOS_BOOT = collections.OrderedDict()
+_ultimo_marco_boot = _INICIO_BOOT
+
+def marcar_etapa_boot(etapa):
+    global _ultimo_marco_boot
+    agora = time.perf_counter()
+    TEMPOS_BOOT[etapa] = agora - _ultimo_marco_boot
+    _ultimo_marco_boot = agora
+
+marcar_etapa_boot("imports")
+
+# ==== Define o diretório base do script para caminhos de arquivo robustos ====
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ==== Constantes Globais para Dimensões da Imagem ====
+IMAGE_ORIGINAL_WIDTH = 1705
+IMAGE_ORIGINAL_HEIGHT = 1650
+TARGET_ASPECT_RATIO = IMAGE_ORIGINAL_WIDTH / IMAGE_ORIGINAL_HEIGHT if IMAGE_ORIGINAL_HEIGHT != 0 else 16/9 # Largura / Altura
+
+# ==== Constantes para Dimensionamento Responsivo do Gráfico ====
+GRAPH_CONTAINER_MIN_WIDTH = 400  # px, Largura mínima para o contêiner do gráfico
+GRAPH_CONTAINER_MAX_WIDTH = 850  # px, Largura máxima para o contêiner do gráfico (ajuste se necessário)
+
+# ==== Carregar Dados ====
+arquivo_excel = os.path.join(BASE_DIR, 'Matriz GE - EP.xlsx')
+arquivo_imagem_fundo = os.path.join(BASE_DIR, 'Fundo GE.png')
+arquivo_imagem_explicacao = os.path.join(BASE_DIR, 'explicacao.png')
+
+COLUNAS_ANALISE = [
+    "Ignorar", "Modalidade", "Grande Área", "Produto", "Hora Aluno",
+    "Faturamento", "Satisfação", "Capacidade de Oferta", "Facilidade de Adesão", "Posição Competitiva",
+    "Tamanho Mercado", "Crescimento Mercado", "Vulnerabilidade", "Concorrentes", "Atratividade Mercado",
+    "Quadrante"
+]
+
+# ==== Motor de Pontuação (faixas da Nota Técnica) ====
+# As faixas da Nota Técnica, codificadas como dados. Cada indicador bruto vira uma nota de 1 a 5
+# (0 = sem dado) e os eixos seguem a fórmula da planilha: média ponderada das notas válidas × 2,
+# numa escala de 0 a 10. Vulnerabilidade e Concorrentes chegam como nível de risco (1 a 5) e entram
+# invertidos (6 - nível), como na coluna "VALOR FINAL2" do Excel. Tudo é calculado em lote com NumPy.
+FaixasIndicador = collections.namedtuple("FaixasIndicador", ["eixo", "limites", "decrescente", "invertido", "peso"])
+
+EIXO_POSICAO = "Posição Competitiva"
+EIXO_ATRATIVIDADE = "Atratividade Mercado"
+
+INDICADORES_GE = {
+    # Limites "até X" (inclusivos). Faturamento em R$; Satisfação (NPS) e Capacidade de Oferta em %
+    "Faturamento": FaixasIndicador(EIXO_POSICAO, (100_000, 250_000, 350_000, 700_000), False, False, 0.25),
+    "Satisfação": FaixasIndicador(EIXO_POSICAO, (20, 40, 60, 80), False, False, 0.25),
+    "Capacidade de Oferta": FaixasIndicador(EIXO_POSICAO, (50, 70, 80, 90), False, False, 0.25),
+    # Dias para fechar turma: quanto menos, melhor
+    "Facilidade de Adesão": FaixasIndicador(EIXO_POSICAO, (60, 80, 100, 120), True, False, 0.25),
+    # Estoque de empregos e produto estoque × mapa do trabalho
+    "Tamanho Mercado": FaixasIndicador(EIXO_ATRATIVIDADE, (500, 1000, 2000, 3000), False, False, 0.25),
+    "Crescimento Mercado": FaixasIndicador(EIXO_ATRATIVIDADE, (20_000, 40_000, 60_000, 80_000), False, False, 0.25),
+    # Qualitativos (PESTEL e concorrência): já chegam como nível de 1 a 5, sem faixas
+    "Vulnerabilidade": FaixasIndicador(EIXO_ATRATIVIDADE, None, False, True, 0.25),
+    "Concorrentes": FaixasIndicador(EIXO_ATRATIVIDADE, None, False, True, 0.25),
+}
+
+# Eixos: até 3,33 é baixo, até 6,66 é médio, acima disso é alto (mesmos cortes da coluna QUADRANTES)
+LIMITES_EIXOS = (3.33, 6.66)
+# Rótulos por [faixa da atratividade][faixa da posição], com o texto exato gerado pela planilha
+QUADRANTES_MATRIZ = np.array([
+    ["4. Zona de Perigo: Colher ou desinvestir", "2. Expansão Limitada ou Colheita", "3. Investimento Seletivo/Cauteloso"],
+    ["2. Expansão Limitada ou Colheita", "3. Investimento Seletivo/Cauteloso", "4. Investimento Seguro e Crescimento"],
+    ["3. Investimento Seletivo/Cauteloso", "4. Investimento Seguro e Crescimento", "5. Investimento Prioritário"],
+], dtype=object)
+
+def notas_indicador(indicador, valores):
+    """Converte valores brutos de um indicador em notas 0-5 (int8); vazio/NaN vira 0 (sem dado)."""
+    faixas = INDICADORES_GE[indicador]
+    valores = pd.to_numeric(pd.Series(valores), errors="coerce").to_numpy(dtype=float)
+    validos = ~np.isnan(valores)
+    if faixas.limites is None:
+        notas = np.clip(np.rint(np.nan_to_num(valores)), 0, 5)
+    else:
+        # searchsorted com side="left" deixa o limite na faixa de baixo ("até X")
+        posicao = np.searchsorted(np.asarray(faixas.limites, dtype=float), valores, side="left")
+        notas = 5 - posicao if faixas.decrescente else 1 + posicao
+    return np.where(validos, notas, 0).astype(np.int8)
+
+def calcular_eixo(notas_por_indicador, eixo):
+    """Média ponderada das notas válidas (> 0) de um eixo, × 2 (escala 0-10; NaN se não há nenhuma)."""
+    # float64 (e não int): um eixo sem nenhum indicador presente dá NaN em vez de ZeroDivisionError
+    soma = peso_total = np.float64(0)
+    for indicador, faixas in INDICADORES_GE.items():
+        if faixas.eixo != eixo or indicador not in notas_por_indicador:
+            continue
+        notas = np.nan_to_num(np.asarray(notas_por_indicador[indicador], dtype=float))
+        validas = notas > 0
+        if faixas.invertido:
+            notas = 6 - notas
+        soma = soma + np.where(validas, notas * 2, 0) * faixas.peso
+        peso_total = peso_total + validas * faixas.peso
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Sem nenhuma nota válida o eixo fica vazio (o produto não é desenhado), não vai para o 0
+        return np.where(np.asarray(peso_total) > 0, soma / peso_total, np.nan)
+
+def celulas_eixos(posicao, atratividade):
+    """Célula da matriz (3 x faixa da atratividade + faixa da posição, a ordem de QUADRANTES_MATRIZ.flat)
+    para cada par de eixos; -1 se falta um eixo."""
+    posicao = np.asarray(posicao, dtype=float)
+    atratividade = np.asarray(atratividade, dtype=float)
+    celulas = (np.digitize(atratividade, LIMITES_EIXOS, right=True) * 3
+               + np.digitize(posicao, LIMITES_EIXOS, right=True))
+    return np.where(np.isnan(posicao) | np.isnan(atratividade), -1, celulas).astype(np.int8)
+
+def classificar_quadrante(posicao, atratividade):
+    """Rótulo do quadrante 3x3 para cada par (posição competitiva, atratividade); None se falta um eixo."""
+    celulas = celulas_eixos(posicao, atratividade)
+    return np.where(celulas >= 0, QUADRANTES_MATRIZ.ravel()[celulas], None)
+
+def pontuar_portfolio(df_bruto):
+    """Pontua um portfólio inteiro a partir das colunas brutas dos indicadores.
+
+    Devolve um DataFrame com as notas (mesmos nomes de coluna da aba "Análise"), os dois eixos e o
+    quadrante. Indicadores ausentes são tratados como "sem dado" e não pesam na média do eixo.
+    """
+    notas = {indicador: notas_indicador(indicador, df_bruto[indicador])
+             for indicador in INDICADORES_GE if indicador in df_bruto.columns}
+    resultado = pd.DataFrame(notas, index=df_bruto.index)
+    resultado[EIXO_POSICAO] = calcular_eixo(notas, EIXO_POSICAO)
+    resultado[EIXO_ATRATIVIDADE] = calcular_eixo(notas, EIXO_ATRATIVIDADE)
+    resultado["Quadrante"] = classificar_quadrante(resultado[EIXO_POSICAO].to_numpy(),
+                                                   resultado[EIXO_ATRATIVIDADE].to_numpy())
+    return resultado
+
+def completar_eixos(df_analise):
+    """Preenche eixos/quadrante vazios a partir das notas já presentes na aba (valores da planilha ficam)."""
+    notas = {indicador: pd.to_numeric(df_analise[indicador], errors="coerce").to_numpy()
+             for indicador in INDICADORES_GE if indicador in df_analise.columns}
+    if not notas or df_analise.empty:
+        return df_analise
+    for eixo in (EIXO_POSICAO, EIXO_ATRATIVIDADE):
+        vazios = df_analise[eixo].isna()
+        if vazios.any():
+            df_analise.loc[vazios, eixo] = calcular_eixo(notas, eixo)[vazios.to_numpy()]
+    vazios = df_analise["Quadrante"].isna()
+    if vazios.any():
+        rotulos = classificar_quadrante(
+            df_analise[EIXO_POSICAO].to_numpy(), df_analise[EIXO_ATRATIVIDADE].to_numpy())[vazios.to_numpy()]
+        quadrante = df_analise["Quadrante"]
+        if isinstance(quadrante.dtype, pd.CategoricalDtype):
+            novos = {r for r in rotulos if r is not None} - set(quadrante.cat.categories)
+            quadrante = quadrante.cat.add_categories(sorted(novos))
+        else:
+            # Coluna inteira vazia vem do Excel como float64: passa a texto antes de receber os rótulos
+            quadrante = quadrante.astype(object)
+        quadrante[vazios] = rotulos
+        df_analise["Quadrante"] = quadrante
+    return df_analise
+
+# ==== Leitura em Streaming da Aba "Análise" (openpyxl somente leitura) ====
+# A aba é lida linha a linha no modo read_only do openpyxl, sem montar a planilha nem um DataFrame de
+# objetos na memória. Cada célula é validada na hora (tipo; 0-10 nos eixos, 0-5 nas notas) e vai
+# direto para arrays tipados, fechados em blocos de LEITURA_BLOCO_LINHAS. As colunas de texto saem
+# como categóricas (códigos int32 + valores distintos), que o snapshot compacto usa sem refatorar.
+# Nada é descartado ou corrigido em silêncio:
+# o relatório de leitura tem as contagens exatas por coluna e motivo e o detalhe das primeiras
+# RELATORIO_MAX_OCORRENCIAS ocorrências, então a memória extra não cresce com o tamanho da aba.
+LINHA_INICIAL_ANALISE = 4  # duas linhas de título e o cabeçalho
+LEITURA_BLOCO_LINHAS = 8192
+RELATORIO_MAX_OCORRENCIAS = int(os.environ.get("MATRIZ_GE_RELATORIO_MAX_OCORRENCIAS", "1000"))
+COLUNAS_TEXTO_ANALISE = ("Modalidade", "Grande Área", "Produto", "Quadrante")
+# Intervalo aceito em cada coluna numérica (None = sem limite); fora dele o valor vira "sem dado"
+INTERVALOS_ANALISE = {
+    "Hora Aluno": (0, None), "Posição Competitiva": (0, 10), "Atratividade Mercado": (0, 10),
+    **{indicador: (0, 5) for indicador in INDICADORES_GE},
+}
+HORA_ALUNO_PADRAO = 1.0
+
+class RelatorioLeitura:
+    """Linhas rejeitadas, corrigidas e incompletas na leitura da aba: contagens exatas e as primeiras ocorrências."""
+
+    def __init__(self, arquivo, max_ocorrencias=RELATORIO_MAX_OCORRENCIAS):
+        self.arquivo = arquivo
+        self.max_ocorrencias = max_ocorrencias
+        self.linhas_lidas = self.linhas_vazias = 0
+        self.linhas_por_acao = collections.Counter()
+        self.contagens = collections.Counter()
+        self.ocorrencias = []
+        self._ultima_linha = {}
+
+    @property
+    def linhas_rejeitadas(self):
+        return self.linhas_por_acao["rejeitada"]
+
+    def registrar(self, linha, coluna, valor, acao, motivo):
+        """``acao`` é "rejeitada" (a linha fica de fora), "corrigida" (o valor foi trocado) ou
+        "incompleta" (a linha fica sem eixo e quadrante e não aparece na matriz)."""
+        # As ocorrências de uma linha chegam juntas: basta comparar com a última linha de cada ação
+        if self._ultima_linha.get(acao) != linha:
+            self._ultima_linha[acao] = linha
+            self.linhas_por_acao[acao] += 1
+        self.contagens[(acao, coluna, motivo)] += 1
+        if len(self.ocorrencias) < self.max_ocorrencias:
+            self.ocorrencias.append({"linha": linha, "coluna": coluna, "valor": None if valor is None else str(valor)[:200],
+                                     "acao": acao, "motivo": motivo})
+
+    def como_dict(self):
+        total = sum(self.contagens.values())
+        return {
+            "arquivo": os.path.basename(self.arquivo),
+            "linhas_lidas": self.linhas_lidas, "linhas_vazias": self.linhas_vazias,
+            "linhas_aceitas": self.linhas_lidas - self.linhas_rejeitadas,
+            "linhas_rejeitadas": self.linhas_rejeitadas, "linhas_corrigidas": self.linhas_por_acao["corrigida"],
+            "linhas_incompletas": self.linhas_por_acao["incompleta"],
+            "contagens": [{"acao": acao, "coluna": coluna, "motivo": motivo, "ocorrencias": n}
+                          for (acao, coluna, motivo), n in sorted(self.contagens.items())],
+            "ocorrencias": self.ocorrencias,
+            "ocorrencias_omitidas": total - len(self.ocorrencias),
+        }
+
+class _ColunaNumerica:
+    """Array de ``dtype`` montado em blocos: só o bloco aberto fica como lista do Python."""
+
+    def __init__(self, dtype=np.float64):
+        self.dtype = dtype
+        self.blocos, self.aberto = [], []
+
+    def adicionar(self, valor):
+        self.aberto.append(valor)
+        if len(self.aberto) >= LEITURA_BLOCO_LINHAS:
+            self.blocos.append(np.array(self.aberto, dtype=self.dtype))
+            self.aberto = []
+
+    def array(self):
+        return np.concatenate(self.blocos + [np.array(self.aberto, dtype=self.dtype)])
+
+class _ColunaTexto:
+    """Textos como códigos int32 (em blocos) sobre um dicionário de valores distintos; -1 = vazio."""
+
+    def __init__(self):
+        self.codigos_valor = {}
+        self.codigos = _ColunaNumerica(np.int32)
+
+    def adicionar(self, valor):
+        self.codigos.adicionar(-1 if valor is None else self.codigos_valor.setdefault(valor, len(self.codigos_valor)))
+
+    def array(self):
+        """Categórica com as categorias ordenadas, como o snapshot compacto espera (só os códigos são remapeados)."""
+        valores = list(self.codigos_valor)
+        ordem = sorted(range(len(valores)), key=valores.__getitem__)
+        # Código antigo -> novo; a última posição recebe o -1 (vazio) e o mantém
+        novos = np.full(len(valores) + 1, -1, dtype=np.int32)
+        novos[ordem] = np.arange(len(valores), dtype=np.int32)
+        return pd.Categorical.from_codes(novos[self.codigos.array()], categories=[valores[i] for i in ordem],
+                                         validate=False)
+
+def _ler_numero(valor):
+    """(número, motivo): motivo é None quando o valor já era número (ou vazio, que vira NaN)."""
+    if valor is None:
+        return math.nan, None
+    if type(valor) in (int, float):
+        return (float(valor), None) if math.isfinite(valor) else (math.nan, "valor não numérico")
+    if isinstance(valor, str):
+        texto = valor.strip()
+        if not texto:
+            return math.nan, None
+        try:
+            numero = float(texto.replace(",", "."))
+        except ValueError:
+            return math.nan, "valor não numérico"
+        return (numero, "número gravado como texto") if math.isfinite(numero) else (math.nan, "valor não numérico")
+    # Datas, booleanos, erros de fórmula...
+    return math.nan, "valor não numérico"
+
+def ler_analise_streaming(caminho_excel):
+    """Lê a aba 'Análise' linha a linha e devolve ``(df_limpo, relatorio)``.
+
+    Linhas sem Produto são rejeitadas; valores de tipo errado ou fora do intervalo viram "sem dado"
+    (eixos vazios são recalculados pelas notas, e ficam vazios se não há nenhuma) e a Hora Aluno
+    inválida ou vazia vira 1. Tudo isso fica registrado no ``RelatorioLeitura``.
+    """
+    import openpyxl  # só é preciso quando o cache colunar não serve
+
+    relatorio = RelatorioLeitura(caminho_excel)
+    colunas = [c for c in COLUNAS_ANALISE if c != "Ignorar"]
+    arrays = {c: _ColunaTexto() if c in COLUNAS_TEXTO_ANALISE else _ColunaNumerica() for c in colunas}
+    linhas_excel = _ColunaNumerica(np.int32)
+    try:
+        livro = openpyxl.load_workbook(caminho_excel, read_only=True, data_only=True)
+    except FileNotFoundError:
+        print(f"Erro: O arquivo Excel '{caminho_excel}' não foi encontrado.")
+    else:
+        try:
+            _ler_linhas_analise(livro["Análise"], arrays, linhas_excel, relatorio)
+        finally:
+            livro.close()
+    df_lido = completar_eixos(pd.DataFrame({c: arrays[c].array() for c in colunas}, columns=colunas))
+    # Eixo vazio na planilha e sem nenhuma nota para calculá-lo: a linha fica fora da matriz
+    sem_eixo = df_lido[[EIXO_POSICAO, EIXO_ATRATIVIDADE]].isna().to_numpy()
+    numeros = linhas_excel.array()
+    for i in np.flatnonzero(sem_eixo.any(axis=1)):
+        for eixo, vazio in zip((EIXO_POSICAO, EIXO_ATRATIVIDADE), sem_eixo[i]):
+            if vazio:
+                relatorio.registrar(int(numeros[i]), eixo, None, "incompleta", "eixo vazio e sem notas válidas")
+    return df_lido, relatorio
+
+def _ler_linhas_analise(aba, arrays, linhas_excel, relatorio):
+    """Percorre as linhas de dados da aba validando cada célula e alimentando as colunas em ``arrays``."""
+    posicoes = [(COLUNAS_ANALISE.index(c), c, array) for c, array in arrays.items()]
+    posicao_produto = COLUNAS_ANALISE.index("Produto")
+    linhas = aba.iter_rows(min_row=LINHA_INICIAL_ANALISE, max_col=len(COLUNAS_ANALISE), values_only=True)
+    for numero, celulas in enumerate(linhas, start=LINHA_INICIAL_ANALISE):
+        if all(v is None for v in celulas):
+            relatorio.linhas_vazias += 1
+            continue
+        relatorio.linhas_lidas += 1
+        celulas = celulas + (None,) * (len(COLUNAS_ANALISE) - len(celulas))
+        produto = celulas[posicao_produto]
+        if produto is None or (isinstance(produto, str) and not produto.strip()):
+            relatorio.registrar(numero, "Produto", produto, "rejeitada", "produto vazio")
+            continue
+        linhas_excel.adicionar(numero)
+        for posicao, coluna, array in posicoes:
+            valor = celulas[posicao]
+            if coluna in COLUNAS_TEXTO_ANALISE:
+                if valor is not None and not isinstance(valor, str):
+                    relatorio.registrar(numero, coluna, valor, "corrigida", "valor convertido em texto")
+                    valor = str(valor)
+                array.adicionar(valor)
+                continue
+            numero_celula, motivo = _ler_numero(valor)
+            minimo, maximo = INTERVALOS_ANALISE.get(coluna, (None, None))
+            if (minimo is not None and numero_celula < minimo) or (maximo is not None and numero_celula > maximo):
+                motivo = f"fora do intervalo {minimo}–{maximo}" if maximo is not None else f"menor que {minimo}"
+                numero_celula = math.nan
+            if coluna == "Hora Aluno" and math.isnan(numero_celula):
+                numero_celula = HORA_ALUNO_PADRAO
+                motivo = f"{motivo or 'vazio'}; usado {HORA_ALUNO_PADRAO:g}"
+            if motivo is not None:
+                relatorio.registrar(numero, coluna, valor, "corrigida", motivo)
+            array.adicionar(numero_celula)
+
+def _caminho_relatorio(caminho_excel):
+    return os.path.join(CACHE_DIR, f"{_nome_cache(caminho_excel)}.relatorio-leitura.json")
+
+def relatorio_leitura(caminho_excel):
+    """Relatório da última leitura do Excel (dict), ou None se a planilha ainda não foi lida."""
+    try:
+        with open(_caminho_relatorio(caminho_excel), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def ler_planilha_analise(caminho_excel):
+    """Lê a aba 'Análise' do Excel (em streaming, com validação) e grava o relatório de leitura."""
+    df_lido, relatorio = ler_analise_streaming(caminho_excel)
+    dados = relatorio.como_dict()
+    caminho_relatorio = _caminho_relatorio(caminho_excel)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, caminho_tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False, indent=1)
+            os.replace(caminho_tmp, caminho_relatorio)
+        except BaseException:
+            if os.path.exists(caminho_tmp):
+                os.remove(caminho_tmp)
+            raise
+    except OSError as e:
+        print(f"Alerta: não foi possível gravar o relatório de leitura '{caminho_relatorio}': {e}")
+    if dados["linhas_rejeitadas"] or dados["linhas_corrigidas"] or dados["linhas_incompletas"]:
+        print(f"Alerta: leitura de '{dados['arquivo']}': {dados['linhas_rejeitadas']} linha(s) rejeitada(s), "
+              f"{dados['linhas_corrigidas']} corrigida(s) e {dados['linhas_incompletas']} sem eixo "
+              f"(detalhes em {caminho_relatorio}).")
+    return df_lido
+
+# ==== Cache Colunar da Aba "Análise" (.npz) ====
+# O parsing do Excel pelo openpyxl domina o tempo de boot de cada worker. O DataFrame já limpo é
+# gravado em um .npz (uma entrada por coluna) junto com a chave do arquivo de origem
+# (tamanho, mtime e SHA-256). Se a chave bater, o cache é usado; caso contrário, o Excel é relido.
+CACHE_DIR = os.environ.get("MATRIZ_GE_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+CACHE_FORMATO_VERSAO = 4
+
+def _nome_cache(caminho_excel):
+    """Prefixo dos arquivos de cache de uma planilha: o nome do arquivo (para leitura) e uma hash do
+    caminho absoluto, para planilhas homônimas em pastas diferentes não dividirem nem apagarem caches."""
+    nome_base = os.path.splitext(os.path.basename(caminho_excel))[0]
+    return f"{nome_base}-{hashlib.sha256(os.path.abspath(caminho_excel).encode()).hexdigest()[:12]}"
+
+def _caminho_cache(caminho_excel):
+    return os.path.join(CACHE_DIR, f"{_nome_cache(caminho_excel)}.analise.npz")
+
+def _hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def _chave_arquivo(caminho_excel, calcular_hash=True):
+    st = os.stat(caminho_excel)
+    return {
+        "versao": CACHE_FORMATO_VERSAO,
+        "tamanho": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": _hash_arquivo(caminho_excel) if calcular_hash else None,
+    }
+
+def _salvar_cache_colunar(df_limpo, caminho_cache, chave):
+    """Grava o DataFrame limpo em .npz sem pickle. Retorna False se houver coluna não suportada."""
+    arrays = {"__index__": df_limpo.index.to_numpy(dtype="int64")}
+    tipos = []
+    for i, col in enumerate(df_limpo.columns):
+        serie = df_limpo[col]
+        if pd.api.types.is_float_dtype(serie) or pd.api.types.is_integer_dtype(serie):
+            arrays[f"col_{i}"] = serie.to_numpy()
+            tipos.append("num")
+        elif isinstance(serie.dtype, pd.CategoricalDtype) and all(isinstance(c, str) for c in serie.cat.categories):
+            arrays[f"col_{i}"] = serie.cat.codes.to_numpy()
+            arrays[f"categorias_{i}"] = np.array(list(serie.cat.categories), dtype=str)
+            tipos.append("cat")
+        elif serie.dtype == object and all(isinstance(v, str) for v in serie.dropna()):
+            nulos = serie.isna().to_numpy()
+            arrays[f"col_{i}"] = serie.fillna("").to_numpy(dtype=str)
+            arrays[f"nulo_{i}"] = nulos
+            tipos.append("str")
+        else:
+            return False
+    arrays["__colunas__"] = np.array(list(df_limpo.columns), dtype=str)
+    arrays["__tipos__"] = np.array(tipos, dtype=str)
+    arrays["__chave__"] = np.array(json.dumps(chave, sort_keys=True))
+
+    os.makedirs(os.path.dirname(caminho_cache), exist_ok=True)
+    # Escrita atômica: vários workers podem tentar gravar o mesmo cache ao mesmo tempo
+    fd, caminho_tmp = tempfile.mkstemp(dir=os.path.dirname(caminho_cache), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(caminho_tmp, caminho_cache)
+    except BaseException:
+        if os.path.exists(caminho_tmp):
+            os.remove(caminho_tmp)
+        raise
+    return True
+
+def _ler_chave_cache(caminho_cache):
+    with np.load(caminho_cache, allow_pickle=False) as dados:
+        return json.loads(str(dados["__chave__"]))
+
+def _ler_cache_colunar(caminho_cache):
+    with np.load(caminho_cache, allow_pickle=False) as dados:
+        colunas = [str(c) for c in dados["__colunas__"]]
+        tipos = [str(t) for t in dados["__tipos__"]]
+        dados_colunas = {}
+        for i, (col, tipo) in enumerate(zip(colunas, tipos)):
+            valores = dados[f"col_{i}"]
+            if tipo == "str":
+                valores = valores.astype(object)
+                valores[dados[f"nulo_{i}"]] = np.nan
+            elif tipo == "cat":
+                valores = pd.Categorical.from_codes(valores, categories=dados[f"categorias_{i}"].astype(object),
+                                                    validate=False)
+            dados_colunas[col] = valores
+        return pd.DataFrame(dados_colunas, index=pd.Index(dados["__index__"]), columns=colunas)
+
+def carregar_analise(caminho_excel, usar_cache=True):
+    """Carrega a aba 'Análise' já limpa, preferindo o cache colunar quando ele é válido.
+
+    Retorna ``(df, origem, sha256)``, onde ``origem`` é ``"cache"`` ou ``"excel"`` e ``sha256``
+    identifica o conteúdo do arquivo (None quando o cache não é usado).
+    """
+    if not usar_cache or not os.path.exists(caminho_excel):
+        return ler_planilha_analise(caminho_excel), "excel", None
+
+    caminho_cache = _caminho_cache(caminho_excel)
+    chave_atual = _chave_arquivo(caminho_excel, calcular_hash=False)
+    chave_cache = None
+    if os.path.exists(caminho_cache):
+        try:
+            chave_cache = _ler_chave_cache(caminho_cache)
+        except Exception as e:
+            print(f"Alerta: cache '{caminho_cache}' ilegível, relendo o Excel ({e}).")
+
+    if chave_cache and chave_cache.get("versao") == CACHE_FORMATO_VERSAO and chave_cache.get("tamanho") == chave_atual["tamanho"]:
+        # Mesmo tamanho e mtime: confia no cache sem recalcular o hash. Se só o mtime mudou
+        # (ex.: checkout do git), o conteúdo é conferido pelo SHA-256.
+        valido = chave_cache.get("mtime_ns") == chave_atual["mtime_ns"]
+        if not valido:
+            chave_atual["sha256"] = _hash_arquivo(caminho_excel)
+            valido = chave_cache.get("sha256") == chave_atual["sha256"]
+        if valido:
+            try:
+                return _ler_cache_colunar(caminho_cache), "cache", chave_cache.get("sha256")
+            except Exception as e:
+                print(f"Alerta: falha ao ler o cache '{caminho_cache}', relendo o Excel ({e}).")
+
+    df_limpo = ler_planilha_analise(caminho_excel)
+    if chave_atual["sha256"] is None:
+        chave_atual["sha256"] = _hash_arquivo(caminho_excel)
+    try:
+        if not _salvar_cache_colunar(df_limpo, caminho_cache, chave_atual):
+            print("Alerta: colunas com tipos não suportados; cache colunar não gravado.")
+    except OSError as e:
+        print(f"Alerta: não foi possível gravar o cache '{caminho_cache}': {e}")
+    return df_limpo, "excel", chave_atual["sha256"]
+
+# ==== Representação Compacta e Compartilhada entre Workers ====
+# A interface só lê seis colunas. O snapshot guarda apenas elas, com categóricas (categorias
+# ordenadas) nas colunas de filtro e float64 nos números (os eixos saem pela API com a precisão
+# da planilha; o gráfico converte para float32 ao serializar), mais as notas 0-5 dos indicadores num
+# bloco int8 (usadas na análise de sensibilidade aos pesos). Para planilhas com cache, essa versão
+# compacta é gravada uma única vez por conteúdo em arquivos .npy e aberta memória-mapeada: todos os
+# workers do gunicorn (e as recargas de cada um) usam as mesmas páginas físicas do page cache.
+COLUNAS_VISAO = ("Grande Área", "Quadrante", "Produto", "Hora Aluno", "Posição Competitiva", "Atratividade Mercado")
+COLUNAS_CATEGORICAS = ("Grande Área", "Quadrante", "Produto")
+COLUNAS_NUMERICAS = tuple(c for c in COLUNAS_VISAO if c not in COLUNAS_CATEGORICAS)
+COLUNAS_NOTAS = tuple(INDICADORES_GE)
+COMPACTO_FORMATO_VERSAO = 3
+
+def compactar_analise(df_limpo):
+    """DataFrame só com as colunas da interface: categóricas para os filtros e float64 para os números."""
+    numericos = np.column_stack([df_limpo[c].to_numpy(dtype=np.float64, na_value=np.nan) for c in COLUNAS_NUMERICAS]) \
+        if len(df_limpo) else np.empty((0, len(COLUNAS_NUMERICAS)), dtype=np.float64)
+    categoricas = {}
+    for col in COLUNAS_CATEGORICAS:
+        if isinstance(df_limpo[col].dtype, pd.CategoricalDtype):
+            # Já categórica (leitura em streaming ou cache colunar): só garante as categorias ordenadas
+            categorica = df_limpo[col].array.remove_unused_categories()
+            categorias = sorted(categorica.categories, key=str)
+            if list(categorica.categories) != categorias:
+                categorica = categorica.reorder_categories(categorias)
+            categoricas[col] = categorica
+            continue
+        valores = df_limpo[col].to_numpy(dtype=object)
+        categorias = sorted({v for v in valores if isinstance(v, str) or pd.notna(v)}, key=str)
+        categoricas[col] = pd.Categorical(valores, categories=categorias)
+    # Indicador ausente na planilha = sem dado (nota 0) em todas as linhas
+    notas = np.zeros((len(df_limpo), len(COLUNAS_NOTAS)), dtype=np.int8)
+    for i, col in enumerate(COLUNAS_NOTAS):
+        if col in df_limpo.columns:
+            valores = pd.to_numeric(df_limpo[col], errors="coerce").to_numpy(dtype=float)
+            notas[:, i] = np.clip(np.rint(np.nan_to_num(valores)), 0, 5)
+    return _montar_compacto(numericos, categoricas, notas)
+
+def _montar_compacto(numericos, categoricas, notas):
+    # Um bloco float64 (n x 3) e um int8 (n x 8) sem cópia, e as categóricas, que o pandas nunca consolida
+    df_compacto = pd.concat([pd.DataFrame(numericos, columns=list(COLUNAS_NUMERICAS), copy=False),
+                             pd.DataFrame(notas, columns=list(COLUNAS_NOTAS), copy=False)], axis=1, copy=False)
+    for col in COLUNAS_CATEGORICAS:
+        df_compacto[col] = categoricas[col]
+    return df_compacto
+
+def _caminho_compacto(caminho_excel, sha256):
+    return os.path.join(CACHE_DIR, f"{_nome_cache(caminho_excel)}.compacto-v{COMPACTO_FORMATO_VERSAO}-{sha256[:20]}")
+
+def _gravar_compacto(df_compacto, pasta):
+    """Grava o DataFrame compacto em .npy numa pasta temporária e a renomeia atomicamente."""
+    os.makedirs(os.path.dirname(pasta), exist_ok=True)
+    pasta_tmp = tempfile.mkdtemp(dir=os.path.dirname(pasta), suffix=".tmp")
+    try:
+        np.save(os.path.join(pasta_tmp, "numericos.npy"),
+                np.ascontiguousarray(df_compacto[list(COLUNAS_NUMERICAS)].to_numpy(dtype=np.float64)))
+        np.save(os.path.join(pasta_tmp, "notas.npy"),
+                np.ascontiguousarray(df_compacto[list(COLUNAS_NOTAS)].to_numpy(dtype=np.int8)))
+        categorias = {}
+        for i, col in enumerate(COLUNAS_CATEGORICAS):
+            np.save(os.path.join(pasta_tmp, f"codigos_{i}.npy"), df_compacto[col].cat.codes.to_numpy())
+            categorias[col] = [str(c) for c in df_compacto[col].cat.categories]
+        with open(os.path.join(pasta_tmp, "categorias.json"), "w", encoding="utf-8") as f:
+            json.dump(categorias, f, ensure_ascii=False)
+        os.rename(pasta_tmp, pasta)
+        # Versões anteriores da mesma planilha (e de formatos anteriores): quem ainda as mapeia mantém
+        # as páginas até trocar de snapshot
+        prefixo = os.path.basename(pasta).rsplit(".compacto-", 1)[0] + ".compacto-"
+        for nome in os.listdir(os.path.dirname(pasta)):
+            if nome.startswith(prefixo) and not nome.endswith(".tmp") and nome != os.path.basename(pasta):
+                shutil.rmtree(os.path.join(os.path.dirname(pasta), nome), ignore_errors=True)
+    except OSError:
+        shutil.rmtree(pasta_tmp, ignore_errors=True)
+        # Outro worker publicou a mesma versão primeiro: vale a dele
+        if not os.path.isdir(pasta):
+            raise
+
+def _abrir_compacto(pasta):
+    numericos = np.load(os.path.join(pasta, "numericos.npy"), mmap_mode="r", allow_pickle=False)
+    notas = np.load(os.path.join(pasta, "notas.npy"), mmap_mode="r", allow_pickle=False)
+    with open(os.path.join(pasta, "categorias.json"), encoding="utf-8") as f:
+        categorias = json.load(f)
+    categoricas = {}
+    for i, col in enumerate(COLUNAS_CATEGORICAS):
+        codigos = np.load(os.path.join(pasta, f"codigos_{i}.npy"), mmap_mode="r", allow_pickle=False)
+        categoricas[col] = pd.Categorical.from_codes(codigos, categories=categorias[col], validate=False)
+    return _montar_compacto(numericos, categoricas, notas)
+
+def carregar_compartilhado(caminho_excel, df_limpo, sha256):
+    """Versão compacta de ``df_limpo``; memória-mapeada de um arquivo por conteúdo quando há ``sha256``."""
+    if sha256 is None:
+        return compactar_analise(df_limpo)
+    pasta = _caminho_compacto(caminho_excel, sha256)
+    try:
+        if not os.path.isdir(pasta):
+            _gravar_compacto(compactar_analise(df_limpo), pasta)
+        return _abrir_compacto(pasta)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Alerta: versão compartilhada '{pasta}' indisponível, usando cópia local ({e}).")
+        return compactar_analise(df_limpo)
+
+# ==== Índice de Filtros (códigos categóricos + linhas por valor + cubo de coocorrência) ====
+COLUNAS_FILTRO = ("Grande Área", "Quadrante", "Produto")
+
+# ``contagens[col]`` acompanha ``opcoes[col]``: (número de produtos, soma da Hora Aluno) de cada opção
+ResultadoFiltro = collections.namedtuple("ResultadoFiltro", ["mascara", "opcoes", "contagens"])
+
+def normalizar_texto(texto):
+    """Minúsculas e sem acentos ("TÉCNICO EM QUÍMICA" -> "tecnico em quimica"), para a busca."""
+    return "".join(c for c in unicodedata.normalize("NFKD", str(texto)) if not unicodedata.combining(c)).casefold()
+
+class IndiceBusca:
+    """Busca sem acento/caixa sobre uma lista de nomes, por prefixo de palavra e por trigramas.
+
+    Termos com menos de 3 letras casam com o início de alguma palavra do nome (busca binária nas
+    palavras ordenadas); termos maiores casam em qualquer trecho do nome: as listas dos trigramas do
+    termo são intersectadas, da menor para a maior, e os candidatos são conferidos no texto.
+    """
+
+    def __init__(self, nomes):
+        nomes = [normalizar_texto(n) for n in nomes]
+        self.nomes = np.array(nomes, dtype=str)
+        self._resultados = CacheLRU(max_itens=32, max_bytes=8 * 2**20)
+        trigramas = collections.defaultdict(list)
+        palavras = []
+        for i, nome in enumerate(nomes):
+            for trigrama in {nome[j:j + 3] for j in range(len(nome) - 2)}:
+                trigramas[trigrama].append(i)
+            palavras.extend((palavra, i) for palavra in set(nome.split()))
+        self._trigramas = {t: np.array(ids, dtype=np.int32) for t, ids in trigramas.items()}
+        palavras.sort()
+        self._palavras = [p for p, _ in palavras]
+        self._ids_palavras = np.array([i for _, i in palavras], dtype=np.int32)
+
+    def buscar(self, consulta):
+        """Posições (ordenadas) dos nomes que casam com todos os termos; None se a consulta é vazia.
+        As últimas consultas ficam guardadas, já que a paginação repete a mesma busca."""
+        termos = tuple(normalizar_texto(consulta or "").split())
+        if not termos:
+            return None
+        resultado = self._resultados.obter(termos)
+        if resultado is None:
+            resultado = self._buscar_termos(termos)
+            resultado.flags.writeable = False
+            self._resultados.guardar(termos, resultado, tamanho=resultado.nbytes)
+        return resultado
+
+    def _buscar_termos(self, termos):
+        resultado = None
+        for termo in termos:
+            if len(termo) >= 3:
+                listas = [self._trigramas.get(termo[j:j + 3]) for j in range(len(termo) - 2)]
+                if any(lista is None for lista in listas):
+                    return np.empty(0, dtype=np.int32)
+                ids = functools.reduce(np.intersect1d, sorted(listas, key=len))
+                if len(termo) > 3:
+                    # Os trigramas podem estar em pontos diferentes do nome: confere o trecho inteiro
+                    ids = ids[np.char.find(self.nomes[ids], termo) >= 0]
+            else:
+                inicio = bisect.bisect_left(self._palavras, termo)
+                fim = bisect.bisect_left(self._palavras, termo + "\uffff")
+                ids = np.unique(self._ids_palavras[inicio:fim])
+            resultado = ids if resultado is None else np.intersect1d(resultado, ids)
+            if len(resultado) == 0:
+                break
+        return resultado
+
+class IndiceFiltros:
+    """Índice construído uma vez por versão dos dados para responder aos filtros sem copiar o DataFrame.
+
+    Para cada coluna de filtro guarda as categorias ordenadas, o código de cada linha (-1 = nulo)
+    e o conjunto de linhas de cada valor (ids de linha agrupados por código, ~4 bytes por linha no
+    total, independentemente da cardinalidade). Seleção vazia significa "sem filtro", como no callback.
+
+    As opções facetadas e suas contagens vêm de um cubo esparso de coocorrência: uma entrada por
+    combinação (área, quadrante, produto) presente, com o número de produtos e a Hora Aluno somada.
+    """
+
+    def __init__(self, df_base, colunas=COLUNAS_FILTRO):
+        self.n_linhas = len(df_base)
+        self.categorias = {}
+        self.codigos = {}
+        self.posicoes = {}
+        self._linhas = {}
+        for col in colunas:
+            serie = df_base[col] if col in df_base.columns else pd.Series(index=df_base.index, dtype=object)
+            if isinstance(serie.dtype, pd.CategoricalDtype) and serie.cat.categories.is_monotonic_increasing:
+                # Coluna já compacta: usa os códigos como estão (inclusive memória-mapeados), sem refatorar
+                codigos, categorias = serie.cat.codes.to_numpy(), serie.cat.categories
+            else:
+                codigos, categorias = pd.factorize(serie, sort=True)
+                codigos = codigos.astype(np.int32)
+            ordem = np.argsort(codigos, kind="stable").astype(np.int32)
+            limites = np.searchsorted(codigos[ordem], np.arange(len(categorias) + 1))
+            self.categorias[col] = list(categorias)
+            self.codigos[col] = codigos
+            self.posicoes[col] = {valor: i for i, valor in enumerate(self.categorias[col])}
+            self._linhas[col] = (ordem, limites)
+        self._todas = np.ones(self.n_linhas, dtype=bool)
+        self._todas.flags.writeable = False
+        self._buscas = {}
+        self._montar_cubo(df_base)
+
+    def _montar_cubo(self, df_base):
+        # Chave única por combinação: códigos (+1, para o nulo virar 0) em base mista
+        chave = np.zeros(self.n_linhas, dtype=np.int64)
+        for col in self.categorias:
+            chave = chave * (len(self.categorias[col]) + 1) + (self.codigos[col] + 1)
+        combinacoes, inversa = np.unique(chave, return_inverse=True)
+        horas = (df_base["Hora Aluno"].to_numpy(dtype=float, na_value=np.nan) if "Hora Aluno" in df_base.columns
+                 else np.zeros(self.n_linhas))
+        self.cubo_contagem = np.bincount(inversa, minlength=len(combinacoes))
+        self.cubo_horas = np.bincount(inversa, weights=np.nan_to_num(horas), minlength=len(combinacoes))
+        self.cubo = {}
+        for col in reversed(list(self.categorias)):
+            base = len(self.categorias[col]) + 1
+            self.cubo[col] = (combinacoes % base).astype(np.int32)  # código + 1 (0 = nulo)
+            combinacoes = combinacoes // base
+
+    def linhas_valor(self, col, valor):
+        """Ids das linhas com ``valor`` em ``col`` (vazio se o valor não existe)."""
+        i = self.posicoes[col].get(valor)
+        if i is None:
+            return np.empty(0, dtype=np.int32)
+        ordem, limites = self._linhas[col]
+        return ordem[limites[i]:limites[i + 1]]
+
+    def mascara_coluna(self, col, valores):
+        """Linhas cujo valor em ``col`` está em ``valores`` (todas, se ``valores`` for vazio)."""
+        if not valores:
+            return self._todas
+        mascara = np.zeros(self.n_linhas, dtype=bool)
+        for valor in valores:
+            mascara[self.linhas_valor(col, valor)] = True
+        return mascara
+
+    def buscar(self, col, consulta):
+        """Códigos das categorias de ``col`` que casam com ``consulta`` (None = sem busca).
+        O índice de busca da coluna é montado na primeira consulta."""
+        if not (consulta or "").strip():
+            return None
+        indice = self._buscas.get(col)
+        if indice is None:
+            indice = self._buscas[col] = IndiceBusca(self.categorias[col])
+        return indice.buscar(consulta)
+
+    def limpar_buscas(self):
+        """Descarta os índices de busca montados (e as consultas guardadas neles)."""
+        self._buscas = {}
+
+    def facetas(self, col, selecoes):
+        """Valores (ordenados) de ``col`` compatíveis com as seleções das outras colunas, com a
+        contagem de produtos e a Hora Aluno de cada um. Só percorre o cubo, nunca as linhas."""
+        compativeis = None
+        for outra in self.categorias:
+            if outra == col or not selecoes.get(outra):
+                continue
+            permitidos = np.zeros(len(self.categorias[outra]) + 1, dtype=bool)
+            for valor in selecoes[outra]:
+                i = self.posicoes[outra].get(valor)
+                if i is not None:
+                    permitidos[i + 1] = True
+            m = permitidos[self.cubo[outra]]
+            compativeis = m if compativeis is None else compativeis & m
+        codigos, contagem, horas = self.cubo[col], self.cubo_contagem, self.cubo_horas
+        if compativeis is not None:
+            codigos, contagem, horas = codigos[compativeis], contagem[compativeis], horas[compativeis]
+        n = len(self.categorias[col]) + 1
+        contagens = np.bincount(codigos, weights=contagem, minlength=n)[1:]
+        somas_horas = np.bincount(codigos, weights=horas, minlength=n)[1:]
+        presentes = np.flatnonzero(contagens)
+        categorias = self.categorias[col]
+        return ([categorias[i] for i in presentes],
+                [(int(contagens[i]), round(float(somas_horas[i]), 2)) for i in presentes])
+
+    def consultar(self, selecoes):
+        """Aplica ``selecoes`` ({coluna: valores}) e devolve a máscara das linhas plotadas e as
+        opções facetadas de cada coluna (cada faceta ignora a própria seleção)."""
+        mascara_total = self._todas
+        for col in self.categorias:
+            mascara_total = mascara_total & self.mascara_coluna(col, selecoes.get(col))
+        opcoes, contagens = {}, {}
+        for col in self.categorias:
+            opcoes[col], contagens[col] = self.facetas(col, selecoes)
+        return ResultadoFiltro(mascara=mascara_total, opcoes=opcoes, contagens=contagens)
+
+# ==== Recarga a Quente da Planilha ====
+# Cada versão dos dados é um snapshot imutável. Os callbacks pegam o snapshot atual uma única vez
+# no início da execução, então uma recarga que aconteça no meio de uma requisição não a afeta.
+SnapshotDataset = collections.namedtuple("SnapshotDataset", ["df", "indice", "versao", "origem", "mtime_ns"])
+
+RECARGA_INTERVALO_SEGUNDOS = float(os.environ.get("MATRIZ_GE_RECARGA_INTERVALO", "5"))
+# Contador único do processo: versões nunca se repetem, mesmo entre datasets diferentes
+_contador_versoes = itertools.count(1)
+
+def validar_analise(df_novo):
+    """Retorna a lista de problemas que impedem o uso do DataFrame (lista vazia = válido)."""
+    problemas = []
+    faltando = [c for c in ("Produto", "Grande Área", "Quadrante", "Hora Aluno",
+                            "Posição Competitiva", "Atratividade Mercado") if c not in df_novo.columns]
+    if faltando:
+        return [f"colunas ausentes: {', '.join(faltando)}"]
+    if df_novo.empty:
+        problemas.append("nenhum produto encontrado")
+    for col in ("Posição Competitiva", "Atratividade Mercado"):
+        fora = df_novo[col].dropna()
+        fora = fora[(fora < 0) | (fora > 10)]
+        if not fora.empty:
+            problemas.append(f"{len(fora)} valor(es) de '{col}' fora do intervalo 0–10")
+    return problemas
+
+class GerenciadorDataset:
+    """Mantém o snapshot atual da planilha e o substitui atomicamente quando o arquivo muda."""
+
+    def __init__(self, caminho_excel, intervalo=RECARGA_INTERVALO_SEGUNDOS):
+        self.caminho_excel = caminho_excel
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._ouvintes = []
+        self._thread = None
+        self._pid_thread = None
+        self._mtime_rejeitado = None
+        self._parar = threading.Event()
+        self._memoria = None
+        self._snapshot = self._carregar(versao=next(_contador_versoes), validar=False)
+
+    def _mtime(self):
+        try:
+            return os.stat(self.caminho_excel).st_mtime_ns
+        except OSError:
+            return None
+
+    def _carregar(self, versao, validar=True):
+        mtime_ns = self._mtime()
+        df_novo, origem, sha256 = carregar_analise(self.caminho_excel)
+        if validar:
+            problemas = validar_analise(df_novo)
+            if problemas:
+                raise ValueError("; ".join(problemas))
+        df_novo = carregar_compartilhado(self.caminho_excel, df_novo, sha256)
+        print(f"Dados da aba 'Análise' carregados via {origem} ({len(df_novo)} produtos, versão {versao}).")
+        return SnapshotDataset(df=df_novo, indice=IndiceFiltros(df_novo), versao=versao, origem=origem, mtime_ns=mtime_ns)
+
+    def atual(self):
+        """Snapshot vigente. Também garante que o monitor está rodando neste processo."""
+        self.garantir_monitoramento()
+        return self._snapshot
+
+    @property
+    def versao(self):
+        return self._snapshot.versao
+
+    def ao_recarregar(self, funcao):
+        """Registra ``funcao(snapshot)`` para ser chamada após cada troca de versão."""
+        self._ouvintes.append(funcao)
+        return funcao
+
+    def recarregar(self, forcar=False):
+        """Relê a planilha se ela mudou. Retorna True se uma nova versão foi publicada."""
+        with self._lock:
+            atual = self._snapshot
+            mtime_ns = self._mtime()
+            if not forcar and mtime_ns in (atual.mtime_ns, self._mtime_rejeitado):
+                return False
+            try:
+                novo = self._carregar(versao=next(_contador_versoes))
+            except Exception as e:
+                # Não tenta de novo até o arquivo mudar outra vez
+                self._mtime_rejeitado = mtime_ns
+                print(f"Alerta: recarga da planilha rejeitada, mantendo a versão {atual.versao} ({e}).")
+                return False
+            self._snapshot = novo
+        self._notificar(novo)
+        return True
+
+    def publicar(self, df_novo, origem="memoria"):
+        """Publica um DataFrame já limpo como nova versão (ex.: dados sintéticos de benchmark)."""
+        df_novo = compactar_analise(df_novo)
+        with self._lock:
+            novo = SnapshotDataset(df=df_novo, indice=IndiceFiltros(df_novo), versao=next(_contador_versoes),
+                                   origem=origem, mtime_ns=self._mtime())
+            self._snapshot = novo
+        self._notificar(novo)
+        return novo
+
+    def _notificar(self, novo):
+        for funcao in list(self._ouvintes):
+            try:
+                funcao(novo)
+            except Exception as e:
+                print(f"Erro em ouvinte de recarga {funcao!r}: {e}")
+
+    def memoria_bytes(self):
+        """Estimativa da memória ocupada pelo snapshot atual (DataFrame + índice de filtros)."""
+        snapshot = self._snapshot
+        if self._memoria is None or self._memoria[0] != snapshot.versao:
+            total = int(snapshot.df.memory_usage(index=True, deep=True).sum())
+            for col in snapshot.indice.codigos:
+                ordem, limites = snapshot.indice._linhas[col]
+                total += snapshot.indice.codigos[col].nbytes + ordem.nbytes + limites.nbytes
+                total += snapshot.indice.cubo[col].nbytes
+            total += snapshot.indice.cubo_contagem.nbytes + snapshot.indice.cubo_horas.nbytes
+            self._memoria = (snapshot.versao, total)
+        return self._memoria[1]
+
+    def parar(self):
+        """Encerra o monitor (usado quando o dataset é descarregado do registro)."""
+        self._parar.set()
+
+    def _monitorar(self):
+        while not self._parar.wait(self.intervalo):
+            self.recarregar()
+
+    def garantir_monitoramento(self):
+        # Threads não sobrevivem ao fork dos workers do gunicorn: o monitor é (re)iniciado
+        # preguiçosamente no processo que de fato atende as requisições.
+        if self.intervalo <= 0 or self._parar.is_set():
+            return
+        if self._thread is not None and self._pid_thread == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid_thread == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._monitorar, name="monitor-planilha", daemon=True)
+            self._pid_thread = os.getpid()
+            self._thread.start()
+
+# ==== Registro de Datasets (vários portfólios) ====
+# Outros portfólios (unidades de negócio, semestres...) são registrados em MATRIZ_GE_DATASETS no
+# formato "id=caminho.xlsx;id2=outro.xlsx" (caminhos relativos ao diretório do app). Cada um é
+# carregado no primeiro uso e um LRU com orçamento de memória mantém residentes só os mais usados.
+DATASET_PADRAO = "ep"
+DATASETS_MEMORIA_MAX_BYTES = int(float(os.environ.get("MATRIZ_GE_DATASETS_MEMORIA_MB", "512")) * 1024 * 1024)
+
+def _ler_pares_config(valor):
+    """"id=caminho;id2=outro" -> [(id, caminho absoluto)], ignorando itens malformados."""
+    pares = []
+    for item in valor.split(";"):
+        if "=" not in item:
+            continue
+        chave, caminho = (parte.strip() for parte in item.split("=", 1))
+        if chave and caminho:
+            pares.append((chave, os.path.join(BASE_DIR, caminho)))
+    return pares
+
+def ler_config_semestres(valor=None):
+    """Mapa ordenado semestre -> caminho do Excel, de MATRIZ_GE_SEMESTRES ("2024.1=a.xlsx;2024.2=b.xlsx")."""
+    valor = os.environ.get("MATRIZ_GE_SEMESTRES", "") if valor is None else valor
+    return collections.OrderedDict(_ler_pares_config(valor))
+
+def ler_config_datasets(valor=None, semestres=None):
+    """Mapa ordenado id -> caminho do Excel; o workbook padrão do app sempre está presente.
+    Os semestres de MATRIZ_GE_SEMESTRES também viram datasets (o id é o próprio semestre)."""
+    config = collections.OrderedDict([(DATASET_PADRAO, arquivo_excel)])
+    valor = os.environ.get("MATRIZ_GE_DATASETS", "") if valor is None else valor
+    config.update(_ler_pares_config(valor))
+    for semestre, caminho in (ler_config_semestres() if semestres is None else semestres).items():
+        if caminho not in config.values():
+            config[semestre if semestre not in config else f"semestre-{semestre}"] = caminho
+    return config
+
+class RegistroDatasets:
+    """Datasets carregados sob demanda, com despejo LRU quando a memória estimada passa do orçamento."""
+
+    def __init__(self, caminhos, memoria_max_bytes=DATASETS_MEMORIA_MAX_BYTES):
+        self.caminhos = collections.OrderedDict(caminhos)
+        self.memoria_max_bytes = memoria_max_bytes
+        self._carregados = collections.OrderedDict()
+        self._ouvintes = []
+        self._lock = threading.RLock()
+        # Um lock por dataset só para a carga fria: quem pede outro dataset não espera
+        self._locks_carga = {}
+
+    def ids(self):
+        return list(self.caminhos)
+
+    def rotulo(self, id_dataset):
+        return os.path.splitext(os.path.basename(self.caminhos[id_dataset]))[0]
+
+    def carregados(self):
+        with self._lock:
+            return dict(self._carregados)
+
+    def ao_recarregar(self, funcao):
+        """Registra ``funcao(snapshot)`` em todos os datasets, inclusive nos carregados depois."""
+        with self._lock:
+            self._ouvintes.append(funcao)
+            for gerenciador in self._carregados.values():
+                gerenciador.ao_recarregar(funcao)
+        return funcao
+
+    def obter(self, id_dataset=None):
+        """Gerenciador do dataset pedido (ids desconhecidos caem no padrão), carregando se preciso."""
+        if id_dataset not in self.caminhos:
+            id_dataset = DATASET_PADRAO
+        gerenciador = self._carregado(id_dataset)
+        if gerenciador is not None:
+            return gerenciador
+        with self._lock:
+            lock_carga = self._locks_carga.setdefault(id_dataset, threading.Lock())
+        # Leitura do Excel, compactação e índice rodam fora do lock do registro
+        with lock_carga:
+            gerenciador = self._carregado(id_dataset)
+            if gerenciador is not None:
+                return gerenciador
+            gerenciador = GerenciadorDataset(self.caminhos[id_dataset])
+            with self._lock:
+                for funcao in self._ouvintes:
+                    gerenciador.ao_recarregar(funcao)
+                gerenciador.ao_recarregar(lambda _snapshot: self._aplicar_orcamento())
+                self._carregados[id_dataset] = gerenciador
+                self._aplicar_orcamento()
+            return gerenciador
+
+    def _carregado(self, id_dataset):
+        with self._lock:
+            gerenciador = self._carregados.get(id_dataset)
+            if gerenciador is not None:
+                self._carregados.move_to_end(id_dataset)
+            return gerenciador
+
+    def memoria_bytes(self):
+        with self._lock:
+            return sum(g.memoria_bytes() for g in self._carregados.values())
+
+    def _aplicar_orcamento(self):
+        # O dataset mais recente nunca é despejado, mesmo que sozinho passe do orçamento
+        with self._lock:
+            while len(self._carregados) > 1 and self.memoria_bytes() > self.memoria_max_bytes:
+                id_removido, gerenciador = self._carregados.popitem(last=False)
+                gerenciador.parar()
+                print(f"Dataset '{id_removido}' descarregado da memória (orçamento de "
+                      f"{self.memoria_max_bytes / 2**20:.0f} MB excedido).")
+
+registro_datasets = RegistroDatasets(ler_config_datasets())
+registro_datasets.obter(DATASET_PADRAO)  # o portfólio padrão continua pronto já no boot
+# Semestre -> id do dataset com a planilha daquele semestre, na ordem cronológica da configuração
+_ids_por_caminho = {caminho: id_dataset for id_dataset, caminho in reversed(registro_datasets.caminhos.items())}
+SEMESTRES = collections.OrderedDict((semestre, _ids_por_caminho[caminho])
+                                    for semestre, caminho in ler_config_semestres().items())
+marcar_etapa_boot("dados")
+
+# ==== Imagens Estáticas (servidas por URL com fingerprint) ====
+# As imagens são lidas como bytes e servidas em /imagens/<nome>.<hash>.<ext> com cache de longa
+# duração, em vez de irem como base64 dentro de cada figura e do layout. Variantes reduzidas
+# (larguras da faixa do contêiner do gráfico) e WebP são geradas sob demanda e memorizadas.
+PREFIXO_IMAGENS = "/imagens/"
+LARGURAS_VARIANTES = (GRAPH_CONTAINER_MIN_WIDTH, GRAPH_CONTAINER_MAX_WIDTH, 2 * GRAPH_CONTAINER_MAX_WIDTH)
+FORMATOS_VARIANTES = {"png": "image/png", "webp": "image/webp"}
+# Variante usada no fundo da figura, ex.: "850w.webp". Vazio = PNG original.
+VARIANTE_FUNDO = os.environ.get("MATRIZ_GE_VARIANTE_FUNDO", "")
+
+ImagemEstatica = collections.namedtuple("ImagemEstatica", ["nome", "conteudo", "hash", "largura", "altura"])
+
+def _dimensoes_imagem(conteudo):
+    # PNG: largura e altura estão no chunk IHDR, logo após a assinatura; sem decodificar nada
+    if conteudo[:8] == b"\x89PNG\r\n\x1a\n" and conteudo[12:16] == b"IHDR":
+        return struct.unpack(">II", conteudo[16:24])
+    from PIL import Image
+    with Image.open(io.BytesIO(conteudo)) as img:  # só lê o cabeçalho
+        return img.size
+
+def carregar_imagem_estatica(nome, caminho):
+    with open(caminho, "rb") as f:
+        conteudo = f.read()
+    largura, altura = _dimensoes_imagem(conteudo)
+    return ImagemEstatica(nome=nome, conteudo=conteudo, hash=hashlib.sha256(conteudo).hexdigest()[:12],
+                          largura=largura, altura=altura)
+
+imagens_estaticas = {}
+try:
+    imagens_estaticas["fundo"] = carregar_imagem_estatica("fundo", arquivo_imagem_fundo)
+except FileNotFoundError:
+    print(f"Erro: O arquivo de imagem de fundo '{arquivo_imagem_fundo}' não foi encontrado.")
+except Exception as e:
+    print(f"Erro ao carregar a imagem de fundo: {e}")
+
+try:
+    imagens_estaticas["explicacao"] = carregar_imagem_estatica("explicacao", arquivo_imagem_explicacao)
+except FileNotFoundError:
+    print(f"Alerta: O arquivo de imagem de explicação '{arquivo_imagem_explicacao}' não foi encontrado.")
+except Exception as e:
+    print(f"Erro ao carregar a imagem de explicação: {e}")
+
+_variantes_imagens = {}
+_variantes_lock = threading.Lock()
+
+def obter_variante_imagem(nome, largura=None, formato="png"):
+    """Bytes da imagem ``nome`` na largura/formato pedidos (None = largura original)."""
+    imagem = imagens_estaticas[nome]
+    if largura is not None and largura >= imagem.largura:
+        largura = None
+    if largura is None and formato == "png":
+        return imagem.conteudo
+    chave = (nome, imagem.hash, largura, formato)
+    with _variantes_lock:
+        conteudo = _variantes_imagens.get(chave)
+    if conteudo is None:
+        from PIL import Image  # só as variantes redimensionadas/WebP precisam decodificar a imagem
+        with Image.open(io.BytesIO(imagem.conteudo)) as img:
+            if largura is not None:
+                altura = max(1, round(imagem.altura * largura / imagem.largura))
+                img = img.resize((largura, altura), Image.LANCZOS)
+            buffer = io.BytesIO()
+            img.save(buffer, format=formato.upper(), **({"quality": 90, "method": 6} if formato == "webp" else {"optimize": True}))
+            conteudo = buffer.getvalue()
+        with _variantes_lock:
+            _variantes_imagens[chave] = conteudo
+    return conteudo
+
+def url_imagem(nome, variante=""):
+    """URL com fingerprint da imagem; ``variante`` no formato "850w.webp", "webp" ou "" (original)."""
+    imagem = imagens_estaticas[nome]
+    return f"{PREFIXO_IMAGENS}{nome}.{imagem.hash}.{variante or 'png'}"
+
+def srcset_imagem(nome, formato="png"):
+    imagem = imagens_estaticas[nome]
+    larguras = [l for l in LARGURAS_VARIANTES if l < imagem.largura]
+    partes = [f"{url_imagem(nome, f'{l}w.{formato}')} {l}w" for l in larguras]
+    partes.append(f"{url_imagem(nome, formato)} {imagem.largura}w")
+    return ", ".join(partes)
+
+def data_uri_imagem(nome):
+    """Imagem original embutida como data URI (usada na exportação, que não acessa URLs do app)."""
+    return "data:image/png;base64," + base64.b64encode(imagens_estaticas[nome].conteudo).decode()
+
+if os.environ.get("MATRIZ_GE_PREGERAR_VARIANTES") == "1":
+    for _nome in imagens_estaticas:
+        for _formato in FORMATOS_VARIANTES:
+            for _largura in (None,) + LARGURAS_VARIANTES:
+                obter_variante_imagem(_nome, _largura, _formato)
+marcar_etapa_boot("imagens")
+
+
+app = dash.Dash(__name__, suppress_callback_exceptions=True, title="Matriz GE - Educação Profissional")
+server = app.server
+
+@server.route(f"{PREFIXO_IMAGENS}<arquivo>")
+def servir_imagem(arquivo):
+    # <nome>.<hash>.<ext> ou <nome>.<hash>.<largura>w.<ext>
+    partes = arquivo.split(".")
+    if len(partes) not in (3, 4) or partes[0] not in imagens_estaticas or partes[-1] not in FORMATOS_VARIANTES:
+        flask.abort(404)
+    imagem = imagens_estaticas[partes[0]]
+    if partes[1] != imagem.hash:
+        # Fingerprint antigo: redireciona para a versão atual, sem cache longo
+        return flask.redirect(url_imagem(partes[0], ".".join(partes[2:]) if len(partes) == 4 else partes[-1]))
+    largura = None
+    if len(partes) == 4:
+        if not (partes[2].endswith("w") and partes[2][:-1].isdigit()):
+            flask.abort(404)
+        largura = int(partes[2][:-1])
+        if largura not in LARGURAS_VARIANTES:
+            flask.abort(404)
+    resposta = flask.Response(obter_variante_imagem(partes[0], largura, partes[-1]), mimetype=FORMATOS_VARIANTES[partes[-1]])
+    resposta.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    resposta.set_etag(f"{imagem.hash}-{partes[2] if len(partes) == 4 else 'orig'}-{partes[-1]}")
+    return resposta.make_conditional(flask.request)
+
+# ==== Instrumentação dos Callbacks e Endpoint /metrics ====
+# Cada callback instrumentado registra o tempo total (por gatilho), o tempo de cada etapa
+# (filtragem, opções, figura, serialização) e o tamanho da resposta. Tudo é exposto em
+# /metrics no formato texto do Prometheus. O cProfile pode ser ligado por requisição com o
+# cabeçalho "X-Matriz-Profile: 1" ou por amostragem (MATRIZ_GE_PROFILE_TAXA, ex.: 0.01). Como o
+# /metrics, o cabeçalho só vale para requisições locais, a não ser com MATRIZ_GE_PROFILE_CABECALHO=1;
+# só os MATRIZ_GE_PERFIS_MAX perfis mais recentes ficam em disco.
+BUCKETS_DURACAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_BYTES = (1e3, 5e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7)
+PROFILE_TAXA = float(os.environ.get("MATRIZ_GE_PROFILE_TAXA", "0"))
+PROFILE_CABECALHO_PUBLICO = os.environ.get("MATRIZ_GE_PROFILE_CABECALHO") == "1"
+PERFIS_DIR = os.path.join(CACHE_DIR, "perfis")
+PERFIS_MAX = int(os.environ.get("MATRIZ_GE_PERFIS_MAX", "50"))
+METRICAS_PUBLICAS = os.environ.get("MATRIZ_GE_METRICAS_PUBLICAS") == "1"
+
+def _requisicao_local():
+    return flask.request.remote_addr in ("127.0.0.1", "::1")
+
+class Histograma:
+    """Histograma cumulativo no estilo Prometheus, com uma série por combinação de rótulos."""
+
+    def __init__(self, nome, ajuda, buckets, rotulos):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.buckets = tuple(buckets)
+        self.rotulos = tuple(rotulos)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(str(rotulos.get(r, "")) for r in self.rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        with self._lock:
+            series = sorted((chave, (list(c), s, n)) for chave, (c, s, n) in self._series.items())
+        for chave, (contagens, soma, total) in series:
+            base = ",".join(f'{r}="{_escapar_rotulo(v)}"' for r, v in zip(self.rotulos, chave))
+            sep = "," if base else ""
+            for limite, contagem in zip(self.buckets, contagens):
+                linhas.append(f'{self.nome}_bucket{{{base}{sep}le="{limite:g}"}} {contagem}')
+            linhas.append(f'{self.nome}_bucket{{{base}{sep}le="+Inf"}} {total}')
+            linhas.append(f"{self.nome}_sum{{{base}}} {soma:.6f}")
+            linhas.append(f"{self.nome}_count{{{base}}} {total}")
+        return linhas
+
+def _escapar_rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+hist_callback = Histograma("matriz_ge_callback_duracao_segundos", "Tempo de execução do callback.",
+                           BUCKETS_DURACAO, ("callback", "gatilho"))
+hist_etapa = Histograma("matriz_ge_callback_etapa_segundos", "Tempo por etapa dentro dos callbacks.",
+                        BUCKETS_DURACAO, ("callback", "etapa"))
+hist_resposta = Histograma("matriz_ge_callback_resposta_bytes", "Tamanho da resposta serializada do callback.",
+                           BUCKETS_BYTES, ("callback",))
+
+_callback_atual = contextvars.ContextVar("callback_atual", default="fora_de_callback")
+
+@contextlib.contextmanager
+def medir_etapa(etapa):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        hist_etapa.observar(time.perf_counter() - inicio, callback=_callback_atual.get(), etapa=etapa)
+
+def _deve_perfilar():
+    if not flask.has_request_context():
+        return False
+    if flask.request.headers.get("X-Matriz-Profile") == "1" and (PROFILE_CABECALHO_PUBLICO or _requisicao_local()):
+        return True
+    return PROFILE_TAXA > 0 and random.random() < PROFILE_TAXA
+
+def _podar_perfis():
+    """Apaga os perfis mais antigos além de PERFIS_MAX."""
+    try:
+        perfis = sorted((e for e in os.scandir(PERFIS_DIR) if e.name.endswith(".prof")),
+                        key=lambda e: e.stat().st_mtime_ns)
+    except OSError:
+        return
+    for entrada in perfis[:max(0, len(perfis) - PERFIS_MAX)]:
+        try:
+            os.remove(entrada.path)
+        except OSError:
+            pass  # outro worker já apagou
+
+def _salvar_perfil(perfil, nome):
+    try:
+        os.makedirs(PERFIS_DIR, exist_ok=True)
+        caminho = os.path.join(PERFIS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{nome}-{os.getpid()}-{time.monotonic_ns()}.prof")
+        perfil.dump_stats(caminho)
+        print(f"Perfil do callback '{nome}' gravado em {caminho}")
+        _podar_perfis()
+    except OSError as e:
+        print(f"Alerta: não foi possível gravar o perfil do callback '{nome}': {e}")
+
+def instrumentar(nome):
+    """Decorador (abaixo do @app.callback) que mede o callback e, se pedido, o executa sob cProfile."""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            try:
+                gatilho = callback_context.triggered_id
+            except Exception:
+                gatilho = None
+            gatilho = gatilho if isinstance(gatilho, str) else ("inicial" if gatilho is None else "padrao")
+            perfil = cProfile.Profile() if _deve_perfilar() else None
+            token = _callback_atual.set(nome)
+            inicio = time.perf_counter()
+            try:
+                if perfil is not None:
+                    perfil.enable()
+                return funcao(*args, **kwargs)
+            finally:
+                duracao = time.perf_counter() - inicio
+                if perfil is not None:
+                    perfil.disable()
+                    _salvar_perfil(perfil, nome)
+                _callback_atual.reset(token)
+                hist_callback.observar(duracao, callback=nome, gatilho=gatilho)
+                if flask.has_request_context():
+                    flask.g.matriz_callback = (nome, duracao)
+        return envolvida
+    return decorador
+
+@server.before_request
+def _marcar_inicio_requisicao():
+    flask.g.matriz_inicio = time.perf_counter()
+
+@server.after_request
+def _registrar_resposta_callback(resposta):
+    info = flask.g.pop("matriz_callback", None)
+    if info is not None and not resposta.direct_passthrough:
+        nome, duracao_callback = info
+        hist_resposta.observar(len(resposta.get_data()), callback=nome)
+        # O que sobra do tempo da requisição após o callback é, essencialmente, a serialização do JSON
+        total = time.perf_counter() - flask.g.get("matriz_inicio", time.perf_counter())
+        hist_etapa.observar(max(0.0, total - duracao_callback), callback=nome, etapa="serializacao")
+    return resposta
+
+def memoria_processo(pid="self"):
+    """RSS e PSS (bytes) do processo, lidos de /proc (Linux). PSS divide as páginas compartilhadas
+    entre os processos que as usam, então mostra o ganho de memória mapeada/--preload por worker."""
+    memoria = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for linha in f:
+                campo, _, valor = linha.partition(":")
+                if campo in ("Rss", "Pss"):
+                    memoria[campo.lower()] = int(valor.split()[0]) * 1024
+    except OSError:
+        pass
+    return memoria
+
+def caches_app():
+    """Caches do processo por nome, na ordem em que aparecem nas métricas."""
+    return {"visoes": cache_visoes, "rotulos": cache_rotulos, "exportacoes": cache_exportacoes,
+            "trajetorias": cache_trajetorias, "api": cache_api, "sensibilidade": cache_sensibilidade}
+
+def limpar_caches():
+    """Esvazia todos os caches do processo, inclusive os índices de busca dos datasets carregados.
+    Os dados e os índices de filtro ficam: é o estado de uma requisição logo após a carga."""
+    for cache in caches_app().values():
+        cache.limpar()
+    for gerenciador in registro_datasets.carregados().values():
+        gerenciador.atual().indice.limpar_buscas()
+
+@server.route("/metrics")
+def metricas():
+    if not METRICAS_PUBLICAS and not _requisicao_local():
+        flask.abort(403)
+    linhas = []
+    for hist in (hist_callback, hist_etapa, hist_resposta):
+        linhas.extend(hist.exportar())
+    estatisticas = {nome: cache.estatisticas() for nome, cache in caches_app().items()}
+    for campo, tipo in (("itens", "gauge"), ("bytes", "gauge"), ("hits", "counter"), ("misses", "counter"), ("evictions", "counter")):
+        linhas.append(f"# TYPE matriz_ge_cache_{campo} {tipo}")
+        for nome_cache, valores in estatisticas.items():
+            linhas.append(f'matriz_ge_cache_{campo}{{cache="{nome_cache}"}} {valores[campo]}')
+    linhas.append("# TYPE matriz_ge_dataset_versao gauge")
+    for id_dataset, gerenciador in registro_datasets.carregados().items():
+        linhas.append(f'matriz_ge_dataset_versao{{dataset="{_escapar_rotulo(id_dataset)}"}} {gerenciador.versao}')
+    linhas.append("# TYPE matriz_ge_datasets_memoria_bytes gauge")
+    linhas.append(f"matriz_ge_datasets_memoria_bytes {registro_datasets.memoria_bytes()}")
+    linhas.append("# TYPE matriz_ge_inicializacao_segundos gauge")
+    for etapa, segundos in TEMPOS_BOOT.items():
+        linhas.append(f'matriz_ge_inicializacao_segundos{{etapa="{etapa}"}} {segundos:.6f}')
+    memoria = memoria_processo()
+    for campo in ("rss", "pss"):
+        if campo in memoria:
+            linhas.append(f"# TYPE matriz_ge_processo_{campo}_bytes gauge")
+            linhas.append(f"matriz_ge_processo_{campo}_bytes {memoria[campo]}")
+    return flask.Response("\n".join(linhas) + "\n", mimetype="text/plain; version=0.0.4")
+
+# ==== Função para criar Popover de Filtro ====
+def create_filter_popover(filter_id, label_text, button_id, com_busca=False):
+    fixed_button_width = "300px"
+    opcoes = [dmc.CheckboxGroup(id=filter_id, children=[], value=[])]
+    if com_busca:
+        # Lista paginada no servidor: só a página visível (e os itens marcados) vem para o navegador
+        opcoes = [
+            dmc.TextInput(id=f"busca-{filter_id}", placeholder=f"Buscar {label_text.lower()}...", size="xs",
+                          debounce=300, mb=6, leftSection=DashIconify(icon="radix-icons:magnifying-glass", width=14)),
+            *opcoes,
+            dmc.Group([
+                dmc.Text(id=f"resumo-{filter_id}", size="xs", c="dimmed"),
+                dmc.Pagination(id=f"pagina-{filter_id}", total=1, value=1, size="xs", siblings=0, boundaries=1),
+            ], justify="space-between", wrap="nowrap", mt=6),
+        ]
+    return html.Div([
+        dcc.Store(id=f"store-label-{filter_id}", data=f"Selecionar {label_text.lower()}"),
+        dmc.Text(label_text, size="md", fw=500, mb=4),
+        dmc.Popover(
+            withArrow=True,
+            shadow="md",
+            position="bottom-start",
+            trapFocus=False,
+            closeOnClickOutside=True,
+            children=[
+                dmc.PopoverTarget(
+                    dmc.Button(
+                        id=button_id,
+                        variant="default",
+                        size="sm",
+                        style={
+                            "width": fixed_button_width,
+                            "height": "36px",
+                            "padding": "0 12px",
+                            "display": "flex",
+                            "alignItems": "center",
+                            "justifyContent": "space-between",
+                            "textAlign": "left",
+                            "overflow": "hidden"
+                        },
+                        children=html.Div([
+                            html.Div(
+                                id=f"label-{filter_id}",
+                                children=f"Selecionar {label_text.lower()}",
+                                style={
+                                    "flexGrow": 1,
+                                    "whiteSpace": "nowrap",
+                                    "overflow": "hidden",
+                                    "textOverflow": "ellipsis",
+                                    "textAlign": "left",
+                                    "paddingRight": "8px"
+                                }
+                            ),
+                            html.Div(
+                                "▼", # Seta para baixo
+                                style={
+                                    "flexShrink": 0,
+                                    "minWidth": "16px",
+                                    "textAlign": "right"
+                                }
+                            )
+                        ], style={
+                            "width": "100%",
+                            "display": "flex",
+                            "alignItems": "center"
+                        })
+                    )
+                ),
+                dmc.PopoverDropdown(
+                    style={
+                        "maxHeight": "250px",
+                        "overflowY": "auto",
+                        "minWidth": fixed_button_width,
+                        "padding": "8px"
+                    },
+                    children=opcoes
+                )
+            ]
+        ),
+        dmc.Space(h="sm")
+    ])
+
+# ==== Layout da Página Principal (Matriz GE) ====
+def create_layout_matriz_ge():
+    return dmc.Container([
+        dcc.Store(id="store-assinatura-opcoes"),
+        dmc.Title("📊 Ciclo de Vida de Produtos - Educação Profissional", order=2, ta="center", my="lg"),
+        html.Div([ # Contêiner Flex principal para 3 colunas
+            # Coluna 1: Sidebar
+            html.Div([
+                dmc.Stack([
+                    dmc.Title("🎯 Filtros", order=3, mb="sm"),
+                    create_filter_popover(filter_id="filtro-area", label_text="Área", button_id="botao-popover-area"),
+                    create_filter_popover(filter_id="filtro-quadrante", label_text="Quadrante", button_id="botao-popover-quadrante"),
+                    create_filter_popover(filter_id="filtro-produto", label_text="Produto", button_id="botao-popover-produto", com_busca=True),
+                    dmc.Group([dmc.Button("🔄 Resetar Filtros", id="botao-reset", color="red", variant="light", size="sm")], mt="md"),
+                    dmc.Divider(my="md"),
+                    dmc.Checkbox(label="Exibir nomes dos produtos", id="exibir-texto", checked=True, mb="sm", size="sm"),
+                    dmc.Select(label="Sensibilidade aos pesos", id="sensibilidade-pesos", value="0", size="sm",
+                               allowDeselect=False,
+                               data=[{"value": "0", "label": "Desligada"}] +
+                                    [{"value": str(v), "label": f"Pesos ±{v}%"} for v in SENSIBILIDADE_VARIACOES]),
+                    dmc.Button("⬇️ Baixar Gráfico (PNG)", id="botao-download", variant="outline", mt="md", size="sm"),
+                    html.Div(id="status-exportacao"),
+                    dcc.Store(id="store-exportacao"),
+                    dcc.Interval(id="intervalo-exportacao", interval=500, disabled=True),
+                    dcc.Download(id="download-imagem"),
+                    dmc.Button("📦 Exportar Lote (ZIP)", id="botao-lote", variant="subtle", mt="xs", size="sm"),
+                    html.Div(id="status-lote"),
+                    dcc.Store(id="store-lote"),
+                    dcc.Interval(id="intervalo-lote", interval=1000, disabled=True),
+                    dcc.Download(id="download-lote")
+                ])
+            ], style={
+                'width': '20%',
+                'minWidth': '260px',
+                'padding': '20px',
+                'borderRight': '1px solid #eee' 
+            }),
+            
+            # Coluna 2: Área do Gráfico --- AJUSTES PARA RESPONSIVIDADE E PROPORÇÃO ---
+            html.Div(
+                id='graph-column-container', 
+                children=[
+                    dcc.Graph(
+                        id='grafico-matriz', 
+                        config={'displayModeBar': False},
+                        style={'width': '100%', 'height': '100%'} # Gráfico preenche o contêiner
+                    )
+                ], 
+                style={
+                    'width': '50%', 
+                    'minWidth': f'{GRAPH_CONTAINER_MIN_WIDTH}px',
+                    'maxWidth': f'{GRAPH_CONTAINER_MAX_WIDTH}px',
+                    'aspectRatio': str(TARGET_ASPECT_RATIO), 
+                    'margin': '0 auto', 
+                    'overflow': 'hidden', 
+                    'padding': '0 10px 0 5px', 
+                    'display': 'flex', 
+                    'flexDirection': 'column'
+                }
+            ),
+            # --- FIM DOS AJUSTES NA COLUNA DO GRÁFICO ---
+
+            # Coluna 3: Área da Imagem de Explicação
+            html.Div([
+                (html.Img(src=url_imagem("explicacao"),
+                          srcSet=srcset_imagem("explicacao"),
+                          sizes="(max-width: 1400px) 30vw, 420px",
+                          style={'maxWidth': '100%', 'height': 'auto', 'display': 'block', 'marginTop': '30px'})
+                 if "explicacao" in imagens_estaticas
+                 else dmc.Text("Imagem 'explicacao.png' não encontrada.", c="red", ta="center", mt="xl"))
+            ], style={
+                'width': '30%', 
+                'minWidth': '200px', # Adicionado minWidth
+                'padding': '0 40px 0 20px',
+                'display': 'flex',
+                'alignItems': 'flex-start',
+                'justifyContent': 'center'
+            })
+        ], style={
+            'display': 'flex',
+            'flexDirection': 'row',
+            'alignItems': 'flex-start',
+            'flexWrap': 'nowrap' # Para garantir que as colunas não quebrem linha prematuramente
+        })
+    ], fluid=True, px="xl")
+
+# ==== Layout da Página de Nota Técnica ====
+def create_layout_nota_tecnica():
+    texto_da_nota = """
+    A **Matriz GE** é uma ferramenta de **análise estratégica** desenvolvida para ajudar empresas a **avaliar o portfólio de produtos**. Ela foi criada pela consultoria McKinsey em parceria com a General Electric como uma **evolução da Matriz BCG**. É composta por uma **grade 3x3** (nove quadrantes), que avalia cada produto com base em dois critérios principais:
+
+    &nbsp;
+
+    1. **Atratividade de Mercado** (eixo vertical):
+
+        • Avalia o quão atraente é o mercado para este produto.
+        
+        • Fatores considerados: tamanho de mercado, crescimento de mercado, vulnerabilidade de mercado e volume de concorrentes.
+
+    2. **Posição Competitiva** (eixo horizontal):
+
+        • Mede o quão bem-posicionado o produto está em relação ao mercado.
+
+        • Fatores considerados: faturamento, satisfação de clientes, capacidade de oferta e facilidade de adesão.
+
+        &nbsp;
+
+    Esses dois eixos são divididos em **baixo**, **médio** e **alto**, gerando nove zonas diferentes.
+
+    &nbsp;
+
+    • **Investir / Crescer (zona superior direita)**:
+        • Alta atratividade + alta força competitiva.
+        • Estratégia: expandir, alocar recursos, inovar.
+
+    • **Selecionar / Manter (zonas centrais)**:
+        • Atração e força competitiva medianas.
+        • Estratégia: manter o desempenho atual, avaliar oportunidades com cautela.
+
+    • **Desinvestir / Colher (zona inferior esquerda)**:
+        • Baixa atratividade + baixa força competitiva.
+        • Estratégia: reduzir investimentos, sair do mercado.
+
+    &nbsp;
+    
+    Para os itens de análise interna foram considerados os semestres 2024.1, 2024.2 e 2025.1. Os intervalos de classificação são:
+
+    **Faturamento**
+
+    Nota 1: até R$ 100.000,00
+
+    Nota 2: até R$ 250.000,00
+
+    Nota 3: até R$ 350.000,00
+
+    Nota 4: até R$ 700.000,00
+
+    Nota 5: acima de R$ 700.000,00
+
+    **Satisfação**
+
+    Nota 1: NPS até 20%
+
+    Nota 2: NPS entre 21% e 40%
+
+    Nota 3: NPS entre 41% e 60%
+
+    Nota 4: NPS entre 61% e 80%
+
+    Nota 5: NPS acima de 81%
+
+    **Capacidade de Oferta (execução do planejamento)**
+
+    Nota 1: Menor ou igual que 50%
+
+    Nota 2: Maior que 50% e menor ou igual que 70%
+
+    Nota 3: Maior que 70% e menor ou igual que 80%
+
+    Nota 4: Maior que 80% e menor ou igual que 90%
+
+    Nota 5: Maior que 90%
+
+    **Facilidade de Adesão (fechamento de turmas)**
+
+    Nota 1: Maior que 120 dias
+
+    Nota 2: Maior que 100 dias e menor ou igual que 120 dias
+
+    Nota 3: Maior que 80 dias e menor ou igual que 100 dias
+
+    Nota 4: Maior que 60 dias e menor ou igual que 80 dias
+
+    Nota 5: Menor ou igual que 60 dias
+
+    **Tamanho de Mercado (estoque de empregos)**
+
+    Nota 1: Saldo menor ou igual a 500
+
+    Nota 2: Saldo maior que 500 e menor ou igual a 1000
+
+    Nota 3: Saldo maior que 1000 e menor ou igual a 2000
+
+    Nota 4: Saldo maior que 2000 e menor ou igual a 3000
+
+    Nota 5: Saldo maior que 3000
+
+    **Crescimento de Mercado (produto entre o estoque de empregos e o mapa do trabalho)**
+
+    Nota 1: Resultado menor ou igual a 20000
+
+    Nota 2: Resultado maior que 20000 e menor ou igual a 40000
+
+    Nota 3: Resultado maior que 40000 e menor ou igual a 60000
+
+    Nota 4: Resultado maior que 60000 e menor ou igual a 80000
+
+    Nota 5: Saldo maior que 80000
+
+    **Vulnerabilidade (sensibilidade aos fatores externos – análise PESTEL)**
+
+    Nota 5: cenário muito favorável
+
+    Nota 4: cenário favorável
+
+    Nota 3: cenário neutro
+
+    Nota 2: cenário desfavorável
+
+    Nota 1: cenário muito desfavorável
+
+    **Volume de Concorrentes**
+
+    Nota 5: nenhum concorrente relevante
+
+    Nota 4: há concorrentes, mas nenhum relevante
+
+    Nota 3: há concorrentes, mas somente 1 é relevante
+
+    Nota 2: há concorrentes e 2 são relevantes
+
+    nota 1: há 3 ou mais concorrentes relevantes
+    """
+    return dmc.Container([
+        dmc.Title("📄 Nota Técnica", order=2, ta="center", my="lg"),
+        dmc.Paper(
+            shadow="xs",
+            p="xl",
+            children=[
+                dcc.Markdown(texto_da_nota, dangerously_allow_html=False)
+            ]
+        )
+    ], fluid=True, px="xl")
+
+# ==== Layout da Página de Evolução por Semestre ====
+def create_layout_evolucao():
+    titulo = dmc.Title("📈 Evolução do Portfólio por Semestre", order=2, ta="center", my="lg")
+    if len(SEMESTRES) < 2:
+        return dmc.Container([titulo, dmc.Alert(
+            "Configure ao menos dois semestres em MATRIZ_GE_SEMESTRES (ex.: \"2024.1=planilha_2024_1.xlsx;2024.2=planilha_2024_2.xlsx\").",
+            color="yellow")], fluid=True, px="xl")
+    trajetorias = obter_trajetorias()
+    return dmc.Container([
+        titulo,
+        dmc.Group([
+            dmc.MultiSelect(id="evolucao-areas", data=sorted(set(trajetorias.areas)), value=[], placeholder="Todas as áreas",
+                            clearable=True, searchable=True, size="sm", w=420),
+            dmc.Switch(id="evolucao-trajetorias", label="Mostrar trajetórias", checked=True, size="sm"),
+        ], justify="center", mb="sm"),
+        html.Div(
+            dcc.Graph(id="grafico-evolucao", config={'displayModeBar': False}, style={'width': '100%', 'height': '100%'}),
+            style={'width': '100%', 'maxWidth': f'{GRAPH_CONTAINER_MAX_WIDTH}px', 'aspectRatio': str(TARGET_ASPECT_RATIO),
+                   'margin': '0 auto'}
+        ),
+        html.Div(
+            dmc.Slider(id="evolucao-semestre", min=0, max=len(trajetorias.semestres) - 1, step=1,
+                       value=len(trajetorias.semestres) - 1, restrictToMarks=True, label=None,
+                       marks=[{"value": i, "label": semestre} for i, semestre in enumerate(trajetorias.semestres)]),
+            style={'maxWidth': f'{GRAPH_CONTAINER_MAX_WIDTH - 120}px', 'margin': '10px auto 40px auto'}
+        ),
+    ], fluid=True, px="xl")
+
+# ==== Layout Principal da Aplicação (com Navegação e Switch no Header) ====
+app.layout = dmc.MantineProvider(
+    id="mantine-provider",
+    forceColorScheme="light", 
+    children=[
+        dcc.Location(id='url', refresh=False),
+        dmc.Paper(
+            shadow="xs", p="sm", withBorder=True, style={"marginBottom": "20px"},
+            children=[
+                dmc.Group(
+                    justify="space-between", align="center",
+                    children=[
+                        dmc.Group(
+                            gap="xl",
+                            children=[
+                                dmc.Anchor(dmc.Text("📊 Matriz GE", fw=500, size="lg"), href="/"),
+                                dmc.Anchor(dmc.Text("📄 Nota Técnica", fw=500, size="lg"), href="/nota-tecnica"),
+                                *([dmc.Anchor(dmc.Text("📈 Evolução", fw=500, size="lg"), href="/evolucao")]
+                                  if len(SEMESTRES) > 1 else []),
+                            ]
+                        ),
+                        dmc.Select(
+                            id="seletor-dataset",
+                            data=[{"value": i, "label": registro_datasets.rotulo(i)} for i in registro_datasets.ids()],
+                            value=DATASET_PADRAO, allowDeselect=False, size="sm", w=260,
+                            style={} if len(registro_datasets.ids()) > 1 else {"display": "none"}
+                        ),
+                        dmc.Switch(
+                            id="dark-mode-switch", size="md", checked=False,
+                            offLabel=DashIconify(icon="radix-icons:sun", width=18),
+                            onLabel=DashIconify(icon="radix-icons:moon", width=18)
+                        ),
+                    ]
+                )
+            ]
+        ),
+        html.Div(id='page-content', style={"padding": "0 20px 20px 20px"})
+    ]
+)
+
+marcar_etapa_boot("app_layout")
+
+# ==== Callback para Atualizar o Conteúdo da Página com Base na URL ====
+@app.callback(Output('page-content', 'children'),
+              [Input('url', 'pathname')])
+@instrumentar("display_page")
+def display_page(pathname):
+    if pathname == '/nota-tecnica':
+        return create_layout_nota_tecnica()
+    elif pathname == '/': 
+        return create_layout_matriz_ge()
+    elif pathname == '/evolucao':
+        return create_layout_evolucao()
+    else:
+        return dmc.Center(dmc.Text("Página não encontrada (404)", size="xl", c="red"), style={"height": "50vh"})
+
+# ==== Callback para Escolher o Dataset pela URL (?dataset=<id>) ====
+@app.callback(
+    Output('seletor-dataset', 'value'),
+    Input('url', 'search')
+)
+def selecionar_dataset_url(search):
+    id_dataset = urllib.parse.parse_qs((search or "").lstrip("?")).get("dataset", [None])[0]
+    return id_dataset if id_dataset in registro_datasets.caminhos else dash.no_update
+
+# ==== Callback para Alternar Modo Escuro (no navegador) ====
+app.clientside_callback(
+    """
+    function(checked) {
+        return checked ? 'dark' : 'light';
+    }
+    """,
+    Output('mantine-provider', 'forceColorScheme'),
+    Input('dark-mode-switch', 'checked'),
+    prevent_initial_call=True
+)
+
+
+# ==== Construção da Figura da Matriz ====
+# Acima deste número de linhas a figura usa um único trace Scattergl em vez de um trace SVG por quadrante
+LIMITE_LINHAS_SCATTERGL = int(os.environ.get("MATRIZ_GE_LIMITE_SCATTERGL", "2000"))
+# Acima deste número de linhas filtradas a matriz mostra agregados por célula (modo densidade):
+# a grade 0-10 x 0-10 é dividida em DENSIDADE_CELULAS x DENSIDADE_CELULAS e cada célula ocupada vira
+# uma bolha com a contagem de cursos e a soma da Hora Aluno, então o JSON não cresce com o portfólio.
+LIMITE_LINHAS_DENSIDADE = int(os.environ.get("MATRIZ_GE_LIMITE_DENSIDADE", "5000"))
+DENSIDADE_CELULAS = int(os.environ.get("MATRIZ_GE_DENSIDADE_CELULAS", "20"))
+DENSIDADE_TAMANHO_MAX = 40
+
+def calcular_posicoes_texto(x, y):
+    """Posição do rótulo de cada bolha (vetorizado), para o texto não ficar sobre o marcador.
+
+    Vertical: bolha embaixo (< 2,5) -> texto em cima; bolha em cima (> 7,5) -> texto embaixo.
+    Horizontal: bolha à esquerda (< 2,5) -> texto à direita; à direita (> 7,5) -> à esquerda.
+    Bolhas centralizadas nos dois eixos vão para a esquerda se x > 5, senão para a direita.
+    Pontos sem coordenada ficam em "middle center".
+    """
+    pos_y = np.select([y < 2.5, y > 7.5], ["top", "bottom"], default="middle")
+    pos_x = np.select([x < 2.5, x > 7.5], ["right", "left"], default="center")
+    centro = (pos_y == "middle") & (pos_x == "center")
+    pos_x = np.where(centro, np.where(x > 5, "left", "right"), pos_x)
+    posicoes = np.char.add(np.char.add(pos_y, " "), pos_x).astype(object)
+    posicoes[np.isnan(x) | np.isnan(y)] = "middle center"
+    return posicoes
+
+# ==== Posicionamento dos Rótulos sem Sobreposição ====
+# A caixa de cada rótulo é estimada pelo número de caracteres e de linhas (fonte 14) no tamanho
+# máximo do gráfico na tela. As bolhas maiores escolhem primeiro: a posição da heurística acima é
+# testada antes das outras sete, e a primeira que não colide com rótulos já colocados (nem sai da
+# área do gráfico) é usada. As colisões são consultadas em uma grade de hash, então o custo total é
+# dominado pela ordenação. Rótulos sem posição livre ficam ocultos (o nome continua no hover).
+ROTULO_FONTE_PX = 14
+ROTULO_LARGURA_CARACTERE = 0.68  # largura média de uma maiúscula, em frações do tamanho da fonte
+ROTULO_ALTURA_LINHA = 1.25
+ROTULO_CELULA_GRADE_PX = 64
+POSICOES_CANDIDATAS = ("top center", "bottom center", "middle right", "middle left",
+                       "top right", "top left", "bottom right", "bottom left")
+
+def _area_plotagem_px():
+    """Largura e altura (px) da área de plotagem no maior tamanho do gráfico (margens do layout)."""
+    return GRAPH_CONTAINER_MAX_WIDTH - 90, GRAPH_CONTAINER_MAX_WIDTH / TARGET_ASPECT_RATIO - 90
+
+def _caixa_rotulo(px, py, raio, largura, altura, posicao):
+    """Caixa (x0, y0, x1, y1) em px, com y para cima, do rótulo ancorado em ``posicao``."""
+    vertical, horizontal = posicao.split(" ")
+    if horizontal == "right":
+        x0 = px + raio
+    elif horizontal == "left":
+        x0 = px - raio - largura
+    else:
+        x0 = px - largura / 2
+    if vertical == "top":
+        y0 = py + raio
+    elif vertical == "bottom":
+        y0 = py - raio - altura
+    else:
+        y0 = py - altura / 2
+    return x0, y0, x0 + largura, y0 + altura
+
+def posicionar_rotulos(x, y, textos, tamanhos, preferidas=None):
+    """Escolhe a posição de cada rótulo evitando sobreposição; devolve ``(posicoes, visiveis)``."""
+    n = len(textos)
+    posicoes = np.array(preferidas if preferidas is not None else calcular_posicoes_texto(x, y), dtype=object)
+    visiveis = np.zeros(n, dtype=bool)
+    largura_area, altura_area = _area_plotagem_px()
+    escala_x, escala_y = largura_area / 10.0, altura_area / 10.0
+    celula = float(ROTULO_CELULA_GRADE_PX)
+    grade = collections.defaultdict(list)
+    caixas = []
+
+    def colide(caixa):
+        x0, y0, x1, y1 = caixa
+        for gx in range(int(x0 // celula), int(x1 // celula) + 1):
+            for gy in range(int(y0 // celula), int(y1 // celula) + 1):
+                for i in grade.get((gx, gy), ()):
+                    c = caixas[i]
+                    if x0 < c[2] and c[0] < x1 and y0 < c[3] and c[1] < y1:
+                        return True
+        return False
+
+    for linha in np.argsort(-np.asarray(tamanhos, dtype=float), kind="stable"):
+        px, py = x[linha] * escala_x, y[linha] * escala_y
+        if np.isnan(px) or np.isnan(py):
+            continue
+        partes = str(textos[linha]).split("<br>")
+        largura = max(len(p) for p in partes) * ROTULO_FONTE_PX * ROTULO_LARGURA_CARACTERE
+        altura = len(partes) * ROTULO_FONTE_PX * ROTULO_ALTURA_LINHA
+        raio = float(tamanhos[linha]) / 2
+        candidatas = [posicoes[linha]] + [p for p in POSICOES_CANDIDATAS if p != posicoes[linha]]
+        for posicao in candidatas:
+            caixa = _caixa_rotulo(px, py, raio, largura, altura, posicao)
+            if caixa[0] < 0 or caixa[1] < 0 or caixa[2] > largura_area or caixa[3] > altura_area:
+                continue
+            if not colide(caixa):
+                caixas.append(caixa)
+                for gx in range(int(caixa[0] // celula), int(caixa[2] // celula) + 1):
+                    for gy in range(int(caixa[1] // celula), int(caixa[3] // celula) + 1):
+                        grade[(gx, gy)].append(len(caixas) - 1)
+                posicoes[linha] = posicao
+                visiveis[linha] = True
+                break
+    return posicoes, visiveis
+
+def agregar_densidade(x, y, horas, celulas=DENSIDADE_CELULAS):
+    """Histograma 2-D da grade 0-10: centros, contagem e Hora Aluno somada das células ocupadas."""
+    validos = ~(np.isnan(x) | np.isnan(y))
+    x, y, horas = x[validos], y[validos], np.nan_to_num(horas[validos])
+    # Índice da célula em um único passe (valores fora de 0-10 caem na borda, como no gráfico)
+    ix = np.clip((x * (celulas / 10.0)).astype(np.int64), 0, celulas - 1)
+    iy = np.clip((y * (celulas / 10.0)).astype(np.int64), 0, celulas - 1)
+    celula = ix * celulas + iy
+    contagens = np.bincount(celula, minlength=celulas * celulas)
+    somas_horas = np.bincount(celula, weights=horas, minlength=celulas * celulas)
+    ocupadas = np.flatnonzero(contagens)
+    largura = 10.0 / celulas
+    centros_x = (ocupadas // celulas + 0.5) * largura
+    centros_y = (ocupadas % celulas + 0.5) * largura
+    return centros_x, centros_y, contagens[ocupadas], somas_horas[ocupadas]
+
+def construir_traco_densidade(df_plot, exibir_texto, dark_mode_checked):
+    """Trace único com uma bolha por célula ocupada (modo densidade para portfólios grandes)."""
+    centros_x, centros_y, contagens, somas_horas = agregar_densidade(
+        df_plot["Posição Competitiva"].to_numpy(dtype=float, na_value=np.nan),
+        df_plot["Atratividade Mercado"].to_numpy(dtype=float, na_value=np.nan),
+        df_plot["Hora Aluno"].to_numpy(dtype=float, na_value=np.nan))
+    maximo_horas = somas_horas.max() if len(somas_horas) and somas_horas.max() > 0 else 1.0
+    cor_eixos = 'white' if dark_mode_checked else '#333'
+    # Área da bolha proporcional à Hora Aluno da célula
+    tamanhos = np.maximum(np.round(DENSIDADE_TAMANHO_MAX * np.sqrt(somas_horas / maximo_horas), 1), 4)
+    return go.Scatter(
+        x=centros_x, y=centros_y,
+        mode="markers+text" if exibir_texto else "markers", name="Densidade",
+        marker=dict(size=tamanhos, color=contagens, colorscale="YlOrRd", opacity=0.8,
+                    line=dict(width=0.5, color="#333"),
+                    colorbar=dict(title=dict(text="Cursos", font=dict(color=cor_eixos)), thickness=12, len=0.6,
+                                  tickfont=dict(color=cor_eixos))),
+        text=[f"{c:,}".replace(",", ".") for c in contagens], textposition="middle center",
+        textfont=dict(
+            color='white' if dark_mode_checked else 'black',
+            size=10, family="Bahnschrift, Arial, sans-serif"
+        ),
+        customdata=np.column_stack([contagens, np.round(somas_horas, 1)]),
+        hovertemplate="<b>%{customdata[0]} cursos</b><br><b>Hora Aluno:</b> %{customdata[1]:,.0f}<br>"
+                      "<b>Posição Competitiva:</b> %{x:.2f}<br><b>Atratividade:</b> %{y:.2f}<extra></extra>"
+    )
+
+def construir_figura(df_plot, exibir_texto, dark_mode_checked, filtros_ativos, chave_rotulos=None, sensibilidade=None):
+    """Monta a figura da Matriz GE para as linhas já filtradas em ``df_plot``.
+
+    Com ``chave_rotulos`` (o estado dos filtros), o posicionamento dos rótulos vem de ``cache_rotulos``.
+    Com ``sensibilidade`` (alinhada às linhas de ``df_plot``), cada bolha ganha o anel de incerteza.
+    """
+    fixed_cor_bolha = "#FFFFFF" 
+    fixed_transparencia_percent = 55
+    min_bubble_size_pref = 1
+    target_max_bubble_size_pref = 150
+
+    fig = go.Figure()
+    cols_for_plot = ["Hora Aluno", "Quadrante", "Posição Competitiva", "Atratividade Mercado", "Produto"]
+    for col_plot in cols_for_plot:
+        if col_plot not in df_plot.columns:
+            if col_plot == "Hora Aluno": df_plot[col_plot] = 1.0
+            elif col_plot in ["Posição Competitiva", "Atratividade Mercado"]: df_plot[col_plot] = pd.NA
+            else: df_plot[col_plot] = pd.Series(dtype='object')
+
+    max_hora_aluno = df_plot["Hora Aluno"].max() if not (df_plot.empty or df_plot["Hora Aluno"].isnull().all() or "Hora Aluno" not in df_plot.columns) else 1.0
+    if pd.isna(max_hora_aluno): max_hora_aluno = 1.0
+
+    fator_escala = max_hora_aluno / target_max_bubble_size_pref if pd.notna(max_hora_aluno) and max_hora_aluno > 0 else 1.0
+    if fator_escala == 0: fator_escala = 1.0
+
+    if len(df_plot) > LIMITE_LINHAS_DENSIDADE:
+        fig.add_trace(construir_traco_densidade(df_plot, exibir_texto, dark_mode_checked))
+    elif not df_plot.empty and "Quadrante" in df_plot.columns:
+        x = df_plot["Posição Competitiva"].to_numpy(dtype=np.float32, na_value=np.nan)
+        y = df_plot["Atratividade Mercado"].to_numpy(dtype=np.float32, na_value=np.nan)
+        produtos = df_plot["Produto"].to_numpy()
+        textos = df_plot["Produto"].astype(str).str.replace("TÉCNICO EM ", "TÉCNICO EM<br>", regex=False).to_numpy()
+        tamanhos_brutos = np.nan_to_num(df_plot["Hora Aluno"].to_numpy(dtype=float, na_value=np.nan) / fator_escala, nan=0.0)
+        tamanhos = np.maximum(tamanhos_brutos, min_bubble_size_pref)
+        no_minimo = tamanhos_brutos < min_bubble_size_pref
+        rotulos = cache_rotulos.obter(chave_rotulos) if chave_rotulos is not None else None
+        if rotulos is None:
+            rotulos = posicionar_rotulos(x, y, textos, tamanhos)
+            if chave_rotulos is not None:
+                cache_rotulos.guardar(chave_rotulos, rotulos, tamanho=len(df_plot) * 64)
+        posicoes, visiveis = rotulos
+        textos = np.where(visiveis, textos, "")
+
+        # Um único passe agrupa as linhas por quadrante, na ordem de primeira aparição
+        codigos, quadrantes_unicos = pd.factorize(df_plot["Quadrante"])
+        ordem = np.argsort(codigos, kind="stable")
+        inicios = np.searchsorted(codigos[ordem], np.arange(len(quadrantes_unicos) + 1))
+        # Linhas sem quadrante (eixos vazios) ficam com código -1, antes de inicios[0], e não são plotadas
+        tipo_trace = go.Scattergl if len(df_plot) > LIMITE_LINHAS_SCATTERGL else go.Scatter
+        if tipo_trace is go.Scattergl:
+            # Portfólios grandes: um único trace WebGL com estilo por ponto
+            grupos = [("Portfólio", ordem[inicios[0]:], tipo_trace)]
+        else:
+            grupos = [(str(q), ordem[inicios[i]:inicios[i + 1]], tipo_trace) for i, q in enumerate(quadrantes_unicos)]
+
+        for nome_trace, linhas, tipo_trace in grupos:
+            if len(linhas) == 0:
+                continue
+            tamanhos_trace = tamanhos[linhas]
+            if no_minimo[linhas].all():
+                # Todas as bolhas no tamanho mínimo: mantém o tipo inteiro, como a figura sempre teve
+                tamanhos_trace = np.full(len(linhas), min_bubble_size_pref)
+            fig.add_trace(tipo_trace(
+                x=x[linhas], y=y[linhas],
+                mode="markers+text" if exibir_texto else "markers", name=nome_trace,
+                marker=dict(size=tamanhos_trace, color=fixed_cor_bolha, opacity=max(0, min(1, (100 - fixed_transparencia_percent) / 100.0))),
+                # Texto e posições vão sempre na figura: exibir/ocultar os nomes só troca o "mode" no navegador
+                text=textos[linhas], textposition=posicoes[linhas],
+                textfont=dict(
+                    color='white' if dark_mode_checked else 'black',
+                    size=14, family="Bahnschrift, Arial, sans-serif"
+                ),
+                customdata=produtos[linhas],
+                hovertemplate="<b>%{customdata}</b><br><b>Posição Competitiva:</b> %{x:.1f}<br><b>Atratividade:</b> %{y:.1f}<extra></extra>"
+            ))
+        if sensibilidade is not None and inicios[0] < len(ordem):
+            traco = construir_traco_sensibilidade(x, y, tamanhos, produtos, sensibilidade, tipo_trace)
+            if traco is not None:
+                fig.add_trace(traco)
+
+    if "fundo" in imagens_estaticas:
+        fig.add_layout_image(dict(source=url_imagem("fundo", VARIANTE_FUNDO), xref="x domain", yref="y domain", x=0, y=1, sizex=1, sizey=1, sizing="stretch", opacity=1, layer="below"))
+
+    axis_font_color = 'white' if dark_mode_checked else '#333'
+    axis_tick_color = '#777' if dark_mode_checked else 'grey'
+    axis_line_color = '#555' if dark_mode_checked else 'lightgrey'
+
+    fig.update_layout(
+        autosize=True, 
+        xaxis=dict(
+            range=[0, 10], autorange=False, fixedrange=True,
+            title=dict(text="<b>Posição Competitiva</b>", font=dict(size=17, color=axis_font_color)),
+            tickfont=dict(size=14, color=axis_font_color),
+            showgrid=False, zeroline=False, tickmode="linear", tick0=0, dtick=1, ticks="outside", ticklen=6, tickwidth=1,
+            tickcolor=axis_tick_color, linecolor=axis_line_color
+        ),
+        yaxis=dict(
+            range=[0, 10], autorange=False, fixedrange=True,
+            title=dict(text="<b>Atratividade de Mercado</b>", font=dict(size=17, color=axis_font_color)),
+            tickfont=dict(size=14, color=axis_font_color),
+            scaleanchor="x", scaleratio=(IMAGE_ORIGINAL_HEIGHT / IMAGE_ORIGINAL_WIDTH) if IMAGE_ORIGINAL_WIDTH !=0 else 1,
+            showgrid=False, zeroline=False, tickmode="linear", tick0=0, dtick=1, ticks="outside", ticklen=6, tickwidth=1,
+            tickcolor=axis_tick_color, linecolor=axis_line_color
+        ),
+        plot_bgcolor='rgba(0,0,0,0)', 
+        paper_bgcolor='rgba(0,0,0,0)', 
+        showlegend=False,
+        margin=dict(l=60, r=30, t=30, b=60),
+        hovermode="closest"
+    )
+    if df_plot.empty and filtros_ativos:
+        fig.update_layout(
+            xaxis_visible=False, yaxis_visible=False,
+            annotations=[dict(
+                text="Nenhum curso para os filtros.", xref="paper", yref="paper", x=0.5, y=0.5,
+                showarrow=False, font=dict(size=16, color=axis_font_color) 
+            )]
+        )
+    return fig
+
+# ==== Cache LRU de Visões (figura + opções de filtro) ====
+# Visões populares ("todos os produtos", uma área, modo escuro...) são servidas do cache. A chave
+# inclui a versão dos dados, e o cache é esvaziado a cada recarga da planilha.
+class CacheLRU:
+    """LRU limitado por número de itens e por tamanho aproximado (bytes serializados)."""
+
+    def __init__(self, max_itens, max_bytes):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self._itens = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return item[0]
+
+    def guardar(self, chave, valor, tamanho):
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            antigo = self._itens.pop(chave, None)
+            if antigo is not None:
+                self._bytes -= antigo[1]
+            self._itens[chave] = (valor, tamanho)
+            self._bytes += tamanho
+            while len(self._itens) > self.max_itens or self._bytes > self.max_bytes:
+                _, (_, tamanho_removido) = self._itens.popitem(last=False)
+                self._bytes -= tamanho_removido
+                self.evictions += 1
+
+    def limpar(self, *_):
+        with self._lock:
+            self._itens.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            return {"itens": len(self._itens), "bytes": self._bytes, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+cache_visoes = CacheLRU(
+    max_itens=int(os.environ.get("MATRIZ_GE_CACHE_VISOES_ITENS", "256")),
+    max_bytes=int(float(os.environ.get("MATRIZ_GE_CACHE_VISOES_MB", "64")) * 1024 * 1024),
+)
+registro_datasets.ao_recarregar(cache_visoes.limpar)
+
+def _normalizar_selecao(valores):
+    return tuple(sorted({str(v) for v in valores or []}))
+
+# O posicionamento dos rótulos só depende das linhas filtradas: é guardado por estado de filtros
+# (sem tema e sem exibir/ocultar nomes), então as variações da mesma visão reaproveitam o cálculo
+cache_rotulos = CacheLRU(max_itens=256, max_bytes=16 * 1024 * 1024)
+registro_datasets.ao_recarregar(cache_rotulos.limpar)
+
+def calcular_visao(snapshot, areas, quadrantes, produtos, exibir_texto, dark_mode, variacao_pesos=None):
+    """Figura (como dict) e opções facetadas para um estado de filtros, com cache LRU.
+
+    ``variacao_pesos`` (uma de SENSIBILIDADE_VARIACOES, em %) liga o anel de sensibilidade aos pesos.
+    """
+    variacao = _normalizar_variacao(variacao_pesos)
+    chave = (_normalizar_selecao(areas), _normalizar_selecao(quadrantes), _normalizar_selecao(produtos),
+             bool(exibir_texto), bool(dark_mode), snapshot.versao, variacao)
+    visao = cache_visoes.obter(chave)
+    if visao is not None:
+        return visao
+
+    with medir_etapa("filtragem"):
+        resultado = snapshot.indice.consultar({
+            "Grande Área": areas, "Quadrante": quadrantes, "Produto": produtos
+        })
+        df_plot = snapshot.df[resultado.mascara]
+    sensibilidade = None
+    if variacao and len(df_plot) <= LIMITE_LINHAS_DENSIDADE:
+        # No modo densidade não há bolhas individuais para receber o anel
+        with medir_etapa("sensibilidade"):
+            completa = obter_sensibilidade(snapshot, variacao)
+        sensibilidade = Sensibilidade(completa.probabilidades[resultado.mascara], completa.celula_base[resultado.mascara])
+    with medir_etapa("figura"):
+        fig = construir_figura(df_plot, exibir_texto, dark_mode, bool(areas) or bool(quadrantes) or bool(produtos),
+                               chave_rotulos=chave[:3] + (snapshot.versao,), sensibilidade=sensibilidade)
+        figura = fig.to_dict()
+    with medir_etapa("opcoes"):
+        assinaturas = {col: hashlib.sha1(json.dumps([vals, resultado.contagens[col]], ensure_ascii=False).encode()).hexdigest()[:16]
+                       for col, vals in resultado.opcoes.items()}
+    visao = {"opcoes": resultado.opcoes, "contagens": resultado.contagens, "assinaturas": assinaturas, "figura": figura}
+    cache_visoes.guardar(chave, visao, tamanho=len(json.dumps(visao, cls=plotly.utils.PlotlyJSONEncoder)))
+    return visao
+
+# ==== Sensibilidade dos Quadrantes aos Pesos (Monte Carlo) ====
+# Quão firme é a célula de cada produto se os pesos da Nota Técnica mudarem um pouco? Cada amostra
+# multiplica os pesos dos oito indicadores por fatores sorteados, de forma independente, em
+# [1 - v, 1 + v]. Os eixos de todas as amostras saem de multiplicações de matrizes (notas x pesos),
+# com a mesma fórmula de calcular_eixo. Como cada eixo só depende das suas quatro notas, ele é
+# calculado uma vez por perfil distinto dessas notas (no máximo 6^4, qualquer que seja o portfólio),
+# e, como os pesos dos dois eixos são sorteados independentemente, a probabilidade de cada uma das
+# nove células é o produto das probabilidades das faixas de cada eixo. O resultado fica em cache
+# por versão dos dados e distribuição dos pesos (variação, número de amostras e semente fixa).
+SENSIBILIDADE_AMOSTRAS = int(os.environ.get("MATRIZ_GE_SENSIBILIDADE_AMOSTRAS", "2000"))
+# Variações (± % sobre cada peso) oferecidas na interface; qualquer outro valor desliga a análise
+SENSIBILIDADE_VARIACOES = (10, 20, 30)
+# Máximo de elementos (perfis x amostras) por bloco de amostras, para a memória não crescer com o portfólio
+SENSIBILIDADE_BLOCO = 2_000_000
+FAIXAS_EIXOS = ("baixa", "média", "alta")
+# Célula = 3 x faixa da atratividade + faixa da posição (a mesma ordem de QUADRANTES_MATRIZ.flat)
+NOMES_CELULAS = tuple(f"{QUADRANTES_MATRIZ[a, p]} (atratividade {FAIXAS_EIXOS[a]}, posição {FAIXAS_EIXOS[p]})"
+                      for a in range(3) for p in range(3))
+Sensibilidade = collections.namedtuple("Sensibilidade", ["probabilidades", "celula_base"])
+
+cache_sensibilidade = CacheLRU(max_itens=16, max_bytes=64 * 1024 * 1024)
+registro_datasets.ao_recarregar(cache_sensibilidade.limpar)
+
+def _normalizar_variacao(valor):
+    try:
+        variacao = int(valor or 0)
+    except (TypeError, ValueError):
+        return 0
+    return variacao if variacao in SENSIBILIDADE_VARIACOES else 0
+
+def sortear_pesos(variacao, amostras, semente=0):
+    """(amostras x indicadores): cada peso da Nota Técnica vezes um fator uniforme em [1 - variacao, 1 + variacao]."""
+    base = np.array([faixas.peso for faixas in INDICADORES_GE.values()])
+    return base * np.random.default_rng(semente).uniform(1 - variacao, 1 + variacao, size=(amostras, len(base)))
+
+def _colunas_eixo(eixo):
+    return np.array([faixas.eixo == eixo for faixas in INDICADORES_GE.values()])
+
+def faixas_por_pesos(notas, pesos, eixo):
+    """Faixa (0 = baixa, 1 = média, 2 = alta) do ``eixo`` para cada linha de ``notas`` (n x indicadores,
+    0 = sem dado) e cada linha de ``pesos`` (s x indicadores): matriz (n x s) int8. Sem nenhuma nota
+    válida o eixo fica vazio, como em calcular_eixo, e a faixa é -1."""
+    colunas = _colunas_eixo(eixo)
+    notas = np.asarray(notas, dtype=np.float64)[:, colunas]
+    invertidos = np.array([faixas.invertido for faixas in INDICADORES_GE.values()])[colunas]
+    validas = notas > 0
+    valores = np.where(validas, np.where(invertidos, 6 - notas, notas) * 2, 0.0)
+    soma = valores @ pesos[:, colunas].T
+    peso_total = validas @ pesos[:, colunas].T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        valor_eixo = np.where(peso_total > 0, soma / peso_total, 0.0)
+    faixas = np.digitize(valor_eixo, LIMITES_EIXOS, right=True).astype(np.int8)
+    faixas[peso_total <= 0] = -1
+    return faixas
+
+def probabilidades_celulas(notas, pesos):
+    """Probabilidade de cada linha de ``notas`` cair em cada célula sob as amostras de ``pesos``: (n x 9) float32.
+    Linhas sem nota válida em um dos eixos ficam com NaN: não há célula para sortear."""
+    notas = np.asarray(notas)
+    marginais = []
+    for eixo in (EIXO_ATRATIVIDADE, EIXO_POSICAO):
+        # Perfis distintos só nas colunas do eixo (as outras ficam zeradas), cada um como um número na base 6
+        notas_eixo = np.where(_colunas_eixo(eixo), notas, 0)
+        codigos = notas_eixo.astype(np.int64) @ 6 ** np.arange(notas_eixo.shape[1], dtype=np.int64)
+        _, primeiras, inverso = np.unique(codigos, return_index=True, return_inverse=True)
+        perfis = notas_eixo[primeiras]
+        contagens = np.zeros((len(perfis), 3), dtype=np.int64)
+        deslocamentos = np.arange(len(perfis))[:, None] * 3
+        bloco = max(1, SENSIBILIDADE_BLOCO // max(1, len(perfis)))
+        for inicio in range(0, len(pesos), bloco):
+            # Os pesos sorteados são sempre positivos: um perfil sem nota válida fica sem faixa em todas as amostras
+            faixas = np.maximum(faixas_por_pesos(perfis, pesos[inicio:inicio + bloco], eixo), 0)
+            contagens += np.bincount((deslocamentos + faixas).ravel(), minlength=len(perfis) * 3).reshape(-1, 3)
+        marginal = contagens / max(1, len(pesos))
+        marginal[~(perfis[:, _colunas_eixo(eixo)] > 0).any(axis=1)] = np.nan
+        marginais.append(marginal[inverso.reshape(-1)])
+    atratividade, posicao = marginais
+    return (atratividade[:, :, None] * posicao[:, None, :]).reshape(-1, 9).astype(np.float32)
+
+def obter_sensibilidade(snapshot, variacao):
+    """Probabilidades por célula (n x 9) e a célula em que cada linha do snapshot está plotada (n; -1 se
+    falta um eixo). A célula base vem dos eixos exibidos, não das notas: eixos que vieram prontos da
+    planilha também ancoram o anel na célula da bolha."""
+    chave = (snapshot.versao, "uniforme", variacao, SENSIBILIDADE_AMOSTRAS)
+    sensibilidade = cache_sensibilidade.obter(chave)
+    if sensibilidade is None:
+        notas = snapshot.df[list(COLUNAS_NOTAS)].to_numpy(dtype=np.int8)
+        sensibilidade = Sensibilidade(
+            probabilidades=probabilidades_celulas(notas, sortear_pesos(variacao / 100, SENSIBILIDADE_AMOSTRAS)),
+            celula_base=celulas_eixos(snapshot.df[EIXO_POSICAO].to_numpy(dtype=float, na_value=np.nan),
+                                      snapshot.df[EIXO_ATRATIVIDADE].to_numpy(dtype=float, na_value=np.nan)))
+        for array in sensibilidade:
+            array.flags.writeable = False
+        cache_sensibilidade.guardar(chave, sensibilidade, tamanho=sum(a.nbytes for a in sensibilidade))
+    return sensibilidade
+
+def construir_traco_sensibilidade(x, y, tamanhos, produtos, sensibilidade, tipo_trace):
+    """Anel em volta de cada bolha, colorido pela chance de o produto continuar na mesma célula;
+    o hover lista a probabilidade de cada célula possível. Linhas fora da matriz (sem eixo) ou sem notas
+    para sortear ficam sem anel; sem nenhuma linha com anel, devolve None."""
+    probabilidades, celula_base = sensibilidade
+    com_anel = (celula_base >= 0) & np.isfinite(probabilidades).all(axis=1)
+    if not com_anel.any():
+        return None
+    if not com_anel.all():
+        x, y, tamanhos, produtos = x[com_anel], y[com_anel], tamanhos[com_anel], produtos[com_anel]
+        probabilidades, celula_base = probabilidades[com_anel], celula_base[com_anel]
+    estabilidade = probabilidades[np.arange(len(celula_base)), celula_base]
+    detalhes = []
+    for linha in probabilidades:
+        celulas = np.flatnonzero(linha >= 0.005)
+        celulas = celulas[np.argsort(-linha[celulas], kind="stable")]
+        detalhes.append("<br>".join(f"{linha[c]:.0%} {NOMES_CELULAS[c]}" for c in celulas))
+    return tipo_trace(
+        x=x, y=y, mode="markers", name="Sensibilidade aos pesos",
+        marker=dict(
+            symbol="circle-open", size=tamanhos + 8, line=dict(width=3),
+            color=estabilidade, cmin=0.5, cmax=1, colorscale="RdYlGn",
+            colorbar=dict(title=dict(text="Mantém<br>a célula", font=dict(size=12)), tickformat=".0%",
+                          thickness=12, len=0.5, y=0.5),
+        ),
+        customdata=np.column_stack([produtos, np.asarray(detalhes, dtype=object)]),
+        hovertemplate="<b>%{customdata[0]}</b><br><b>Mantém a célula:</b> %{marker.color:.0%}<br>%{customdata[1]}<extra></extra>",
+    )
+
+# ==== API Somente Leitura (JSON, CSV e Arrow) ====
+# GET /api/portfolio[.json|.csv|.arrow]?dataset=<id>&area=...&quadrante=...&produto=... devolve o
+# portfólio filtrado com a mesma semântica dos filtros da tela. O ETag (forte) vem da assinatura do
+# conteúdo do dataset (igual em todos os workers, ao contrário do contador de versões) e do conjunto
+# de filtros; um If-None-Match que bate devolve 304 sem montar o corpo. Corpos grandes saem com
+# brotli (se o pacote estiver instalado) ou gzip, conforme o Accept-Encoding, e ficam num LRU.
+# O formato Arrow é opcional: só existe com o pyarrow instalado (fora do requirements.txt, para não
+# pesar no deploy); sem ele a rota responde 501.
+CAMPOS_API = (("Produto", "produto"), ("Grande Área", "grande_area"), ("Quadrante", "quadrante"),
+              ("Posição Competitiva", "posicao_competitiva"), ("Atratividade Mercado", "atratividade_mercado"),
+              ("Hora Aluno", "hora_aluno"))
+FORMATOS_API = {"json": "application/json", "csv": "text/csv; charset=utf-8",
+                "arrow": "application/vnd.apache.arrow.stream"}
+API_COMPRESSAO_MIN_BYTES = 1024
+
+cache_api = CacheLRU(max_itens=128, max_bytes=32 * 1024 * 1024)
+_assinaturas_dados = weakref.WeakKeyDictionary()
+
+def assinatura_dados(snapshot):
+    """SHA-256 do conteúdo do snapshot (categorias e valores), calculado uma vez por snapshot."""
+    assinatura = _assinaturas_dados.get(snapshot.indice)
+    if assinatura is None:
+        h = hashlib.sha256()
+        for col in COLUNAS_VISAO:
+            serie = snapshot.df[col]
+            h.update(col.encode())
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                h.update(json.dumps([str(c) for c in serie.cat.categories], ensure_ascii=False).encode())
+                h.update(np.ascontiguousarray(serie.cat.codes.to_numpy()).tobytes())
+            else:
+                h.update(np.ascontiguousarray(serie.to_numpy(dtype=np.float64, na_value=np.nan)).tobytes())
+        assinatura = _assinaturas_dados[snapshot.indice] = h.hexdigest()
+    return assinatura
+
+def _tabela_api(snapshot, selecoes):
+    """Linhas filtradas, com as colunas renomeadas para os nomes da API."""
+    df = snapshot.df[snapshot.indice.consultar(selecoes).mascara]
+    df = df[[col for col, _ in CAMPOS_API]].rename(columns=dict(CAMPOS_API))
+    for _, campo in CAMPOS_API:
+        if isinstance(df[campo].dtype, pd.CategoricalDtype):
+            df[campo] = df[campo].astype(object)
+        elif campo != "produto":
+            df[campo] = df[campo].astype(np.float64)
+    return df.reset_index(drop=True)
+
+def _registros_json(df):
+    """Lista JSON de registros com os float64 completos (o to_json do pandas corta em 15 dígitos)."""
+    colunas = list(df.columns)
+    valores = [[None if v != v else v for v in df[col].tolist()] for col in colunas]  # NaN -> null
+    registros = [dict(zip(colunas, linha)) for linha in zip(*valores)]
+    try:
+        import orjson  # opcional: mesma saída, serializada bem mais rápido
+        return orjson.dumps(registros).decode("utf-8")
+    except ImportError:
+        return json.dumps(registros, ensure_ascii=False, separators=(",", ":"))
+
+def _corpo_api(formato, id_dataset, assinatura, df):
+    if formato == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    if formato == "arrow":
+        import pyarrow as pa  # opcional: só este formato precisa dele
+        tabela = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(
+            {"dataset": id_dataset, "versao": assinatura[:16]})
+        buffer = pa.BufferOutputStream()
+        with pa.ipc.new_stream(buffer, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        return buffer.getvalue().to_pybytes()
+    cabecalho = json.dumps({"dataset": id_dataset, "versao": assinatura[:16], "total": len(df)},
+                           ensure_ascii=False, separators=(",", ":"))
+    registros = _registros_json(df)
+    return f'{cabecalho[:-1]},"produtos":{registros}}}'.encode("utf-8")
+
+def _comprimir(conteudo, codificacao):
+    if codificacao == "br":
+        import brotli
+        return brotli.compress(conteudo, quality=5)
+    return gzip.compress(conteudo, compresslevel=6, mtime=0)
+
+@functools.lru_cache(maxsize=None)
+def _codificacoes_disponiveis():
+    try:
+        import brotli  # noqa: F401 (opcional)
+        return ["br", "gzip"]
+    except ImportError:
+        return ["gzip"]
+
+@server.route("/api/portfolio", defaults={"formato": "json"})
+@server.route("/api/portfolio.<formato>")
+def api_portfolio(formato):
+    if formato not in FORMATOS_API:
+        flask.abort(404)
+    id_dataset = flask.request.args.get("dataset") or DATASET_PADRAO
+    if id_dataset not in registro_datasets.caminhos:
+        flask.abort(404, f"Dataset '{id_dataset}' desconhecido.")
+    snapshot = registro_datasets.obter(id_dataset).atual()
+    selecoes = {"Grande Área": flask.request.args.getlist("area"),
+                "Quadrante": flask.request.args.getlist("quadrante"),
+                "Produto": flask.request.args.getlist("produto")}
+    assinatura = assinatura_dados(snapshot)
+    chave = json.dumps([assinatura, id_dataset, formato, {col: _normalizar_selecao(v) for col, v in selecoes.items()}],
+                       ensure_ascii=False)
+    etag = hashlib.sha256(chave.encode()).hexdigest()[:32]
+    # Cada codificação é uma representação diferente, com ETag próprio; qualquer um deles vale no 304
+    codificacao = flask.request.accept_encodings.best_match(_codificacoes_disponiveis())
+    etags = {None: etag, "gzip": f"{etag}-gzip", "br": f"{etag}-br"}
+    conhecido = next((e for e in etags.values() if e in flask.request.if_none_match), None)
+    if conhecido is not None:
+        resposta = flask.Response(status=304)
+        resposta.set_etag(conhecido)
+        resposta.headers["Cache-Control"] = "no-cache"
+        resposta.headers["Vary"] = "Accept-Encoding"
+        return resposta
+
+    conteudo = cache_api.obter((etag, None))
+    if conteudo is None:
+        try:
+            conteudo = _corpo_api(formato, id_dataset, assinatura, _tabela_api(snapshot, selecoes))
+        except ImportError:
+            flask.abort(501, "Formato Arrow indisponível neste servidor: instale o pacote pyarrow.")
+        cache_api.guardar((etag, None), conteudo, tamanho=len(conteudo))
+    if codificacao and len(conteudo) >= API_COMPRESSAO_MIN_BYTES:
+        comprimido = cache_api.obter((etag, codificacao))
+        if comprimido is None:
+            comprimido = _comprimir(conteudo, codificacao)
+            cache_api.guardar((etag, codificacao), comprimido, tamanho=len(comprimido))
+        conteudo = comprimido
+    else:
+        codificacao = None
+
+    resposta = flask.Response(conteudo, content_type=FORMATOS_API[formato])
+    if codificacao:
+        resposta.headers["Content-Encoding"] = codificacao
+    if formato != "json":
+        resposta.headers["Content-Disposition"] = f'inline; filename="portfolio_{id_dataset}.{formato}"'
+    resposta.set_etag(etags[codificacao])
+    resposta.headers["Cache-Control"] = "no-cache"
+    resposta.headers["Vary"] = "Accept-Encoding"
+    return resposta
+
+# GET /api/relatorio-leitura?dataset=<id>: linhas rejeitadas e corrigidas na última leitura do Excel
+# desse dataset (o relatório é gravado junto do cache colunar e vale enquanto a planilha não mudar)
+@server.route("/api/relatorio-leitura")
+def api_relatorio_leitura():
+    id_dataset = flask.request.args.get("dataset") or DATASET_PADRAO
+    if id_dataset not in registro_datasets.caminhos:
+        flask.abort(404, f"Dataset '{id_dataset}' desconhecido.")
+    # Garante que a planilha já foi carregada (e, portanto, lida do Excel ao menos uma vez)
+    registro_datasets.obter(id_dataset).atual()
+    relatorio = relatorio_leitura(registro_datasets.caminhos[id_dataset])
+    if relatorio is None:
+        flask.abort(404, "Não há relatório de leitura para este dataset.")
+    resposta = flask.jsonify(relatorio)
+    resposta.headers["Cache-Control"] = "no-cache"
+    return resposta
+
+FILTROS_PAGINA = (
+    ("filtro-area", "Grande Área", "Área"),
+    ("filtro-quadrante", "Quadrante", "Quadrante"),
+    ("filtro-produto", "Produto", "Produto"),
+)
+
+def _formatar_numero(valor):
+    return f"{valor:,.0f}".replace(",", ".")
+
+def criar_opcoes_filtro(valores, contagens):
+    """Checkboxes de um popover, cada um com os produtos e a Hora Aluno que a opção traria."""
+    return [
+        dmc.Checkbox(
+            label=dmc.Group([
+                dmc.Text(str(valor), size="sm"),
+                dmc.Text(f"{_formatar_numero(n)} {'curso' if n == 1 else 'cursos'} · {_formatar_numero(horas)} h",
+                         size="xs", c="dimmed", style={"whiteSpace": "nowrap"}),
+            ], justify="space-between", wrap="nowrap", gap="xs"),
+            value=valor, styles={"labelWrapper": {"width": "100%"}}
+        )
+        for valor, (n, horas) in zip(valores, contagens)
+    ]
+
+# O filtro de Produto pode ter dezenas de milhares de opções: ele é buscado e paginado no servidor, e
+# só a página visível vai para o navegador. Os produtos marcados ficam sempre fixos no topo.
+PAGINA_PRODUTOS = int(os.environ.get("MATRIZ_GE_PAGINA_PRODUTOS", "50"))
+
+def pagina_opcoes(snapshot, visao, coluna, busca, pagina, selecionados):
+    """Uma página das opções facetadas de ``coluna`` que casam com ``busca``.
+
+    Devolve (checkboxes, total de páginas, página efetiva, texto de resumo). Os itens marcados vêm
+    primeiro, fora da paginação, para que desmarcar nunca dependa de achar o item de novo.
+    """
+    valores, contagens = visao["opcoes"][coluna], visao["contagens"][coluna]
+    posicoes = snapshot.indice.posicoes[coluna]
+    fixos = [v for v in selecionados if v in posicoes]
+
+    # As opções vêm na ordem dos códigos das categorias, o que permite filtrar tudo com numpy
+    codigos_opcoes = np.fromiter((posicoes[v] for v in valores), dtype=np.int64, count=len(valores))
+    exibir = ~np.isin(codigos_opcoes, [posicoes[v] for v in fixos])
+    encontrados = snapshot.indice.buscar(coluna, busca)
+    if encontrados is not None:
+        exibir &= np.isin(codigos_opcoes, encontrados)
+    restantes = np.flatnonzero(exibir)
+
+    total_paginas = max(1, math.ceil(len(restantes) / PAGINA_PRODUTOS))
+    pagina = min(max(1, int(pagina or 1)), total_paginas)
+    inicio = (pagina - 1) * PAGINA_PRODUTOS
+    pagina_itens = restantes[inicio:inicio + PAGINA_PRODUTOS]
+
+    valores_pagina = fixos + [valores[i] for i in pagina_itens]
+    i_fixos = np.searchsorted(codigos_opcoes, [posicoes[v] for v in fixos])
+    contagens_fixos = [contagens[i] if i < len(valores) and valores[i] == v else (0, 0)
+                       for i, v in zip(i_fixos, fixos)]
+    contagens_pagina = contagens_fixos + [contagens[i] for i in pagina_itens]
+    resumo = f"{_formatar_numero(len(restantes))} {'encontrado' if len(restantes) == 1 else 'encontrados'}"
+    if fixos:
+        resumo += f" · {len(fixos)} {'marcado' if len(fixos) == 1 else 'marcados'}"
+    return criar_opcoes_filtro(valores_pagina, contagens_pagina), total_paginas, pagina, resumo, \
+        [valores_pagina, contagens_pagina]
+
+# ==== Callback para Atualizar Filtros e Gráfico ====
+# Só filtros, reset, navegação e a sensibilidade aos pesos disparam a reconstrução da figura. Tema,
+# nomes dos produtos e textos dos botões são resolvidos no navegador (callbacks clientside logo abaixo).
+# As listas de opções só são reenviadas quando o conteúdo muda (comparado pela assinatura).
+# Busca e troca de página no filtro de Produto só recalculam essa lista.
+@app.callback(
+    [Output('filtro-area', 'children', allow_duplicate=True), Output('filtro-quadrante', 'children', allow_duplicate=True), Output('filtro-produto', 'children', allow_duplicate=True),
+     Output('grafico-matriz', 'figure', allow_duplicate=True),
+     Output('filtro-area', 'value', allow_duplicate=True), Output('filtro-quadrante', 'value', allow_duplicate=True), Output('filtro-produto', 'value', allow_duplicate=True),
+     Output('store-assinatura-opcoes', 'data', allow_duplicate=True),
+     Output('pagina-filtro-produto', 'total'), Output('pagina-filtro-produto', 'value'),
+     Output('resumo-filtro-produto', 'children'), Output('busca-filtro-produto', 'value')],
+    [Input('filtro-area', 'value'),
+     Input('filtro-quadrante', 'value'),
+     Input('filtro-produto', 'value'),
+     Input('botao-reset', 'n_clicks'),
+     Input('url', 'pathname'),
+     Input('seletor-dataset', 'value'),
+     Input('busca-filtro-produto', 'value'),
+     Input('pagina-filtro-produto', 'value'),
+     Input('sensibilidade-pesos', 'value')],
+    [State('exibir-texto', 'checked'),
+     State('dark-mode-switch', 'checked'),
+     State('store-assinatura-opcoes', 'data')],
+    prevent_initial_call='initial_duplicate'
+)
+@instrumentar("atualizar_tudo")
+def atualizar_tudo(selected_areas, selected_quadrantes, selected_produtos,
+                   reset_n_clicks, pathname, id_dataset, busca_produto=None, pagina_produto=None,
+                   variacao_pesos=None, exibir_texto=None, dark_mode_checked=None, assinaturas_anteriores=None):
+
+    if pathname != '/':
+        empty_fig = go.Figure()
+        axis_font_color_empty_fig = 'white' if dark_mode_checked else '#333'
+        empty_fig.update_layout(
+            xaxis_visible=False, yaxis_visible=False,
+            annotations=[dict(text="Navegue para a página da Matriz GE para visualizar os dados.", 
+                              xref="paper", yref="paper", x=0.5, y=0.5, showarrow=False, 
+                              font=dict(size=16, color=axis_font_color_empty_fig))],
+            paper_bgcolor='rgba(0,0,0,0)', 
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+
+        return ([], [], [], empty_fig, [], [], [], None, 1, 1, "", dash.no_update)
+
+
+    triggered_input_obj = callback_context.triggered[0] if callback_context.triggered else None
+    triggered_input = triggered_input_obj['prop_id'].split('.')[0] if triggered_input_obj else None
+
+    areas_val = selected_areas if selected_areas is not None else []
+    quadrantes_val = selected_quadrantes if selected_quadrantes is not None else []
+    produtos_val = selected_produtos if selected_produtos is not None else []
+
+    snapshot = registro_datasets.obter(id_dataset).atual()
+
+    # Trocar de portfólio limpa as seleções (e a busca), que pertencem ao dataset anterior
+    busca_saida = dash.no_update
+    if triggered_input in ("botao-reset", "seletor-dataset"):
+        areas_val, quadrantes_val, produtos_val = [], [], []
+        busca_produto, busca_saida = "", ""
+
+    visao = calcular_visao(snapshot, areas_val, quadrantes_val, produtos_val, exibir_texto, dark_mode_checked,
+                           variacao_pesos)
+
+    # Nova busca (ou novo conjunto de dados) volta para a primeira página
+    if triggered_input in ("busca-filtro-produto", "botao-reset", "seletor-dataset"):
+        pagina_produto = 1
+    with medir_etapa("opcoes"):
+        opcoes_produto, total_paginas, pagina_produto, resumo, conteudo = pagina_opcoes(
+            snapshot, visao, "Produto", busca_produto, pagina_produto, produtos_val)
+    assinaturas = dict(visao["assinaturas"])
+    assinaturas["Produto"] = hashlib.sha1(json.dumps(conteudo, ensure_ascii=False).encode()).hexdigest()[:16]
+    assinaturas_anteriores = assinaturas_anteriores or {}
+    mudou_produto = assinaturas_anteriores.get("Produto") != assinaturas["Produto"]
+
+    # Busca e paginação não mexem no gráfico, nos valores nem nos outros filtros
+    if triggered_input in ("busca-filtro-produto", "pagina-filtro-produto"):
+        return (dash.no_update, dash.no_update, opcoes_produto if mudou_produto else dash.no_update,
+                dash.no_update, dash.no_update, dash.no_update, dash.no_update,
+                {**assinaturas_anteriores, "Produto": assinaturas["Produto"]}, total_paginas, pagina_produto, resumo,
+                dash.no_update)
+
+    # Disparo por um único filtro (ou pela sensibilidade): os valores selecionados não mudaram e não precisam voltar
+    atualizacao_parcial = triggered_input in {f[0] for f in FILTROS_PAGINA} | {"sensibilidade-pesos"}
+    valores = {"Grande Área": areas_val, "Quadrante": quadrantes_val, "Produto": produtos_val}
+
+    children_opcoes, valores_saida = [], []
+    with medir_etapa("opcoes"):
+        for _, coluna, _ in FILTROS_PAGINA:
+            if assinaturas_anteriores.get(coluna) == assinaturas[coluna]:
+                children_opcoes.append(dash.no_update)
+            elif coluna == "Produto":
+                children_opcoes.append(opcoes_produto)
+            else:
+                children_opcoes.append(criar_opcoes_filtro(visao["opcoes"][coluna], visao["contagens"][coluna]))
+            valores_saida.append(dash.no_update if atualizacao_parcial else valores[coluna])
+
+    return (*children_opcoes, visao["figura"], *valores_saida, assinaturas, total_paginas, pagina_produto, resumo,
+            busca_saida)
+
+# ==== Callbacks no Navegador: Tema do Gráfico, Nomes dos Produtos e Textos dos Botões ====
+# São funções puras do estado dos componentes, então não precisam de ida ao servidor.
+app.clientside_callback(
+    """
+    function(checked, pathname, figura) {
+        if (pathname !== '/' || !figura || !figura.layout) {
+            return window.dash_clientside.no_update;
+        }
+        const corFonte = checked ? 'white' : '#333';
+        const layout = Object.assign({}, figura.layout);
+        ['xaxis', 'yaxis'].forEach(function(eixo) {
+            const ax = Object.assign({}, layout[eixo]);
+            const titulo = Object.assign({}, ax.title);
+            titulo.font = Object.assign({}, titulo.font, {color: corFonte});
+            ax.title = titulo;
+            ax.tickfont = Object.assign({}, ax.tickfont, {color: corFonte});
+            ax.tickcolor = checked ? '#777' : 'grey';
+            ax.linecolor = checked ? '#555' : 'lightgrey';
+            layout[eixo] = ax;
+        });
+        if (layout.annotations) {
+            layout.annotations = layout.annotations.map(function(a) {
+                return Object.assign({}, a, {font: Object.assign({}, a.font, {color: corFonte})});
+            });
+        }
+        const data = (figura.data || []).map(function(trace) {
+            const novo = Object.assign({}, trace, {textfont: Object.assign({}, trace.textfont, {color: checked ? 'white' : 'black'})});
+            // Modo densidade: a barra de cores acompanha a cor dos eixos
+            if (trace.marker && trace.marker.colorbar) {
+                const barra = Object.assign({}, trace.marker.colorbar);
+                barra.tickfont = Object.assign({}, barra.tickfont, {color: corFonte});
+                barra.title = Object.assign({}, barra.title, {font: Object.assign({}, (barra.title || {}).font, {color: corFonte})});
+                novo.marker = Object.assign({}, trace.marker, {colorbar: barra});
+            }
+            return novo;
+        });
+        return Object.assign({}, figura, {data: data, layout: layout});
+    }
+    """,
+    Output('grafico-matriz', 'figure', allow_duplicate=True),
+    Input('dark-mode-switch', 'checked'),
+    [State('url', 'pathname'),
+     State('grafico-matriz', 'figure')],
+    prevent_initial_call=True
+)
+
+app.clientside_callback(
+    """
+    function(exibir, figura) {
+        if (!figura || !figura.data) {
+            return window.dash_clientside.no_update;
+        }
+        const data = figura.data.map(function(trace) {
+            return Object.assign({}, trace, {mode: exibir ? 'markers+text' : 'markers'});
+        });
+        return Object.assign({}, figura, {data: data});
+    }
+    """,
+    Output('grafico-matriz', 'figure', allow_duplicate=True),
+    Input('exibir-texto', 'checked'),
+    State('grafico-matriz', 'figure'),
+    prevent_initial_call=True
+)
+
+# Texto do botão de cada popover: "Selecionar área", o item (até 25 caracteres) ou "N áreas selecionadas"
+for _filter_id, _coluna, _rotulo in FILTROS_PAGINA:
+    app.clientside_callback(
+        """
+        function(valores, textoPadrao) {
+            if (!valores || valores.length === 0) {
+                return textoPadrao;
+            }
+            if (valores.length === 1) {
+                const txt = String(valores[0]);
+                return txt.length <= 25 ? txt : txt.slice(0, 22) + '...';
+            }
+            const nome = textoPadrao.replace(/^Selecionar /, '');
+            return valores.length + ' ' + nome + 's selecionad' + (nome.endsWith('a') ? 'as' : 'os');
+        }
+        """,
+        Output(f"label-{_filter_id}", "children"),
+        Input(_filter_id, "value"),
+        State(f"store-label-{_filter_id}", "data")
+    )
+
+# ==== Exportação PNG em Segundo Plano ====
+# A renderização leva segundos, então roda num pool de processos com renderizadores já aquecidos.
+# O PNG pronto é guardado pela hash do conteúdo da figura + tamanho, em memória e em disco
+# (compartilhado entre os workers do gunicorn, já que a consulta de status pode cair em outro worker).
+# O disco é podado a cada nova exportação: sai o que passou de MATRIZ_GE_EXPORTACAO_TTL_HORAS e, se o
+# total ainda passar de MATRIZ_GE_EXPORTACAO_DISCO_MB, os arquivos mais antigos.
+EXPORTACAO_DIR = os.path.join(CACHE_DIR, "exportacoes")
+EXPORTACAO_PROCESSOS = int(os.environ.get("MATRIZ_GE_EXPORTACAO_PROCESSOS", "2"))
+EXPORTACAO_TIMEOUT_SEGUNDOS = 180
+EXPORTACAO_TTL_SEGUNDOS = float(os.environ.get("MATRIZ_GE_EXPORTACAO_TTL_HORAS", "24")) * 3600
+EXPORTACAO_DISCO_MAX_BYTES = int(float(os.environ.get("MATRIZ_GE_EXPORTACAO_DISCO_MB", "256")) * 1024 * 1024)
+
+cache_exportacoes = CacheLRU(max_itens=64, max_bytes=32 * 1024 * 1024)
+_exportacoes_em_andamento = {}
+_pool_exportacao = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_andamento_lock = threading.Lock()
+
+def _obter_pool_exportacao(descartar_atual=False):
+    global _pool_exportacao, _pool_pid
+    with _pool_lock:
+        if descartar_atual and _pool_exportacao is not None and _pool_pid == os.getpid():
+            _pool_exportacao.shutdown(wait=False, cancel_futures=True)
+            _pool_exportacao = None
+        if _pool_exportacao is None or _pool_pid != os.getpid():
+            import exportacao  # só carregado no primeiro download
+            # "spawn": os filhos importam só o módulo leve de renderização, sem herdar threads do worker
+            _pool_exportacao = concurrent.futures.ProcessPoolExecutor(
+                max_workers=EXPORTACAO_PROCESSOS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=exportacao.inicializar_renderizador,
+            )
+            _pool_pid = os.getpid()
+            _exportacoes_em_andamento.clear()
+        return _pool_exportacao
+
+@atexit.register
+def _encerrar_pool_exportacao():
+    if _pool_exportacao is not None and _pool_pid == os.getpid():
+        _pool_exportacao.shutdown(wait=False, cancel_futures=True)
+
+def dimensoes_exportacao(figura):
+    """Tamanho do PNG: o da imagem de fundo quando há dados e fundo; senão, o tamanho da tela."""
+    export_width = IMAGE_ORIGINAL_WIDTH
+    export_height = IMAGE_ORIGINAL_HEIGHT
+    if not figura.get("data") or "fundo" not in imagens_estaticas:
+        fig_layout = figura.get('layout', {})
+        on_screen_width = fig_layout.get('width')
+        on_screen_height = fig_layout.get('height')
+        if not isinstance(on_screen_width, (int, float)) or on_screen_width <= 0: on_screen_width = 800
+        if not isinstance(on_screen_height, (int, float)) or on_screen_height <= 0:
+            on_screen_height = int(on_screen_width / TARGET_ASPECT_RATIO) if TARGET_ASPECT_RATIO != 0 else int(on_screen_width * (IMAGE_ORIGINAL_HEIGHT / (IMAGE_ORIGINAL_WIDTH if IMAGE_ORIGINAL_WIDTH != 0 else 1)))
+
+        export_width = int(on_screen_width) if on_screen_width and on_screen_width > 0 else 800
+        export_height = int(on_screen_height) if on_screen_height and on_screen_height > 0 else 600
+    return export_width, export_height
+
+def preparar_figura_exportacao(figura):
+    """Cópia da figura com fundo branco e a imagem de fundo embutida (o renderizador não acessa as URLs do app)."""
+    figura = copy.deepcopy(figura)
+    layout = figura.setdefault("layout", {})
+    layout["paper_bgcolor"] = 'white'
+    layout["plot_bgcolor"] = 'white'
+    for img in layout.get("images", []):
+        if isinstance(img.get("source"), str) and img["source"].startswith(PREFIXO_IMAGENS + "fundo."):
+            img["source"] = data_uri_imagem("fundo")
+    return figura
+
+def chave_exportacao(figura, formato, largura, altura):
+    conteudo = json.dumps([figura, formato, largura, altura], cls=plotly.utils.PlotlyJSONEncoder, sort_keys=True)
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+def _caminho_exportacao(chave, extensao):
+    return os.path.join(EXPORTACAO_DIR, f"{chave}.{extensao}")
+
+def _gravar_atomicamente(caminho, conteudo):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    fd, caminho_tmp = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(conteudo)
+    os.replace(caminho_tmp, caminho)
+
+def podar_exportacoes_disco(agora=None):
+    """Apaga de EXPORTACAO_DIR os arquivos vencidos (os ZIPs de lote vencem antes) e, acima de EXPORTACAO_DISCO_MAX_BYTES, os mais
+    antigos. Arquivos mais novos que o timeout de uma exportação ficam: ainda podem estar sendo consultados."""
+    agora = time.time() if agora is None else agora
+    try:
+        arquivos = [(e.stat().st_mtime, e.stat().st_size, e.path, e.name) for e in os.scandir(EXPORTACAO_DIR) if e.is_file()]
+    except OSError:
+        return
+    restantes = []
+    for mtime, tamanho, caminho, nome in arquivos:
+        validade = LOTE_TTL_SEGUNDOS if nome.startswith("lote-") else EXPORTACAO_TTL_SEGUNDOS
+        if agora - mtime > validade:
+            with contextlib.suppress(OSError):
+                os.remove(caminho)
+        else:
+            restantes.append((mtime, tamanho, caminho, nome))
+    total = sum(tamanho for _, tamanho, _, _ in restantes)
+    for mtime, tamanho, caminho, nome in sorted(restantes):
+        if total <= EXPORTACAO_DISCO_MAX_BYTES:
+            break
+        if nome.endswith(".tmp") or agora - mtime < EXPORTACAO_TIMEOUT_SEGUNDOS:
+            continue
+        with contextlib.suppress(OSError):
+            os.remove(caminho)
+            total -= tamanho
+
+def _concluir_exportacao(chave, futuro):
+    try:
+        conteudo = futuro.result()
+    except Exception as e:
+        print(f"Erro ao exportar o gráfico: {e}")
+        try:
+            _gravar_atomicamente(_caminho_exportacao(chave, "erro"), str(e).encode())
+        except OSError:
+            pass
+    else:
+        cache_exportacoes.guardar(chave, conteudo, tamanho=len(conteudo))
+        try:
+            _gravar_atomicamente(_caminho_exportacao(chave, "png"), conteudo)
+        except OSError as e:
+            print(f"Alerta: não foi possível gravar a exportação em disco: {e}")
+    with _andamento_lock:
+        _exportacoes_em_andamento.pop(chave, None)
+
+def consultar_exportacao(chave):
+    """Estado de uma exportação: ("pronto", bytes), ("erro", mensagem) ou ("pendente", None)."""
+    conteudo = cache_exportacoes.obter(chave)
+    if conteudo is not None:
+        return "pronto", conteudo
+    # Sem os.path.exists antes de abrir: a poda de outro worker pode apagar o arquivo no meio
+    with contextlib.suppress(FileNotFoundError), open(_caminho_exportacao(chave, "png"), "rb") as f:
+        conteudo = f.read()
+        cache_exportacoes.guardar(chave, conteudo, tamanho=len(conteudo))
+        return "pronto", conteudo
+    if chave not in _exportacoes_em_andamento:
+        with contextlib.suppress(FileNotFoundError), open(_caminho_exportacao(chave, "erro"), "rb") as f:
+            return "erro", f.read().decode(errors="replace")
+    return "pendente", None
+
+def _submeter_renderizacao(figura_exportacao, formato, largura, altura):
+    """Envia uma renderização ao pool e devolve o futuro."""
+    import exportacao
+    pool = _obter_pool_exportacao()
+    try:
+        return pool.submit(exportacao.renderizar_imagem, figura_exportacao, formato, largura, altura)
+    except concurrent.futures.process.BrokenProcessPool:
+        # Um renderizador morreu (ex.: falta de memória): recria o pool e tenta de novo
+        pool = _obter_pool_exportacao(descartar_atual=True)
+        return pool.submit(exportacao.renderizar_imagem, figura_exportacao, formato, largura, altura)
+
+def iniciar_exportacao(figura, formato="png"):
+    """Agenda a renderização da figura (se ainda não estiver pronta) e devolve ``(chave, estado, resultado)``."""
+    largura, altura = dimensoes_exportacao(figura)
+    chave = chave_exportacao(figura, formato, largura, altura)
+    estado, resultado = consultar_exportacao(chave)
+    if estado == "pronto":
+        return chave, estado, resultado
+    with _andamento_lock:
+        if chave not in _exportacoes_em_andamento:
+            if os.path.exists(_caminho_exportacao(chave, "erro")):
+                os.remove(_caminho_exportacao(chave, "erro"))
+            podar_exportacoes_disco()
+            futuro = _submeter_renderizacao(preparar_figura_exportacao(figura), formato, largura, altura)
+            _exportacoes_em_andamento[chave] = futuro
+            futuro.add_done_callback(functools.partial(_concluir_exportacao, chave))
+    return chave, "pendente", None
+
+def _resposta_exportacao(estado, resultado, pedido):
+    """Saídas (download, pedido, intervalo desativado, status, botão carregando) para um estado."""
+    if estado == "pronto":
+        return dcc.send_bytes(resultado, "matriz_ge_app.png"), None, True, "", False
+    if estado == "erro":
+        return dash.no_update, None, True, dmc.Text(f"Falha ao gerar a imagem: {resultado}", c="red", size="xs"), False
+    return dash.no_update, pedido, False, dmc.Text("⏳ Gerando imagem...", c="dimmed", size="xs"), True
+
+# ==== Callback para Baixar Gráfico ====
+@app.callback(
+    [Output("download-imagem", "data", allow_duplicate=True),
+     Output("store-exportacao", "data", allow_duplicate=True),
+     Output("intervalo-exportacao", "disabled", allow_duplicate=True),
+     Output("status-exportacao", "children", allow_duplicate=True),
+     Output("botao-download", "loading", allow_duplicate=True)],
+    Input("botao-download", "n_clicks"),
+    [State('filtro-area', 'value'),
+     State('filtro-quadrante', 'value'),
+     State('filtro-produto', 'value'),
+     State('exibir-texto', 'checked'),
+     State('dark-mode-switch', 'checked'),
+     State('seletor-dataset', 'value'),
+     State('sensibilidade-pesos', 'value')],
+    prevent_initial_call=True
+)
+@instrumentar("baixar_grafico")
+def baixar_grafico(n_clicks, selected_areas, selected_quadrantes, selected_produtos, exibir_texto, dark_mode_checked,
+                   id_dataset=None, variacao_pesos=None):
+    if not n_clicks:
+        return (dash.no_update,) * 5
+    # A figura é a mesma da tela, reconstruída (normalmente do cache) a partir dos filtros, sem
+    # receber o dict inteiro do navegador
+    visao = calcular_visao(registro_datasets.obter(id_dataset).atual(), selected_areas or [], selected_quadrantes or [],
+                           selected_produtos or [], exibir_texto, dark_mode_checked, variacao_pesos)
+    if not visao["figura"].get("data"):
+        return (dash.no_update,) * 5
+    chave, estado, resultado = iniciar_exportacao(visao["figura"])
+    return _resposta_exportacao(estado, resultado, {"chave": chave, "inicio": time.time()})
+
+# ==== Callback para Acompanhar a Exportação ====
+@app.callback(
+    [Output("download-imagem", "data", allow_duplicate=True),
+     Output("store-exportacao", "data", allow_duplicate=True),
+     Output("intervalo-exportacao", "disabled", allow_duplicate=True),
+     Output("status-exportacao", "children", allow_duplicate=True),
+     Output("botao-download", "loading", allow_duplicate=True)],
+    Input("intervalo-exportacao", "n_intervals"),
+    State("store-exportacao", "data"),
+    prevent_initial_call=True
+)
+@instrumentar("verificar_exportacao")
+def verificar_exportacao(n_intervals, pedido):
+    if not pedido:
+        return dash.no_update, None, True, "", False
+    if time.time() - pedido["inicio"] > EXPORTACAO_TIMEOUT_SEGUNDOS:
+        return _resposta_exportacao("erro", "tempo esgotado", None)
+    estado, resultado = consultar_exportacao(pedido["chave"])
+    return _resposta_exportacao(estado, resultado, pedido)
+
+# ==== Exportação em Lote ====
+# Para os relatórios: a matriz do portfólio completo, de cada Grande Área e de cada quadrante, em PNG,
+# SVG e PDF, num único ZIP. As figuras saem de calcular_visao (as mesmas da tela) e são renderizadas
+# em paralelo no pool de exportação; cada arquivo entra no ZIP assim que fica pronto. Pela interface
+# o lote roda numa thread e o ZIP pronto fica em disco (visível a todos os workers); pela linha de
+# comando, sem subir o servidor: python exportacao.py lote.zip
+# Cada ZIP só serve ao download que o pediu: a poda do disco o apaga depois de MATRIZ_GE_LOTE_TTL_MINUTOS.
+FORMATOS_LOTE = ("png", "svg", "pdf")
+LOTE_TIMEOUT_SEGUNDOS = 30 * 60
+LOTE_TTL_SEGUNDOS = float(os.environ.get("MATRIZ_GE_LOTE_TTL_MINUTOS", "60")) * 60
+
+_lotes_em_andamento = {}
+
+def _nome_arquivo(texto):
+    """"4. Zona de Perigo: Colher" -> "4-zona-de-perigo-colher"."""
+    return "-".join(filter(None, "".join(c if c.isalnum() else "-" for c in normalizar_texto(texto)).split("-")))
+
+def visoes_lote(snapshot):
+    """(nome no ZIP, áreas, quadrantes) de cada vista do lote: completa, por área e por quadrante."""
+    yield "completo", [], []
+    for area in snapshot.indice.categorias["Grande Área"]:
+        yield f"areas/{_nome_arquivo(area)}", [area], []
+    for quadrante in snapshot.indice.categorias["Quadrante"]:
+        yield f"quadrantes/{_nome_arquivo(quadrante)}", [], [quadrante]
+
+def figuras_lote(snapshot, exibir_texto=True):
+    """Figuras do lote (tema claro, como na exportação individual), na ordem de ``visoes_lote``."""
+    return [(nome, calcular_visao(snapshot, areas, quadrantes, [], exibir_texto, False)["figura"])
+            for nome, areas, quadrantes in visoes_lote(snapshot)]
+
+def chave_lote(figuras, formatos):
+    conteudo = json.dumps([figuras, list(formatos)], cls=plotly.utils.PlotlyJSONEncoder, sort_keys=True)
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+def exportar_lote(destino, figuras, formatos=FORMATOS_LOTE, progresso=None):
+    """Renderiza cada figura em cada formato no pool e grava tudo em ``destino`` (ZIP).
+
+    Figuras sem dados são puladas. Imagens já exportadas antes (cache da exportação individual) são
+    reaproveitadas. ``progresso(feitos, total)`` é chamado a cada arquivo gravado. Devolve os nomes
+    dos arquivos no ZIP.
+    """
+    pendentes, prontos = {}, []
+    for nome, figura in figuras:
+        if not figura.get("data"):
+            continue
+        largura, altura = dimensoes_exportacao(figura)
+        figura_exportacao = None
+        for formato in formatos:
+            arquivo = f"{nome}.{formato}"
+            estado, conteudo = consultar_exportacao(chave_exportacao(figura, formato, largura, altura))
+            if estado == "pronto":
+                prontos.append((arquivo, conteudo))
+                continue
+            if figura_exportacao is None:
+                figura_exportacao = preparar_figura_exportacao(figura)
+            pendentes[_submeter_renderizacao(figura_exportacao, formato, largura, altura)] = arquivo
+
+    total = len(prontos) + len(pendentes)
+    nomes = []
+    try:
+        with zipfile.ZipFile(destino, "w") as zf:
+            def gravar(arquivo, conteudo):
+                # PNG e PDF já vêm comprimidos; só o SVG (texto) ganha com o deflate
+                compressao = zipfile.ZIP_DEFLATED if arquivo.endswith(".svg") else zipfile.ZIP_STORED
+                zf.writestr(arquivo, conteudo, compress_type=compressao)
+                nomes.append(arquivo)
+                if progresso is not None:
+                    progresso(len(nomes), total)
+
+            for arquivo, conteudo in prontos:
+                gravar(arquivo, conteudo)
+            for futuro in concurrent.futures.as_completed(pendentes, timeout=LOTE_TIMEOUT_SEGUNDOS):
+                gravar(pendentes[futuro], futuro.result())
+    except BaseException:
+        for futuro in pendentes:
+            futuro.cancel()
+        raise
+    return nomes
+
+def _caminho_lote(chave, extensao):
+    return os.path.join(EXPORTACAO_DIR, f"lote-{chave}.{extensao}")
+
+def _executar_lote(chave, figuras):
+    caminho = _caminho_lote(chave, "zip")
+    os.makedirs(EXPORTACAO_DIR, exist_ok=True)
+    fd, caminho_tmp = tempfile.mkstemp(dir=EXPORTACAO_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        exportar_lote(caminho_tmp, figuras,
+                      progresso=lambda feitos, total: _lotes_em_andamento.__setitem__(chave, (feitos, total)))
+        os.replace(caminho_tmp, caminho)
+    except Exception as e:
+        print(f"Erro ao exportar o lote: {e}")
+        with contextlib.suppress(OSError):
+            os.remove(caminho_tmp)
+        with contextlib.suppress(OSError):
+            _gravar_atomicamente(_caminho_lote(chave, "erro"), str(e).encode())
+    finally:
+        with _andamento_lock:
+            _lotes_em_andamento.pop(chave, None)
+
+def consultar_lote(chave):
+    """Estado de um lote: ("pronto", caminho do ZIP), ("erro", mensagem) ou ("pendente", (feitos, total))."""
+    caminho = _caminho_lote(chave, "zip")
+    if os.path.exists(caminho):
+        return "pronto", caminho
+    if chave not in _lotes_em_andamento and os.path.exists(_caminho_lote(chave, "erro")):
+        with open(_caminho_lote(chave, "erro"), "rb") as f:
+            return "erro", f.read().decode(errors="replace")
+    return "pendente", _lotes_em_andamento.get(chave)
+
+def iniciar_lote(snapshot, exibir_texto=True):
+    """Agenda o lote do snapshot (se ainda não existir) e devolve ``(chave, estado, resultado)``."""
+    figuras = figuras_lote(snapshot, exibir_texto)
+    chave = chave_lote(figuras, FORMATOS_LOTE)
+    estado, resultado = consultar_lote(chave)
+    if estado != "pendente":
+        return chave, estado, resultado
+    with _andamento_lock:
+        if chave not in _lotes_em_andamento:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(_caminho_lote(chave, "erro"))
+            podar_exportacoes_disco()
+            _lotes_em_andamento[chave] = None
+            threading.Thread(target=_executar_lote, args=(chave, figuras), daemon=True,
+                             name=f"lote-{chave[:8]}").start()
+    return chave, "pendente", _lotes_em_andamento.get(chave)
+
+def _resposta_lote(estado, resultado, pedido):
+    """Saídas (download, pedido, intervalo desativado, status, botão carregando) para um estado do lote."""
+    if estado == "pronto":
+        return dcc.send_file(resultado, "matriz_ge_lote.zip"), None, True, "", False
+    if estado == "erro":
+        return dash.no_update, None, True, dmc.Text(f"Falha ao gerar o lote: {resultado}", c="red", size="xs"), False
+    texto = "⏳ Gerando lote..." if not resultado else f"⏳ Gerando lote: {resultado[0]}/{resultado[1]} arquivos..."
+    return dash.no_update, pedido, False, dmc.Text(texto, c="dimmed", size="xs"), True
+
+@app.callback(
+    [Output("download-lote", "data", allow_duplicate=True),
+     Output("store-lote", "data", allow_duplicate=True),
+     Output("intervalo-lote", "disabled", allow_duplicate=True),
+     Output("status-lote", "children", allow_duplicate=True),
+     Output("botao-lote", "loading", allow_duplicate=True)],
+    Input("botao-lote", "n_clicks"),
+    [State('exibir-texto', 'checked'),
+     State('seletor-dataset', 'value')],
+    prevent_initial_call=True
+)
+@instrumentar("exportar_lote")
+def baixar_lote(n_clicks, exibir_texto, id_dataset=None):
+    if not n_clicks:
+        return (dash.no_update,) * 5
+    chave, estado, resultado = iniciar_lote(registro_datasets.obter(id_dataset).atual(), exibir_texto)
+    return _resposta_lote(estado, resultado, {"chave": chave, "inicio": time.time()})
+
+@app.callback(
+    [Output("download-lote", "data", allow_duplicate=True),
+     Output("store-lote", "data", allow_duplicate=True),
+     Output("intervalo-lote", "disabled", allow_duplicate=True),
+     Output("status-lote", "children", allow_duplicate=True),
+     Output("botao-lote", "loading", allow_duplicate=True)],
+    Input("intervalo-lote", "n_intervals"),
+    State("store-lote", "data"),
+    prevent_initial_call=True
+)
+@instrumentar("verificar_lote")
+def verificar_lote(n_intervals, pedido):
+    if not pedido:
+        return dash.no_update, None, True, "", False
+    if time.time() - pedido["inicio"] > LOTE_TIMEOUT_SEGUNDOS:
+        return _resposta_lote("erro", "tempo esgotado", None)
+    estado, resultado = consultar_lote(pedido["chave"])
+    return _resposta_lote(estado, resultado, pedido)
+
+# ==== Evolução por Semestre (trajetórias) ====
+# Cada semestre de MATRIZ_GE_SEMESTRES é um dataset do registro. As trajetórias são montadas uma vez
+# por combinação de versões desses datasets: um índice fixo de produtos (a união dos semestres) e,
+# por semestre, arrays float32 com as coordenadas e a Hora Aluno de cada produto (NaN quando ele
+# não existe naquele semestre). A figura é enviada uma vez; mover o slider só envia um Patch com
+# os arrays do semestre escolhido, e o plotly anima a transição dos pontos.
+Trajetorias = collections.namedtuple("Trajetorias", ["semestres", "produtos", "areas", "x", "y", "hora_aluno"])
+TRAJETORIA_TRANSICAO_MS = 500
+
+cache_trajetorias = CacheLRU(max_itens=8, max_bytes=64 * 1024 * 1024)
+
+def construir_trajetorias(semestres):
+    """``semestres``: lista de (rótulo, DataFrame da aba "Análise"), em ordem cronológica.
+    Produtos repetidos num semestre ficam com a primeira linha; a área é a do semestre mais recente."""
+    dfs = [(rotulo, df.drop_duplicates("Produto")) for rotulo, df in semestres]
+    indice = pd.Index(sorted(set().union(*(df["Produto"].astype(str) for _, df in dfs))))
+    forma = (len(dfs), len(indice))
+    x, y, hora_aluno = (np.full(forma, np.nan, dtype=np.float32) for _ in range(3))
+    areas = np.full(len(indice), "", dtype=object)
+    for k, (_, df) in enumerate(dfs):
+        linhas = indice.get_indexer(df["Produto"].astype(str))
+        x[k, linhas] = df["Posição Competitiva"].to_numpy(dtype=np.float32, na_value=np.nan)
+        y[k, linhas] = df["Atratividade Mercado"].to_numpy(dtype=np.float32, na_value=np.nan)
+        hora_aluno[k, linhas] = df["Hora Aluno"].to_numpy(dtype=np.float32, na_value=np.nan)
+        areas[linhas] = df["Grande Área"].astype(str).to_numpy()
+    for array in (x, y, hora_aluno):
+        array.flags.writeable = False
+    return Trajetorias(semestres=tuple(rotulo for rotulo, _ in dfs), produtos=indice.to_numpy(dtype=object),
+                       areas=areas, x=x, y=y, hora_aluno=hora_aluno)
+
+def obter_trajetorias():
+    """Trajetórias dos semestres configurados, do cache enquanto nenhuma planilha mudar de versão."""
+    snapshots = [(semestre, registro_datasets.obter(id_dataset).atual()) for semestre, id_dataset in SEMESTRES.items()]
+    chave = tuple((semestre, SEMESTRES[semestre], snapshot.versao) for semestre, snapshot in snapshots)
+    trajetorias = cache_trajetorias.obter(chave)
+    if trajetorias is None:
+        trajetorias = construir_trajetorias([(semestre, snapshot.df) for semestre, snapshot in snapshots])
+        tamanho = sum(a.nbytes for a in (trajetorias.x, trajetorias.y, trajetorias.hora_aluno)) + 64 * len(trajetorias.produtos)
+        cache_trajetorias.guardar(chave, trajetorias, tamanho=tamanho)
+    return trajetorias
+
+def _array_plotly(valores):
+    """Array float32 no formato tipado do plotly.js ({dtype, bdata}), bem menor que uma lista JSON."""
+    return {"dtype": "f4", "bdata": base64.b64encode(np.ascontiguousarray(valores, dtype=np.float32).tobytes()).decode()}
+
+def linhas_trajetorias(trajetorias, areas):
+    """Posições no índice fixo dos produtos das ``areas`` escolhidas (todas, se vazio)."""
+    if not areas:
+        return np.arange(len(trajetorias.produtos))
+    return np.flatnonzero(np.isin(trajetorias.areas, list(areas)))
+
+def quadro_trajetorias(trajetorias, semestre, linhas):
+    """Propriedades do trace de pontos que mudam de um semestre para o outro."""
+    hora_max = np.nanmax(trajetorias.hora_aluno) if np.isfinite(trajetorias.hora_aluno).any() else 1.0
+    fator_escala = hora_max / 150 if hora_max > 0 else 1.0  # mesma escala da Matriz, fixa entre semestres
+    tamanhos = np.maximum(np.nan_to_num(trajetorias.hora_aluno[semestre, linhas] / fator_escala, nan=1.0), 1)
+    return {
+        "x": _array_plotly(trajetorias.x[semestre, linhas]),
+        "y": _array_plotly(trajetorias.y[semestre, linhas]),
+        "marker.size": _array_plotly(tamanhos),
+        "hovertemplate": ("<b>%{customdata}</b><br><b>Posição Competitiva:</b> %{x:.1f}<br><b>Atratividade:</b> %{y:.1f}"
+                          f"<extra>{trajetorias.semestres[semestre]}</extra>"),
+    }
+
+def construir_figura_evolucao(trajetorias, semestre, linhas, exibir_trajetorias, dark_mode):
+    """Figura da página de evolução: fundo e eixos da Matriz, trajetórias e os pontos do semestre."""
+    fig = construir_figura(pd.DataFrame(columns=list(COLUNAS_VISAO)), False, dark_mode, False)
+    separador = np.full((1, len(linhas)), np.nan, dtype=np.float32)
+    # Todas as trajetórias num único trace de linhas, separadas por NaN
+    fig.add_trace(go.Scatter(
+        x=np.vstack([trajetorias.x[:, linhas], separador]).T.ravel(),
+        y=np.vstack([trajetorias.y[:, linhas], separador]).T.ravel(),
+        mode="lines+markers", name="Trajetórias", visible=exibir_trajetorias, hoverinfo="skip",
+        line=dict(color="rgba(255,255,255,0.6)" if dark_mode else "rgba(40,40,40,0.45)", width=1.5),
+        marker=dict(size=4, color="rgba(255,255,255,0.6)" if dark_mode else "rgba(40,40,40,0.45)")
+    ))
+    tipo_trace = go.Scattergl if len(linhas) > LIMITE_LINHAS_SCATTERGL else go.Scatter
+    fig.add_trace(tipo_trace(
+        mode="markers", name="Produtos", customdata=trajetorias.produtos[linhas],
+        marker=dict(color="#FFFFFF", opacity=0.45, line=dict(color="#333", width=1))
+    ))
+    figura = fig.to_dict()
+    quadro = quadro_trajetorias(trajetorias, semestre, linhas)
+    figura["data"][1].update(x=quadro["x"], y=quadro["y"], hovertemplate=quadro["hovertemplate"])
+    figura["data"][1]["marker"]["size"] = quadro["marker.size"]
+    figura["layout"]["transition"] = {"duration": TRAJETORIA_TRANSICAO_MS, "easing": "cubic-in-out"}
+    return figura
+
+def _semestre_valido(trajetorias, semestre):
+    return min(max(int(semestre if semestre is not None else len(trajetorias.semestres) - 1), 0),
+               len(trajetorias.semestres) - 1)
+
+# ==== Callback da Figura de Evolução (carga, áreas e tema) ====
+@app.callback(
+    Output("grafico-evolucao", "figure"),
+    [Input("evolucao-areas", "value"),
+     Input("dark-mode-switch", "checked")],
+    [State("evolucao-semestre", "value"),
+     State("evolucao-trajetorias", "checked")]
+)
+@instrumentar("atualizar_evolucao")
+def atualizar_evolucao(areas, dark_mode_checked, semestre, exibir_trajetorias):
+    trajetorias = obter_trajetorias()
+    return construir_figura_evolucao(trajetorias, _semestre_valido(trajetorias, semestre),
+                                     linhas_trajetorias(trajetorias, areas), bool(exibir_trajetorias), dark_mode_checked)
+
+# ==== Callback do Slider de Semestre e das Trajetórias (só o delta) ====
+@app.callback(
+    Output("grafico-evolucao", "figure", allow_duplicate=True),
+    [Input("evolucao-semestre", "value"),
+     Input("evolucao-trajetorias", "checked")],
+    State("evolucao-areas", "value"),
+    prevent_initial_call=True
+)
+@instrumentar("mover_semestre")
+def mover_semestre(semestre, exibir_trajetorias, areas):
+    triggered = callback_context.triggered[0]["prop_id"].split(".")[0] if callback_context.triggered else None
+    patch = dash.Patch()
+    if triggered == "evolucao-trajetorias":
+        patch["data"][0]["visible"] = bool(exibir_trajetorias)
+        return patch
+    trajetorias = obter_trajetorias()
+    quadro = quadro_trajetorias(trajetorias, _semestre_valido(trajetorias, semestre), linhas_trajetorias(trajetorias, areas))
+    patch["data"][1]["x"] = quadro["x"]
+    patch["data"][1]["y"] = quadro["y"]
+    patch["data"][1]["marker"]["size"] = quadro["marker.size"]
+    patch["data"][1]["hovertemplate"] = quadro["hovertemplate"]
+    return patch
+
+marcar_etapa_boot("callbacks")
+print("Inicialização em {:.2f} s ({}).".format(
+    sum(TEMPOS_BOOT.values()), ", ".join(f"{etapa} {segundos:.2f} s" for etapa, segundos in TEMPOS_BOOT.items())))
+
+
+if __name__ == '__main__':
+    app.run(debug=True)
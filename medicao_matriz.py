@@ -0,0 +1,143 @@
+# ==== Utilitários de Medição (benchmark e teste de carga) ====
+# Peças comuns ao benchmark_matriz.py e ao carga_matriz.py: o cliente que dispara callbacks do Dash,
+# os percentis de latência, a subida do gunicorn e a memória dos workers. Não importa o app: o teste
+# de carga roda o servidor em outro processo e não deve pagar a carga do dashboard no gerador.
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ClienteCallbacks:
+    """Monta as requisições de /_dash-update-component como o navegador faria. As subclasses definem
+    ``dependencias`` (o JSON de /_dash-dependencies) e ``_enviar``."""
+
+    dependencias = ()
+
+    def _callback(self, id_entrada, propriedade, saida=None):
+        for dep in self.dependencias:
+            if dep.get("clientside_function"):
+                continue
+            if saida is not None and saida not in dep["output"]:
+                continue
+            if any(e["id"] == id_entrada and e["property"] == propriedade for e in dep["inputs"]):
+                return dep
+        raise KeyError(f"Nenhum callback com a entrada {id_entrada}.{propriedade}")
+
+    @staticmethod
+    def _saidas(dep):
+        saidas = []
+        for saida in dep["output"].strip(".").split("..."):
+            id_saida, propriedade = saida.split("@")[0].rsplit(".", 1)
+            saidas.append({"id": id_saida, "property": propriedade})
+        return saidas if dep["output"].startswith("..") else saidas[0]
+
+    def disparar(self, id_entrada, propriedade, valores, saida=None):
+        """Executa o callback que tem ``id_entrada.propriedade`` como entrada (e ``saida`` na saída, se
+        informada). Retorna ``(json, bytes)``."""
+        dep = self._callback(id_entrada, propriedade, saida)
+        corpo = {
+            "output": dep["output"],
+            "outputs": self._saidas(dep),
+            "inputs": [dict(e, value=valores.get(e["id"])) for e in dep["inputs"]],
+            "state": [dict(e, value=valores.get(e["id"])) for e in dep["state"]],
+            "changedPropIds": [f"{id_entrada}.{propriedade}"],
+        }
+        status, dados = self._enviar(corpo)
+        if status == 204:
+            return {}, 0
+        if status != 200:
+            raise RuntimeError(f"Callback {dep['output']} falhou ({status}): {dados[:300]!r}")
+        return json.loads(dados), len(dados)
+
+    def _enviar(self, corpo):
+        """POST em /_dash-update-component; devolve ``(status, bytes)``."""
+        raise NotImplementedError
+
+
+def percentis(amostras_ms):
+    ordenadas = sorted(amostras_ms)
+    def p(q):
+        return round(float(np.percentile(ordenadas, q)), 3)
+    return {"min": round(ordenadas[0], 3), "p50": p(50), "p90": p(90), "p99": p(99),
+            "max": round(ordenadas[-1], 3), "media": round(statistics.fmean(ordenadas), 3)}
+
+
+def _filhos(pid):
+    filhos = []
+    for entrada in os.listdir("/proc"):
+        if entrada.isdigit():
+            try:
+                with open(f"/proc/{entrada}/stat") as f:
+                    # O nome do processo pode ter espaços: o ppid é o 2º campo depois do ")"
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        filhos.append(int(entrada))
+            except (OSError, IndexError, ValueError):
+                continue
+    return filhos
+
+
+def _memoria_processo(pid):
+    """RSS e PSS (bytes) de ``pid``, lidos de /proc/<pid>/smaps_rollup (Linux)."""
+    memoria = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for linha in f:
+                campo, _, valor = linha.partition(":")
+                if campo in ("Rss", "Pss"):
+                    memoria[campo.lower()] = int(valor.split()[0]) * 1024
+    except OSError:
+        pass
+    return memoria
+
+
+@contextlib.contextmanager
+def subir_gunicorn(argumentos, porta, env=None):
+    """Sobe ``gunicorn <argumentos> matriz_GE_dash:server`` em 127.0.0.1:``porta`` e espera o app
+    responder. Entrega o processo mestre; encerra tudo na saída."""
+    comando = [sys.executable, "-m", "gunicorn", *argumentos, "-b", f"127.0.0.1:{porta}", "matriz_GE_dash:server"]
+    processo = subprocess.Popen(comando, cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                env=dict(os.environ, **(env or {})))
+    try:
+        limite = time.time() + 120
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{porta}/", timeout=5).read()
+                break
+            except OSError:
+                if time.time() > limite or processo.poll() is not None:
+                    raise RuntimeError("gunicorn não respondeu")
+                time.sleep(0.5)
+        yield processo
+    finally:
+        processo.terminate()
+        processo.wait(timeout=30)
+
+
+def memoria_workers_mb(processo):
+    """RSS/PSS (MB) do mestre do gunicorn e de cada worker (Linux)."""
+    def mb(pid):
+        return {k: round(v / 2**20, 1) for k, v in _memoria_processo(pid).items()}
+    return {"mestre_mb": mb(processo.pid), "por_worker_mb": [mb(pid) for pid in _filhos(processo.pid)]}
+
+
+def ambiente():
+    """Versões e commit da execução, gravados junto dos resultados para comparar execuções com diff."""
+    import pandas as pd
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=BASE_DIR).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"python": platform.python_version(), "plataforma": platform.platform(), "commit": commit,
+            "pandas": pd.__version__, "numpy": np.__version__}
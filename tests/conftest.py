@@ -0,0 +1,6 @@
+import os
+import sys
+
+# O monitor da planilha não deve rodar durante os testes
+os.environ.setdefault("MATRIZ_GE_RECARGA_INTERVALO", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
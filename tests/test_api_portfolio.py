@@ -0,0 +1,98 @@
+import gzip
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import matriz_GE_dash as app_matriz
+
+
+@pytest.fixture
+def cliente():
+    app_matriz.cache_api.limpar()
+    return app_matriz.server.test_client()
+
+
+def test_json_com_etag_forte(cliente):
+    resposta = cliente.get("/api/portfolio")
+    assert resposta.status_code == 200
+    assert resposta.headers["Content-Type"] == "application/json"
+    assert resposta.headers["Vary"] == "Accept-Encoding"
+    assert "Content-Encoding" not in resposta.headers
+    etag, fraco = resposta.get_etag()
+    assert etag and not fraco
+    corpo = json.loads(resposta.data)
+    df = app_matriz.registro_datasets.obter().atual().df
+    assert corpo["total"] == len(df) == len(corpo["produtos"])
+
+
+def test_eixos_saem_com_precisao_float64():
+    df = pd.DataFrame({"Grande Área": ["SAÚDE", "GESTÃO"], "Quadrante": ["1. Manter", None],
+                       "Produto": ["Enfermagem", "Logística"], "Hora Aluno": [6542.3, np.nan],
+                       "Posição Competitiva": [10 / 3, 7.0], "Atratividade Mercado": [2 / 3, np.nan]})
+    compacto = app_matriz.compactar_analise(df)
+    snapshot = app_matriz.SnapshotDataset(compacto, app_matriz.IndiceFiltros(compacto), 1, "teste", None)
+    tabela = app_matriz._tabela_api(snapshot, {})
+    corpo = json.loads(app_matriz._corpo_api("json", "teste", "0" * 64, tabela))
+    assert corpo["produtos"][0] == {"produto": "Enfermagem", "grande_area": "SAÚDE", "quadrante": "1. Manter",
+                                    "posicao_competitiva": 10 / 3, "atratividade_mercado": 2 / 3,
+                                    "hora_aluno": 6542.3}
+    assert corpo["produtos"][1]["quadrante"] is None
+    assert corpo["produtos"][1]["atratividade_mercado"] is None
+    assert "3.3333333333333335" in app_matriz._corpo_api("csv", "teste", "0" * 64, tabela).decode()
+
+
+def test_if_none_match_devolve_304_sem_corpo(cliente):
+    etag = cliente.get("/api/portfolio").get_etag()[0]
+    resposta = cliente.get("/api/portfolio", headers={"If-None-Match": f'"{etag}"'})
+    assert resposta.status_code == 304
+    assert resposta.data == b""
+    assert resposta.get_etag()[0] == etag
+
+
+def test_etag_muda_com_filtros_e_formato(cliente):
+    df = app_matriz.registro_datasets.obter().atual().df
+    area = str(df["Grande Área"].iloc[0])
+    etags = {cliente.get(url).get_etag()[0]
+             for url in ("/api/portfolio", f"/api/portfolio?area={area}", "/api/portfolio.csv")}
+    assert len(etags) == 3
+    # A mesma seleção, em outra ordem, é a mesma representação
+    assert (cliente.get("/api/portfolio?quadrante=a&quadrante=b").get_etag()
+            == cliente.get("/api/portfolio?quadrante=b&quadrante=a").get_etag())
+    etag = cliente.get("/api/portfolio").get_etag()[0]
+    assert cliente.get(f"/api/portfolio?area={area}", headers={"If-None-Match": f'"{etag}"'}).status_code == 200
+
+
+def test_gzip_negociado_pelo_accept_encoding(cliente):
+    identidade = cliente.get("/api/portfolio", headers={"Accept-Encoding": "identity"})
+    assert len(identidade.data) >= app_matriz.API_COMPRESSAO_MIN_BYTES
+    resposta = cliente.get("/api/portfolio", headers={"Accept-Encoding": "gzip"})
+    assert resposta.status_code == 200
+    assert resposta.headers["Content-Encoding"] == "gzip"
+    assert resposta.get_etag()[0] == identidade.get_etag()[0] + "-gzip"
+    assert gzip.decompress(resposta.data) == identidade.data
+    # Qualquer uma das representações vale no If-None-Match
+    for etag in (identidade.get_etag()[0], resposta.get_etag()[0]):
+        revalidacao = cliente.get("/api/portfolio", headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{etag}"'})
+        assert revalidacao.status_code == 304
+
+
+def test_resposta_pequena_nao_e_comprimida(cliente):
+    resposta = cliente.get("/api/portfolio?area=ÁREA INEXISTENTE", headers={"Accept-Encoding": "gzip"})
+    assert resposta.status_code == 200
+    assert json.loads(resposta.data)["produtos"] == []
+    assert "Content-Encoding" not in resposta.headers
+
+
+def test_dataset_ou_formato_desconhecido_devolve_404(cliente):
+    assert cliente.get("/api/portfolio?dataset=inexistente").status_code == 404
+    assert cliente.get("/api/portfolio.xml").status_code == 404
+
+
+def test_arrow_sem_pyarrow_devolve_501(cliente, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    resposta = cliente.get("/api/portfolio.arrow")
+    assert resposta.status_code == 501
+    assert b"pyarrow" in resposta.data
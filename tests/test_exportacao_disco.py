@@ -0,0 +1,55 @@
+import os
+import time
+
+import pytest
+
+import matriz_GE_dash as app_matriz
+
+
+@pytest.fixture
+def pasta(monkeypatch, tmp_path):
+    monkeypatch.setattr(app_matriz, "EXPORTACAO_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _arquivo(pasta, nome, tamanho, idade):
+    caminho = pasta / nome
+    caminho.write_bytes(b"x" * tamanho)
+    mtime = time.time() - idade
+    os.utime(caminho, (mtime, mtime))
+    return caminho
+
+
+def test_poda_arquivos_vencidos(pasta, monkeypatch):
+    monkeypatch.setattr(app_matriz, "EXPORTACAO_TTL_SEGUNDOS", 3600)
+    velho = _arquivo(pasta, "a.png", 10, idade=7200)
+    novo = _arquivo(pasta, "b.png", 10, idade=60)
+    app_matriz.podar_exportacoes_disco()
+    assert not velho.exists()
+    assert novo.exists()
+
+
+def test_poda_os_mais_antigos_acima_do_limite(pasta, monkeypatch):
+    monkeypatch.setattr(app_matriz, "EXPORTACAO_DISCO_MAX_BYTES", 250)
+    antigos = [_arquivo(pasta, f"{i}.png", 100, idade=3000 - i * 100) for i in range(3)]
+    recente = _arquivo(pasta, "recente.png", 100, idade=5)
+    app_matriz.podar_exportacoes_disco()
+    # Sai o mais antigo até caber; o recente pode estar sendo consultado e fica mesmo passando do limite
+    assert [a.exists() for a in antigos] == [False, False, True]
+    assert recente.exists()
+
+
+def test_consulta_de_arquivo_podado_fica_pendente(pasta):
+    app_matriz.cache_exportacoes.limpar()
+    assert app_matriz.consultar_exportacao("inexistente") == ("pendente", None)
+    _arquivo(pasta, "pronta.png", 3, idade=0)
+    assert app_matriz.consultar_exportacao("pronta") == ("pronto", b"xxx")
+
+
+def test_zip_de_lote_vence_antes_das_imagens(pasta, monkeypatch):
+    monkeypatch.setattr(app_matriz, "LOTE_TTL_SEGUNDOS", 600)
+    lote = _arquivo(pasta, "lote-abc.zip", 10, idade=1200)
+    png = _arquivo(pasta, "abc.png", 10, idade=1200)
+    app_matriz.podar_exportacoes_disco()
+    assert not lote.exists()
+    assert png.exists()
@@ -0,0 +1,49 @@
+import matriz_GE_dash as app_matriz
+
+NOMES = ["TÉCNICO EM QUÍMICA", "Técnico em Enfermagem", "AUXILIAR DE COZINHA", "Cozinheiro", "Eletricista Predial"]
+
+
+def _encontrados(indice, consulta):
+    return [NOMES[i] for i in indice.buscar(consulta)]
+
+
+def test_normalizar_texto_remove_acento_e_caixa():
+    assert app_matriz.normalizar_texto("TÉCNICO EM QUÍMICA") == "tecnico em quimica"
+    assert app_matriz.normalizar_texto("Ação") == "acao"
+
+
+def test_busca_ignora_acentos_e_caixa():
+    indice = app_matriz.IndiceBusca(NOMES)
+    esperado = ["TÉCNICO EM QUÍMICA", "Técnico em Enfermagem"]
+    for consulta in ("tecnico", "TÉCNICO", "Técnico", "TECNICO"):
+        assert _encontrados(indice, consulta) == esperado
+    assert _encontrados(indice, "quimica") == ["TÉCNICO EM QUÍMICA"]
+    assert _encontrados(indice, "QUÍMICA") == ["TÉCNICO EM QUÍMICA"]
+
+
+def test_busca_por_trecho_e_prefixo():
+    indice = app_matriz.IndiceBusca(NOMES)
+    # Trechos de 3+ letras casam em qualquer ponto do nome
+    assert _encontrados(indice, "ozinh") == ["AUXILIAR DE COZINHA", "Cozinheiro"]
+    # Termos curtos só casam com o início de uma palavra
+    assert _encontrados(indice, "em") == ["TÉCNICO EM QUÍMICA", "Técnico em Enfermagem"]
+    assert _encontrados(indice, "co") == ["AUXILIAR DE COZINHA", "Cozinheiro"]
+
+
+def test_busca_exige_todos_os_termos():
+    indice = app_matriz.IndiceBusca(NOMES)
+    assert _encontrados(indice, "técnico ENFERM") == ["Técnico em Enfermagem"]
+    assert _encontrados(indice, "tecnico cozinha") == []
+
+
+def test_busca_vazia_devolve_none():
+    indice = app_matriz.IndiceBusca(NOMES)
+    assert indice.buscar("") is None
+    assert indice.buscar("   ") is None
+
+
+def test_resultado_repetido_vem_do_cache_e_e_somente_leitura():
+    indice = app_matriz.IndiceBusca(NOMES)
+    primeiro = indice.buscar("Cozinha")
+    assert indice.buscar("cozinha") is primeiro
+    assert not primeiro.flags.writeable
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import matriz_GE_dash as app_matriz
+
+
+@pytest.fixture
+def indice():
+    df = pd.DataFrame({
+        "Grande Área": ["SAÚDE", "SAÚDE", "GESTÃO", "GESTÃO", None],
+        "Quadrante": ["1. Manter", "2. Investir", "1. Manter", "1. Manter", "2. Investir"],
+        "Produto": ["Enfermagem", "Radiologia", "Logística", "Logística", "Sem Área"],
+        "Hora Aluno": [100.0, 50.0, 30.0, 20.0, np.nan],
+    })
+    return app_matriz.IndiceFiltros(df)
+
+
+def test_facetas_sem_selecao_conta_produtos_e_horas(indice):
+    opcoes, contagens = indice.facetas("Grande Área", {})
+    # Ordenadas e sem o nulo
+    assert opcoes == ["GESTÃO", "SAÚDE"]
+    assert contagens == [(2, 50.0), (2, 150.0)]
+
+
+def test_facetas_ignora_a_propria_selecao(indice):
+    selecoes = {"Grande Área": ["SAÚDE"], "Quadrante": ["1. Manter"]}
+    opcoes_area, contagens_area = indice.facetas("Grande Área", selecoes)
+    assert opcoes_area == ["GESTÃO", "SAÚDE"]
+    assert contagens_area == [(2, 50.0), (1, 100.0)]
+    opcoes_quadrante, _ = indice.facetas("Quadrante", selecoes)
+    assert opcoes_quadrante == ["1. Manter", "2. Investir"]
+
+
+def test_facetas_com_valor_inexistente_fica_vazia(indice):
+    assert indice.facetas("Produto", {"Grande Área": ["ÁREA INEXISTENTE"]}) == ([], [])
+
+
+def test_consultar_sem_selecao_devolve_todas_as_linhas(indice):
+    resultado = indice.consultar({})
+    assert resultado.mascara.all()
+    assert resultado.opcoes["Produto"] == ["Enfermagem", "Logística", "Radiologia", "Sem Área"]
+
+
+def test_consultar_combina_colunas(indice):
+    resultado = indice.consultar({"Grande Área": ["SAÚDE", "GESTÃO"], "Quadrante": ["1. Manter"]})
+    assert resultado.mascara.tolist() == [True, False, True, True, False]
+    assert resultado.opcoes["Produto"] == ["Enfermagem", "Logística"]
+    assert resultado.contagens["Produto"] == [(1, 100.0), (2, 50.0)]
+
+
+def test_consultar_bate_com_filtro_do_pandas():
+    df = pd.DataFrame({
+        "Grande Área": np.random.default_rng(0).choice(["A", "B", "C"], 500),
+        "Quadrante": np.random.default_rng(1).choice(["Q1", "Q2", "Q3", "Q4"], 500),
+        "Produto": [f"P{i % 40}" for i in range(500)],
+        "Hora Aluno": np.arange(500, dtype=float),
+    })
+    indice = app_matriz.IndiceFiltros(df)
+    selecoes = {"Grande Área": ["A", "C"], "Quadrante": ["Q2"]}
+    esperado = df["Grande Área"].isin(["A", "C"]) & df["Quadrante"].isin(["Q2"])
+    resultado = indice.consultar(selecoes)
+    assert resultado.mascara.tolist() == esperado.tolist()
+    produtos = df[esperado].groupby("Produto")["Hora Aluno"].agg(["size", "sum"])
+    assert resultado.opcoes["Produto"] == produtos.index.tolist()
+    assert resultado.contagens["Produto"] == [(int(n), float(h)) for n, h in produtos.itertuples(index=False)]
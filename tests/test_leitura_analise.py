@@ -0,0 +1,136 @@
+import math
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+import matriz_GE_dash as app_matriz
+
+NOTAS_OK = [3, 3, 3, 3]  # posição: (3 + 3 + 3 + 3) / 4 x 2 = 6
+NOTAS_ATR = [3, 3, 2, 2]  # atratividade, com os dois últimos invertidos: (3 + 3 + 4 + 4) / 4 x 2 = 7
+
+
+def _linha(produto, hora_aluno=10, posicao=NOTAS_OK, eixo_posicao=None, atratividade=NOTAS_ATR,
+           eixo_atratividade=None, quadrante=None, modalidade="HT", area="SAÚDE"):
+    return [None, modalidade, area, produto, hora_aluno, *posicao, eixo_posicao, *atratividade, eixo_atratividade, quadrante]
+
+
+@pytest.fixture
+def planilha(tmp_path):
+    livro = openpyxl.Workbook(write_only=True)
+    aba = livro.create_sheet("Análise")
+    aba.append(["MATRIZ GE"])
+    aba.append([None])
+    aba.append([c.upper() for c in app_matriz.COLUNAS_ANALISE])
+    linhas = [
+        _linha("OK", eixo_posicao=2.0, eixo_atratividade=9.0, quadrante="3. Investimento Seletivo/Cauteloso"),  # 4
+        _linha(None),                                                                   # 5: sem produto
+        _linha("TEXTO", hora_aluno="12,5"),                                              # 6: número como texto
+        _linha("SEM HORA", hora_aluno=None),                                             # 7
+        _linha("NOTA ALTA", posicao=[7, 3, 3, 3]),                                       # 8: nota fora de 0-5
+        _linha("EIXO ALTO", eixo_posicao=11),                                            # 9: eixo fora de 0-10
+        _linha("MODALIDADE", modalidade=2024),                                           # 10
+        _linha("SEM NOTAS", posicao=[0, 0, 0, 0], atratividade=[None] * 4),              # 11
+        [None] * len(app_matriz.COLUNAS_ANALISE),                                        # 12: vazia
+        _linha("DATA", hora_aluno=True),                                                 # 13: tipo errado
+    ]
+    for linha in linhas:
+        aba.append(linha)
+    caminho = tmp_path / "analise.xlsx"
+    livro.save(caminho)
+    return str(caminho)
+
+
+@pytest.fixture
+def leitura(planilha):
+    df, relatorio = app_matriz.ler_analise_streaming(planilha)
+    return df.set_index(df["Produto"].astype(str)), relatorio
+
+
+def _ocorrencias(relatorio, produto_linha):
+    return {(o["coluna"], o["acao"], o["motivo"]) for o in relatorio.ocorrencias if o["linha"] == produto_linha}
+
+
+def test_contagens_do_relatorio(leitura):
+    df, relatorio = leitura
+    dados = relatorio.como_dict()
+    assert dados["linhas_lidas"] == 9
+    assert dados["linhas_vazias"] == 1
+    assert dados["linhas_rejeitadas"] == 1
+    assert dados["linhas_aceitas"] == len(df) == 8
+    assert dados["linhas_corrigidas"] == 6
+    assert dados["linhas_incompletas"] == 1
+    assert dados["ocorrencias_omitidas"] == 0
+
+
+def test_linha_sem_produto_e_rejeitada(leitura):
+    _, relatorio = leitura
+    assert _ocorrencias(relatorio, 5) == {("Produto", "rejeitada", "produto vazio")}
+
+
+def test_valores_da_planilha_sao_mantidos(leitura):
+    df, _ = leitura
+    linha = df.loc["OK"]
+    assert (linha["Posição Competitiva"], linha["Atratividade Mercado"]) == (2.0, 9.0)
+    assert linha["Quadrante"] == "3. Investimento Seletivo/Cauteloso"
+
+
+def test_numero_como_texto_e_hora_aluno_vazia_sao_corrigidos(leitura):
+    df, relatorio = leitura
+    assert df.loc["TEXTO", "Hora Aluno"] == 12.5
+    assert _ocorrencias(relatorio, 6) == {("Hora Aluno", "corrigida", "número gravado como texto")}
+    assert df.loc["SEM HORA", "Hora Aluno"] == app_matriz.HORA_ALUNO_PADRAO
+    assert _ocorrencias(relatorio, 7) == {("Hora Aluno", "corrigida", "vazio; usado 1")}
+    assert df.loc["DATA", "Hora Aluno"] == app_matriz.HORA_ALUNO_PADRAO
+    assert _ocorrencias(relatorio, 13) == {("Hora Aluno", "corrigida", "valor não numérico; usado 1")}
+
+
+def test_valores_fora_do_intervalo_viram_sem_dado(leitura):
+    df, relatorio = leitura
+    # A nota 7 é descartada e o eixo sai só das três notas válidas; o eixo 11 é recalculado pelas notas
+    assert math.isnan(df.loc["NOTA ALTA", "Faturamento"])
+    assert df.loc["NOTA ALTA", "Posição Competitiva"] == 6.0
+    assert _ocorrencias(relatorio, 8) == {("Faturamento", "corrigida", "fora do intervalo 0–5")}
+    assert (df.loc["EIXO ALTO", "Posição Competitiva"], df.loc["EIXO ALTO", "Atratividade Mercado"]) == (6.0, 7.0)
+    assert df.loc["EIXO ALTO", "Quadrante"] == "4. Investimento Seguro e Crescimento"
+    assert _ocorrencias(relatorio, 9) == {("Posição Competitiva", "corrigida", "fora do intervalo 0–10")}
+
+
+def test_texto_de_outro_tipo_e_convertido(leitura):
+    df, relatorio = leitura
+    assert df.loc["MODALIDADE", "Modalidade"] == "2024"
+    assert _ocorrencias(relatorio, 10) == {("Modalidade", "corrigida", "valor convertido em texto")}
+
+
+def test_linha_sem_notas_fica_incompleta(leitura):
+    df, relatorio = leitura
+    linha = df.loc["SEM NOTAS"]
+    assert np.isnan(linha["Posição Competitiva"]) and np.isnan(linha["Atratividade Mercado"])
+    assert pd.isna(linha["Quadrante"])
+    assert _ocorrencias(relatorio, 11) == {
+        ("Posição Competitiva", "incompleta", "eixo vazio e sem notas válidas"),
+        ("Atratividade Mercado", "incompleta", "eixo vazio e sem notas válidas"),
+    }
+
+
+def test_colunas_de_texto_saem_categoricas_e_ordenadas(leitura):
+    df, _ = leitura
+    for coluna in app_matriz.COLUNAS_TEXTO_ANALISE:
+        assert isinstance(df[coluna].dtype, pd.CategoricalDtype)
+        assert list(df[coluna].cat.categories) == sorted(df[coluna].cat.categories)
+
+
+def test_relatorio_conta_linhas_uma_vez_e_limita_as_ocorrencias():
+    relatorio = app_matriz.RelatorioLeitura("planilha.xlsx", max_ocorrencias=2)
+    relatorio.linhas_lidas = 3
+    relatorio.registrar(4, "Faturamento", 9, "corrigida", "fora do intervalo 0–5")
+    relatorio.registrar(4, "Satisfação", 9, "corrigida", "fora do intervalo 0–5")
+    relatorio.registrar(5, "Faturamento", 8, "corrigida", "fora do intervalo 0–5")
+    relatorio.registrar(6, "Produto", None, "rejeitada", "produto vazio")
+    dados = relatorio.como_dict()
+    assert (dados["linhas_corrigidas"], dados["linhas_rejeitadas"], dados["linhas_aceitas"]) == (2, 1, 2)
+    assert [o["linha"] for o in dados["ocorrencias"]] == [4, 4]
+    assert dados["ocorrencias_omitidas"] == 2
+    assert {"acao": "corrigida", "coluna": "Faturamento", "motivo": "fora do intervalo 0–5",
+            "ocorrencias": 2} in dados["contagens"]
@@ -0,0 +1,26 @@
+import cProfile
+import os
+
+import matriz_GE_dash as app_matriz
+
+
+def _deve_perfilar(endereco, cabecalhos):
+    with app_matriz.server.test_request_context("/", headers=cabecalhos, environ_base={"REMOTE_ADDR": endereco}):
+        return app_matriz._deve_perfilar()
+
+
+def test_cabecalho_de_perfil_so_vale_para_requisicoes_locais(monkeypatch):
+    monkeypatch.setattr(app_matriz, "PROFILE_TAXA", 0)
+    assert _deve_perfilar("127.0.0.1", {"X-Matriz-Profile": "1"})
+    assert not _deve_perfilar("203.0.113.7", {"X-Matriz-Profile": "1"})
+    assert not _deve_perfilar("127.0.0.1", {})
+    monkeypatch.setattr(app_matriz, "PROFILE_CABECALHO_PUBLICO", True)
+    assert _deve_perfilar("203.0.113.7", {"X-Matriz-Profile": "1"})
+
+
+def test_perfis_em_disco_sao_limitados(monkeypatch, tmp_path):
+    monkeypatch.setattr(app_matriz, "PERFIS_DIR", str(tmp_path))
+    monkeypatch.setattr(app_matriz, "PERFIS_MAX", 3)
+    for _ in range(5):
+        app_matriz._salvar_perfil(cProfile.Profile(), "teste")
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".prof")]) == 3
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import matriz_GE_dash as app_matriz
+
+POSICAO = app_matriz.EIXO_POSICAO
+ATRATIVIDADE = app_matriz.EIXO_ATRATIVIDADE
+
+
+def test_notas_indicador_usa_limites_inclusivos():
+    # Faturamento: até 100 mil = 1, até 250 mil = 2, ..., acima de 700 mil = 5
+    notas = app_matriz.notas_indicador("Faturamento", [100_000, 100_001, 700_000, 700_001, None])
+    assert notas.tolist() == [1, 2, 4, 5, 0]
+
+
+def test_notas_indicador_decrescente_e_qualitativo():
+    # Facilidade de Adesão: menos dias para fechar turma é melhor
+    assert app_matriz.notas_indicador("Facilidade de Adesão", [60, 61, 200]).tolist() == [5, 4, 1]
+    # Qualitativos já chegam de 1 a 5: só arredondados e limitados
+    assert app_matriz.notas_indicador("Concorrentes", [2.4, 7, "x"]).tolist() == [2, 5, 0]
+
+
+def test_calcular_eixo_ignora_notas_ausentes():
+    notas = {"Faturamento": np.array([5, 5, 0]), "Satisfação": np.array([1, 0, 0]),
+             "Capacidade de Oferta": np.array([3, 0, 0]), "Facilidade de Adesão": np.array([3, 0, 0])}
+    eixo = app_matriz.calcular_eixo(notas, POSICAO)
+    # (5 + 1 + 3 + 3) / 4 x 2 = 6; só a nota 5 -> 10, sem os zeros puxarem para baixo; nenhuma nota -> NaN
+    assert eixo[:2].tolist() == [6.0, 10.0]
+    assert np.isnan(eixo[2])
+
+
+def test_calcular_eixo_inverte_indicadores_de_risco():
+    notas = {"Tamanho Mercado": np.array([4]), "Crescimento Mercado": np.array([4]),
+             "Vulnerabilidade": np.array([1]), "Concorrentes": np.array([5])}
+    # Vulnerabilidade 1 conta como 5 e Concorrentes 5 como 1: (4 + 4 + 5 + 1) / 4 x 2 = 7
+    assert app_matriz.calcular_eixo(notas, ATRATIVIDADE).tolist() == [7.0]
+
+
+def test_calcular_eixo_sem_indicadores_do_eixo_fica_vazio():
+    assert np.isnan(app_matriz.calcular_eixo({"Faturamento": np.array([5])}, ATRATIVIDADE))
+
+
+@pytest.mark.parametrize("posicao, atratividade, quadrante", [
+    (3.33, 3.33, "4. Zona de Perigo: Colher ou desinvestir"),
+    (3.34, 3.33, "2. Expansão Limitada ou Colheita"),
+    (6.66, 6.66, "3. Investimento Seletivo/Cauteloso"),
+    (6.67, 6.66, "4. Investimento Seguro e Crescimento"),
+    (10.0, 6.67, "5. Investimento Prioritário"),
+    (0.0, 10.0, "3. Investimento Seletivo/Cauteloso"),
+])
+def test_classificar_quadrante_nos_limites(posicao, atratividade, quadrante):
+    assert app_matriz.classificar_quadrante([posicao], [atratividade]).tolist() == [quadrante]
+
+
+def test_classificar_quadrante_sem_eixo_fica_vazio():
+    assert app_matriz.classificar_quadrante([5.0, np.nan], [np.nan, 5.0]).tolist() == [None, None]
+    assert app_matriz.celulas_eixos([5.0, np.nan], [10.0, 5.0]).tolist() == [7, -1]
+
+
+def test_pontuar_portfolio_com_indicadores_parciais():
+    bruto = pd.DataFrame({"Faturamento": [800_000, None], "Satisfação": [90, None],
+                          "Tamanho Mercado": [100, 100], "Vulnerabilidade": [1, 5]})
+    resultado = app_matriz.pontuar_portfolio(bruto)
+    assert resultado[POSICAO].iloc[0] == 10.0
+    assert np.isnan(resultado[POSICAO].iloc[1])
+    # Atratividade: Tamanho 1 e Vulnerabilidade 1 -> 5 (invertida): (1 + 5) / 2 x 2 = 6
+    assert resultado[ATRATIVIDADE].tolist() == [6.0, 2.0]
+    assert resultado["Quadrante"].tolist() == ["4. Investimento Seguro e Crescimento", None]
+
+
+def test_completar_eixos_preserva_a_planilha_e_preenche_os_vazios():
+    notas = {indicador: [0, 3, 0] for indicador in app_matriz.INDICADORES_GE}
+    df = pd.DataFrame({**notas, POSICAO: [9.0, np.nan, np.nan], ATRATIVIDADE: [1.0, np.nan, np.nan],
+                       "Quadrante": pd.Categorical(["Rótulo da planilha", None, None])})
+    resultado = app_matriz.completar_eixos(df)
+    # Linha 0: valores da planilha ficam; linha 1: recalculada pelas notas; linha 2: sem notas, fica vazia
+    assert resultado[POSICAO].iloc[:2].tolist() == [9.0, 6.0]
+    assert resultado[ATRATIVIDADE].iloc[1] == pytest.approx(6.0)
+    assert resultado[[POSICAO, ATRATIVIDADE]].iloc[2].isna().all()
+    assert resultado["Quadrante"].astype(object).where(resultado["Quadrante"].notna(), None).tolist() == [
+        "Rótulo da planilha", "3. Investimento Seletivo/Cauteloso", None]
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import matriz_GE_dash as app_matriz
+
+PESOS_BASE = np.array([[faixas.peso for faixas in app_matriz.INDICADORES_GE.values()]])
+
+
+def _notas(posicao, atratividade):
+    """Linha de notas na ordem de INDICADORES_GE: quatro da posição e quatro da atratividade."""
+    return np.array([list(posicao) + list(atratividade)], dtype=np.int8)
+
+
+def _snapshot(df):
+    compacto = app_matriz.compactar_analise(df)
+    return app_matriz.SnapshotDataset(compacto, app_matriz.IndiceFiltros(compacto),
+                                      next(app_matriz._contador_versoes), "teste", None)
+
+
+@pytest.fixture
+def portfolio():
+    # Enfermagem tem notas e eixos; Logística não tem nenhuma nota nem eixo; Radiologia tem os eixos
+    # prontos da planilha, mas nenhuma nota
+    return pd.DataFrame({
+        "Grande Área": ["SAÚDE", "GESTÃO", "SAÚDE"],
+        "Quadrante": ["5. Investimento Prioritário", None, "4. Zona de Perigo: Colher ou desinvestir"],
+        "Produto": ["Enfermagem", "Logística", "Radiologia"],
+        "Hora Aluno": [100.0, 50.0, 30.0],
+        "Posição Competitiva": [10.0, np.nan, 2.0],
+        "Atratividade Mercado": [8.0, np.nan, 1.0],
+        "Faturamento": [5, 0, 0], "Satisfação": [5, 0, 0], "Capacidade de Oferta": [5, 0, 0],
+        "Facilidade de Adesão": [5, 0, 0], "Tamanho Mercado": [5, 0, 0], "Crescimento Mercado": [5, 0, 0],
+        "Vulnerabilidade": [2, 0, 0], "Concorrentes": [2, 0, 0],
+    })
+
+
+def test_faixas_por_pesos_ignora_notas_ausentes():
+    notas = np.concatenate([_notas([5, 5, 5, 5], [0] * 4), _notas([1, 0, 0, 0], [0] * 4), _notas([3, 0, 4, 0], [0] * 4)])
+    faixas = app_matriz.faixas_por_pesos(notas, PESOS_BASE, app_matriz.EIXO_POSICAO)
+    # 10 -> alta; só a nota 1 -> 2 (baixa), sem virar média com os zeros; (3 + 4) -> 7 -> alta
+    assert faixas[:, 0].tolist() == [2, 0, 2]
+
+
+def test_faixas_por_pesos_sem_nota_valida_fica_sem_faixa():
+    notas = _notas([5, 5, 5, 5], [0] * 4)
+    assert app_matriz.faixas_por_pesos(notas, PESOS_BASE, app_matriz.EIXO_ATRATIVIDADE).tolist() == [[-1]]
+
+
+def test_probabilidades_somam_um_e_sem_notas_ficam_nan():
+    notas = np.concatenate([_notas([5, 5, 5, 5], [5, 5, 1, 1]), _notas([2, 2, 2, 2], [0] * 4)])
+    pesos = app_matriz.sortear_pesos(0.3, 500)
+    probabilidades = app_matriz.probabilidades_celulas(notas, pesos)
+    assert probabilidades.shape == (2, 9)
+    # Todas as notas no máximo: alta nos dois eixos em qualquer amostra
+    assert probabilidades[0, 8] == pytest.approx(1.0)
+    assert probabilidades[0].sum() == pytest.approx(1.0)
+    assert np.isnan(probabilidades[1]).all()
+
+
+def test_celula_base_vem_dos_eixos_plotados(portfolio):
+    sensibilidade = app_matriz.obter_sensibilidade(_snapshot(portfolio), 10)
+    # alta/alta = 8; sem eixo = -1; baixa/baixa = 0, mesmo sem notas para sortear
+    assert sensibilidade.celula_base.tolist() == [8, -1, 0]
+    assert np.isnan(sensibilidade.probabilidades[1:]).all()
+    assert app_matriz.QUADRANTES_MATRIZ.flat[0] == portfolio["Quadrante"][2]
+
+
+def test_visao_so_com_produtos_sem_eixo_nao_quebra(portfolio):
+    visao = app_matriz.calcular_visao(_snapshot(portfolio), ["GESTÃO"], [], [], True, False, variacao_pesos=10)
+    assert not visao["figura"]["data"]
+
+
+def test_anel_so_nas_bolhas_com_notas(portfolio):
+    visao = app_matriz.calcular_visao(_snapshot(portfolio), [], [], [], True, False, variacao_pesos=10)
+    anel = [t for t in visao["figura"]["data"] if t["name"] == "Sensibilidade aos pesos"]
+    assert len(anel) == 1
+    assert [linha[0] for linha in anel[0]["customdata"]] == ["Enfermagem"]